@@ -4,10 +4,12 @@ import json
 import time
 import re
 from urllib.parse import urljoin, urlparse
+from http_cache import CachedSession
+from keyword_classifier import CLASSIFIER
 
 class PhDStatsRequirementsScraper:
     def __init__(self):
-        self.session = requests.Session()
+        self.session = CachedSession(requests.Session())
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
@@ -66,13 +68,7 @@ class PhDStatsRequirementsScraper:
                     title_text = title.get_text().lower() if title else ""
                     
                     # Check if this page is about PhD programs
-                    phd_indicators = [
-                        'phd program', 'doctoral program', 'ph.d.', 'doctorate',
-                        'graduate program', 'phd in statistics', 'doctoral statistics',
-                        'admission requirements', 'application requirements'
-                    ]
-                    
-                    if any(indicator in title_text or indicator in text_content for indicator in phd_indicators):
+                    if CLASSIFIER.any('phd_indicators', title_text, text_content):
                         phd_urls.append(test_url)
                         print(f"    Found PhD page: {test_url}")
                 
@@ -94,9 +90,7 @@ class PhDStatsRequirementsScraper:
                         text = link.get_text().strip().lower()
                         
                         # Look for PhD-related links
-                        if any(keyword in href or keyword in text for keyword in [
-                            'phd', 'doctoral', 'graduate', 'admission', 'apply'
-                        ]):
+                        if CLASSIFIER.matches('phd_link_keywords', href, text):
                             # Construct full URL
                             if href.startswith('http'):
                                 full_url = href
@@ -125,7 +119,7 @@ class PhDStatsRequirementsScraper:
                 return None
             
             soup = BeautifulSoup(response.content, 'html.parser')
-            text_content = soup.get_text()
+            text_content = soup.get_text().lower()
             
             requirements = {
                 'url': url,
@@ -148,7 +142,7 @@ class PhDStatsRequirementsScraper:
             ]
             
             for pattern in gre_patterns:
-                matches = re.findall(pattern, text_content.lower())
+                matches = re.findall(pattern, text_content)
                 if matches:
                     if any(word in matches[0] for word in ['not required', 'optional', 'waived', 'waiver']):
                         requirements['gre_required'] = False
@@ -165,7 +159,7 @@ class PhDStatsRequirementsScraper:
             ]
             
             for pattern in gpa_patterns:
-                matches = re.findall(pattern, text_content.lower())
+                matches = re.findall(pattern, text_content)
                 if matches:
                     try:
                         gpa = float(matches[0])
@@ -185,7 +179,7 @@ class PhDStatsRequirementsScraper:
             prereq_text = []
             for keyword in prereq_keywords:
                 pattern = rf'{keyword}[^.]*\.'
-                matches = re.findall(pattern, text_content.lower())
+                matches = re.findall(pattern, text_content)
                 prereq_text.extend(matches[:2])  # Limit to avoid too much text
             
             requirements['prerequisites'] = prereq_text[:5]  # Top 5 most relevant
@@ -199,24 +193,13 @@ class PhDStatsRequirementsScraper:
             ]
             
             for pattern in deadline_patterns:
-                matches = re.findall(pattern, text_content.lower())
+                matches = re.findall(pattern, text_content)
                 if matches:
                     requirements['application_deadline'] = matches[0]
                     break
             
             # Extract research areas
-            research_keywords = [
-                'research areas', 'research interests', 'specializations',
-                'biostatistics', 'machine learning', 'data science',
-                'bayesian', 'computational', 'theoretical', 'applied statistics'
-            ]
-            
-            research_areas = []
-            for keyword in research_keywords:
-                if keyword.lower() in text_content.lower():
-                    research_areas.append(keyword)
-            
-            requirements['research_areas'] = research_areas
+            requirements['research_areas'] = CLASSIFIER.found('research_keywords', text_content)
             
             # Extract program duration
             duration_patterns = [
@@ -226,7 +209,7 @@ class PhDStatsRequirementsScraper:
             ]
             
             for pattern in duration_patterns:
-                matches = re.findall(pattern, text_content.lower())
+                matches = re.findall(pattern, text_content)
                 if matches:
                     try:
                         duration = int(matches[0])
@@ -237,19 +220,13 @@ class PhDStatsRequirementsScraper:
                         continue
             
             # Extract funding information
-            funding_keywords = [
-                'funding', 'assistantship', 'fellowship', 'scholarship',
-                'tuition waiver', 'stipend', 'financial support'
-            ]
-            
             funding_info = []
-            for keyword in funding_keywords:
-                if keyword.lower() in text_content.lower():
-                    # Extract sentence containing funding info
-                    pattern = rf'[^.]*{keyword}[^.]*\.'
-                    matches = re.findall(pattern, text_content.lower(), re.IGNORECASE)
-                    if matches:
-                        funding_info.extend(matches[:2])
+            # Same sentences as re.findall(r'[^.]*keyword[^.]*\.'), without its backtracking on long pages
+            sentences = text_content.split('.')[:-1]
+            for keyword in CLASSIFIER.found('funding_keywords', text_content):
+                # Extract sentence containing funding info
+                matches = [sentence + '.' for sentence in sentences if keyword in sentence]
+                funding_info.extend(matches[:2])
             
             requirements['funding_info'] = funding_info[:3]  # Top 3 most relevant
             
@@ -267,14 +244,9 @@ class PhDStatsRequirementsScraper:
     def find_requirements_section(self, soup):
         """Find the requirements section in the HTML"""
         # Look for headings that might contain requirements
-        requirement_headings = [
-            'admission requirements', 'application requirements', 'prerequisites',
-            'requirements', 'how to apply', 'application process'
-        ]
-        
         for heading in soup.find_all(['h1', 'h2', 'h3', 'h4']):
             heading_text = heading.get_text().lower()
-            if any(req_heading in heading_text for req_heading in requirement_headings):
+            if CLASSIFIER.matches('requirement_headings', heading_text):
                 # Get the next few paragraphs after this heading
                 content = []
                 next_element = heading.find_next_sibling()
@@ -391,6 +363,8 @@ class PhDStatsRequirementsScraper:
         
         print("=" * 80)
         print(f"Successfully extracted requirements for {len(self.phd_requirements)} universities")
+        self.session.print_summary()
+        self.session.close()
         
         return self.phd_requirements
     
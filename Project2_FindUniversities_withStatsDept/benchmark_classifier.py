@@ -0,0 +1,138 @@
+import argparse
+import random
+import re
+import timeit
+
+from keyword_classifier import CLASSIFIER, KEYWORD_GROUPS
+
+FILLER = ("the university offers courses and events for students across campus "
+          "news about admissions library hours contact us about our history ").split()
+
+
+def synthetic_page(size=70000, density=0.002, seed=1):
+    """Lower-cased page text of about size characters with a few indicator terms sprinkled in"""
+    rng = random.Random(seed)
+    terms = [term for terms in KEYWORD_GROUPS.values() for term in terms]
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(terms) if rng.random() < density else rng.choice(FILLER)
+        if rng.random() < 0.08:
+            word += '.'
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def synthetic_links(count=300, seed=1):
+    rng = random.Random(seed)
+    names = ['statistics', 'mathematics', 'history', 'biology', 'news', 'events',
+             'data science', 'admissions', 'computer science', 'library']
+    links = []
+    for _ in range(count):
+        name = rng.choice(names)
+        links.append((f"/{name.replace(' ', '-')}/index.html", f"department of {name}", ""))
+    return links
+
+
+# The checks as they were written inline before keyword_classifier.py
+
+def legacy_department_page(text_content, title_text):
+    strong_indicators = KEYWORD_GROUPS['strong_indicators']
+    if any(indicator in title_text or indicator in text_content for indicator in strong_indicators):
+        return 'strong'
+    stats_count = sum(1 for term in KEYWORD_GROUPS['stats_terms'] if term in text_content)
+    academic_count = sum(1 for term in KEYWORD_GROUPS['academic_terms'] if term in text_content)
+    return 'pattern' if stats_count >= 3 and academic_count >= 2 else None
+
+
+def legacy_links(links):
+    potential_links = []
+    for href, text, title in links:
+        stats_keywords = KEYWORD_GROUPS['link_keywords']
+        if any(keyword in text for keyword in ['statistics', 'statistical']):
+            potential_links.insert(0, (href, text, 'high_priority'))
+        elif any(keyword in href for keyword in ['stat', 'math']):
+            potential_links.insert(0, (href, text, 'medium_priority'))
+        elif any(keyword in href or keyword in text or keyword in title for keyword in stats_keywords):
+            potential_links.append((href, text, 'low_priority'))
+    return potential_links
+
+
+def legacy_requirements(text_content):
+    research_areas = [keyword for keyword in KEYWORD_GROUPS['research_keywords']
+                      if keyword.lower() in text_content.lower()]
+    funding_info = []
+    for keyword in KEYWORD_GROUPS['funding_keywords']:
+        if keyword.lower() in text_content.lower():
+            funding_info.extend(re.findall(rf'[^.]*{keyword}[^.]*\.', text_content.lower(), re.IGNORECASE)[:2])
+    return research_areas, funding_info[:3]
+
+
+def classifier_department_page(text_content, title_text):
+    if CLASSIFIER.any('strong_indicators', title_text, text_content):
+        return 'strong'
+    stats_count = CLASSIFIER.distinct('stats_terms', text_content)
+    academic_count = CLASSIFIER.distinct('academic_terms', text_content)
+    return 'pattern' if stats_count >= 3 and academic_count >= 2 else None
+
+
+def classifier_links(links):
+    potential_links = []
+    for href, text, title in links:
+        if CLASSIFIER.matches('stats_words', text):
+            potential_links.insert(0, (href, text, 'high_priority'))
+        elif CLASSIFIER.matches('link_href_keywords', href):
+            potential_links.insert(0, (href, text, 'medium_priority'))
+        elif CLASSIFIER.matches('link_keywords', href, text, title):
+            potential_links.append((href, text, 'low_priority'))
+    return potential_links
+
+
+def classifier_requirements(text_content):
+    text_content = text_content.lower()
+    funding_info = []
+    sentences = text_content.split('.')[:-1]
+    for keyword in CLASSIFIER.found('funding_keywords', text_content):
+        funding_info.extend([sentence + '.' for sentence in sentences if keyword in sentence][:2])
+    return CLASSIFIER.found('research_keywords', text_content), funding_info[:3]
+
+
+def per_call_us(function, *args, number):
+    return min(timeit.repeat(lambda: function(*args), number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-page CPU of the keyword checks, inline lists vs keyword_classifier")
+    parser.add_argument('files', nargs='*', help="Text files to use as pages (default: synthetic pages)")
+    parser.add_argument('--size', type=int, default=70000, help="Synthetic page size in characters")
+    parser.add_argument('--number', type=int, default=5, help="Calls per timing")
+    args = parser.parse_args()
+
+    pages = []
+    for filename in args.files:
+        with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((filename, f.read()))
+    if not pages:
+        pages = [("synthetic, sparse", synthetic_page(args.size, density=0.0005)),
+                 ("synthetic, dense", synthetic_page(args.size, density=0.01))]
+    links = synthetic_links()
+
+    print(f"Keyword classifier engine: {CLASSIFIER.engine} ({len(CLASSIFIER.terms)} terms)")
+    cases = []
+    for name, text in pages:
+        lowered = text.lower()
+        cases.append((f"department page [{name}]", legacy_department_page, classifier_department_page,
+                      (lowered, "")))
+        cases.append((f"requirements page [{name}]", legacy_requirements, classifier_requirements, (text,)))
+    cases.append((f"link classification [{len(links)} links]", legacy_links, classifier_links, (links,)))
+
+    for label, legacy, compiled, call_args in cases:
+        assert legacy(*call_args) == compiled(*call_args), f"Results differ for {label}"
+        before = per_call_us(legacy, *call_args, number=args.number)
+        after = per_call_us(compiled, *call_args, number=args.number)
+        print(f"{label}: inline {before:,.0f} µs, classifier {after:,.0f} µs ({before / after:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+# How often a request waiting for a slot checks whether it was cancelled
+SLOT_POLL_SECONDS = 0.05
+
+
+class RequestCancelled(Exception):
+    """Raised by PoliteSession.get when its stop event is set before the request is sent"""
+
+
+def host_key(url):
+    """Politeness key for a URL: its host name"""
+    return urlparse(url).netloc.lower().split(':')[0]
+
+
+class PoliteSession:
+    """Wraps a requests.Session so every network GET holds a per-host slot and then a global slot
+
+    When the wrapped session is a CachedSession, requests the cache can answer
+    on its own are served before any slot is taken. A request given a stop
+    event gives up (RequestCancelled) as soon as it is set while the request
+    is still waiting for a slot, so it never holds one for a result nobody
+    needs.
+    """
+
+    def __init__(self, session, max_requests=32, per_host=4):
+        self.session = session
+        self.per_host = per_host
+        self.request_slots = threading.BoundedSemaphore(max_requests)
+        self.host_slots = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @contextmanager
+    def slot(self, semaphore, url, stop=None):
+        if stop is None:
+            semaphore.acquire()
+        else:
+            while not semaphore.acquire(timeout=SLOT_POLL_SECONDS):
+                if stop.is_set():
+                    raise RequestCancelled(url)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def host_slot(self, url, stop=None):
+        key = host_key(url)
+        with self.lock:
+            if key not in self.host_slots:
+                self.host_slots[key] = threading.BoundedSemaphore(self.per_host)
+            return self.slot(self.host_slots[key], url, stop)
+
+    def get(self, url, stop=None, **kwargs):
+        cached = getattr(self.session, 'cached', None)
+        response = cached(url) if cached is not None else None
+        if response is not None:
+            return response
+        # Wait for the host first, so a thread queued behind a busy host holds no global slot
+        with self.host_slot(url, stop), self.slot(self.request_slots, url, stop):
+            if stop is not None and stop.is_set():
+                raise RequestCancelled(url)
+            with self.lock:
+                self.request_count += 1
+            return self.session.get(url, **kwargs)
+
+    def __getattr__(self, name):
+        # headers, cookies, close() and the rest come from the wrapped session
+        return getattr(self.session, name)
+
+
+class ConcurrentVerifier:
+    """Runs a blocking per-university verify function for many universities at once.
+
+    This is a plain thread pool: requests is blocking, so each university is
+    verified in a worker thread with the verifier's own
+    method, so the records it writes (has_stats_dept, dept_url,
+    verification_method, ...) are exactly those of a sequential run. The
+    verifier's session is wrapped in a PoliteSession: at most max_requests
+    GETs are in flight overall and at most per_host per host.
+    """
+
+    def __init__(self, verifier, concurrency=16, max_requests=32, per_host=4):
+        self.verifier = verifier
+        self.concurrency = max(1, concurrency)
+        self.session = PoliteSession(verifier.session, max_requests=max_requests, per_host=per_host)
+        verifier.session = self.session
+        self.completed = 0
+        self.elapsed = 0.0
+
+    def run(self, universities, verify):
+        """Call verify(university) for every university; returns the results in input order"""
+        total = len(universities)
+        results = [None] * total
+        started = time.monotonic()
+        # The pool size is the global university concurrency
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(verify, university): index for index, university in enumerate(universities)}
+            for future in as_completed(futures):
+                university = universities[futures[future]]
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"  Error verifying {university['name']}: {str(e)}")
+                self.completed += 1
+                print(f"  [{self.completed}/{total}] done: {university['name']}")
+        self.elapsed = time.monotonic() - started
+        return results
+
+    def print_summary(self):
+        rate = self.completed / self.elapsed * 60 if self.elapsed else 0.0
+        print(f"Verified {self.completed} universities in {self.elapsed:.1f}s "
+              f"({rate:.1f}/min, {self.concurrency} at once, "
+              f"max {self.session.per_host} requests per host, {self.session.request_count} requests)")
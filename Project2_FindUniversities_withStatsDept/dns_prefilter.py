@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+DNS_CACHE_FILE = "dns_cache.json"
+DNS_CACHE_TTL = 7 * 24 * 3600  # Department subdomains rarely appear or vanish
+
+# Errors that mean the name does not exist, as opposed to a resolver hiccup
+NXDOMAIN_ERRORS = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+
+FOUND = "found"
+NXDOMAIN = "nxdomain"
+UNKNOWN = "unknown"
+
+
+def hostname(url):
+    return urlparse(url).netloc.lower().split(':')[0]
+
+
+class DNSCache:
+    """Bulk pre-resolution of candidate hostnames, so names that don't exist never cost an HTTP attempt.
+
+    resolve_urls() resolves every hostname not cached yet (or cached longer
+    than ttl ago) concurrently and saves the results to dns_cache.json.
+    exists() is False only for names that definitely don't exist; timeouts and
+    temporary resolver errors are not cached and count as existing.
+    """
+
+    def __init__(self, filename=DNS_CACHE_FILE, ttl=DNS_CACHE_TTL, concurrency=64, timeout=5):
+        self.filename = filename
+        self.ttl = ttl
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.entries = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self):
+        tmp_file = f"{self.filename}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.filename)
+
+    def is_fresh(self, host):
+        entry = self.entries.get(host)
+        return bool(entry) and time.time() - entry['checked'] < self.ttl
+
+    async def resolve_one(self, host, slots):
+        loop = asyncio.get_running_loop()
+        async with slots:
+            try:
+                await asyncio.wait_for(loop.getaddrinfo(host, 443, type=socket.SOCK_STREAM), self.timeout)
+                return host, FOUND
+            except socket.gaierror as e:
+                return host, NXDOMAIN if e.errno in NXDOMAIN_ERRORS else UNKNOWN
+            except (asyncio.TimeoutError, OSError):
+                return host, UNKNOWN
+
+    async def resolve_all(self, hosts):
+        # getaddrinfo runs in the loop's executor; size it to the concurrency
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+        slots = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*[self.resolve_one(host, slots) for host in hosts])
+
+    def resolve_urls(self, urls):
+        """Resolve the hostnames of urls that aren't cached yet; returns (resolved, nxdomain) counts"""
+        hosts = sorted({hostname(url) for url in urls} - {''})
+        pending = [host for host in hosts if not self.is_fresh(host)]
+        if pending:
+            started = time.monotonic()
+            results = asyncio.run(self.resolve_all(pending))
+            for host, status in results:
+                if status != UNKNOWN:
+                    self.entries[host] = {"status": status, "checked": time.time()}
+            self.save()
+            print(f"DNS: resolved {len(pending)} hostnames in {time.monotonic() - started:.1f}s "
+                  f"({len(hosts) - len(pending)} cached)")
+        nxdomain = sum(1 for host in hosts if self.entries.get(host, {}).get('status') == NXDOMAIN)
+        print(f"DNS: {nxdomain} of {len(hosts)} candidate hostnames do not exist and will be skipped")
+        return len(hosts), nxdomain
+
+    def exists(self, url):
+        """False if the URL's hostname is known not to exist"""
+        entry = self.entries.get(hostname(url))
+        return not entry or entry['status'] != NXDOMAIN
+
+    def filter(self, urls):
+        """The urls whose hostnames may exist"""
+        kept = [url for url in urls if self.exists(url)]
+        with self.lock:
+            self.dropped += len(urls) - len(kept)
+        return kept
@@ -3,14 +3,18 @@ from bs4 import BeautifulSoup
 import json
 import time
 from urllib.parse import urlparse
+from dns_prefilter import DNSCache
+from http_cache import CachedSession
+from keyword_classifier import CLASSIFIER
 
 class FastStatsVerifier:
     def __init__(self):
         self.universities = []
-        self.session = requests.Session()
+        self.session = CachedSession(requests.Session())
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self.dns = DNSCache()
     
     def load_universities(self, filename="known_US_universities.txt"):
         """Load universities from text file"""
@@ -37,42 +41,45 @@ class FastStatsVerifier:
         except Exception as e:
             print(f"Error loading universities: {str(e)}")
     
-    def quick_verify(self, university):
-        """Quick verification focusing on most common patterns"""
+    def subdomain_candidates(self, university):
+        """Most common statistics subdomains of a university's main domain"""
         # Extract domain for subdomain checking
         parsed_url = urlparse(university['url'])
         domain_parts = parsed_url.netloc.split('.')
         
-        if len(domain_parts) >= 2:
-            main_domain = '.'.join(domain_parts[-2:])
-            
-            # Try most common subdomain patterns
-            subdomains = [
-                f"https://statistics.{main_domain}",
-                f"https://stat.{main_domain}",
-                f"https://stats.{main_domain}"
-            ]
-            
-            for subdomain in subdomains:
-                try:
-                    response = self.session.get(subdomain, timeout=3)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        title = soup.find('title')
-                        title_text = title.get_text().lower() if title else ""
-                        
-                        # Quick check for statistics department indicators
-                        if any(indicator in title_text for indicator in [
-                            'statistics', 'statistical', 'stat'
-                        ]):
-                            return subdomain
-                            
-                except Exception:
-                    continue
+        if len(domain_parts) < 2:
+            return []
+        main_domain = '.'.join(domain_parts[-2:])
+        return [
+            f"https://statistics.{main_domain}",
+            f"https://stat.{main_domain}",
+            f"https://stats.{main_domain}"
+        ]
+    
+    def quick_verify(self, university):
+        """Quick verification focusing on most common patterns"""
+        # Try most common subdomain patterns, skipping hostnames that don't resolve
+        subdomains = self.dns.filter(self.subdomain_candidates(university))
+        for subdomain in subdomains:
+            try:
+                response = self.session.get(subdomain, timeout=3)
+                if response.status_code == 200:
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                    title = soup.find('title')
+                    title_text = title.get_text().lower() if title else ""
                     
-                time.sleep(0.05)
+                    # Quick check for statistics department indicators
+                    if CLASSIFIER.matches('title_terms', title_text):
+                        return subdomain
+                        
+            except Exception:
+                continue
+                
+            time.sleep(0.05)
         
         # Quick check of main site + /statistics
+        if not self.dns.exists(university['url']):
+            return None
         try:
             base_url = university['url'].rstrip('/')
             test_url = base_url + '/statistics'
@@ -93,6 +100,8 @@ class FastStatsVerifier:
         universities_to_check = self.universities[:max_count] if max_count else self.universities
         
         print(f"\nQuick verification of {len(universities_to_check)} universities...")
+        self.dns.resolve_urls([url for university in universities_to_check
+                               for url in [university['url']] + self.subdomain_candidates(university)])
         print("=" * 80)
         
         for i, university in enumerate(universities_to_check):
@@ -120,6 +129,9 @@ class FastStatsVerifier:
         print("=" * 80)
         print(f"SUMMARY: {found_count}/{verified_count} universities have statistics departments")
         print(f"Success rate: {(found_count/verified_count)*100:.1f}%")
+        print(f"Skipped {self.dns.dropped} probes of hostnames that do not exist")
+        self.session.print_summary()
+        self.session.close()
         
         return results
     
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Shared by university_stats_finder.py, fast_verifier.py and RequirementSummary_PhDStatistics.py
+HTTP_CACHE_FILE = os.environ.get("HTTP_CACHE_FILE", "http_cache.sqlite")
+HTTP_CACHE_TTL = float(os.environ.get("HTTP_CACHE_TTL_HOURS", "24")) * 3600
+HTTP_CACHE_OFFLINE = os.environ.get("HTTP_CACHE_OFFLINE", "") not in ("", "0", "false", "no")
+
+# Server errors are worth retrying later; everything below is cached (404s included,
+# since most URL probes miss)
+CACHEABLE_STATUS_MAX = 499
+
+STORED_HEADERS = ("content-type", "etag", "last-modified", "location")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT,
+    body BLOB,
+    fetched REAL NOT NULL
+)
+"""
+
+
+def normalize_url(url):
+    """Cache key form of a URL: lower-case scheme/host, no default port or fragment, sorted query"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, query, ''))
+
+
+def cache_key(url):
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class CachedSession:
+    """A requests.Session whose GETs go through a shared on-disk cache.
+
+    Responses (status, a few headers, zlib-compressed body) are stored in one
+    SQLite file keyed by normalized URL. Entries younger than ttl are served
+    without touching the network; older ones are revalidated with
+    If-None-Match / If-Modified-Since when the server sent validators, and a
+    304 just refreshes them. In offline mode every request is answered from
+    the cache, whatever its age, and a miss raises requests.ConnectionError.
+
+    Defaults come from HTTP_CACHE_FILE, HTTP_CACHE_TTL_HOURS and
+    HTTP_CACHE_OFFLINE, so one setting covers every script in a run.
+    """
+
+    def __init__(self, session=None, filename=HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL, offline=HTTP_CACHE_OFFLINE):
+        self.session = session or requests.Session()
+        self.filename = filename
+        self.ttl = ttl
+        self.offline = offline
+        self.db = None
+        self.db_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.unavailable = 0
+        with self.db_lock:
+            self.connection().execute(SCHEMA)
+
+    def connection(self):
+        # One connection shared by every thread (the concurrent verifiers call get()
+        # from many); callers hold db_lock. Reopened on demand after close()
+        if self.db is None:
+            self.db = sqlite3.connect(self.filename, timeout=30, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+        return self.db
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def lookup(self, key):
+        with self.db_lock:
+            row = self.connection().execute(
+                "SELECT url, status, headers, body, fetched FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, fetched = row
+        return {"url": url, "status": status, "headers": json.loads(headers or "{}"),
+                "body": zlib.decompress(body) if body else b"", "fetched": fetched}
+
+    def store(self, key, response):
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        body = zlib.compress(response.content, 6)
+        with self.db_lock, self.connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, fetched) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), body, time.time()))
+
+    def touch(self, key):
+        with self.db_lock, self.connection() as connection:
+            connection.execute("UPDATE responses SET fetched = ? WHERE key = ?", (time.time(), key))
+
+    def build_response(self, entry, request_url):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response.url = entry['url'] or request_url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+    def servable(self, entry):
+        """True if entry can be returned without asking the server"""
+        return entry is not None and (self.offline or time.time() - entry['fetched'] < self.ttl)
+
+    def cached(self, url):
+        """The response for url if the cache can answer it without the network, else None"""
+        entry = self.lookup(cache_key(url))
+        if not self.servable(entry):
+            return None
+        self.count('hits')
+        return self.build_response(entry, url)
+
+    def get(self, url, **kwargs):
+        key = cache_key(url)
+        entry = self.lookup(key)
+
+        if self.servable(entry):
+            self.count('hits')
+            return self.build_response(entry, url)
+        if self.offline:
+            self.count('unavailable')
+            raise requests.ConnectionError(f"Offline mode: {url} is not cached")
+
+        # Stale: ask the server whether it changed, if it gave us validators
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            if entry['headers'].get('etag'):
+                headers['If-None-Match'] = entry['headers']['etag']
+            if entry['headers'].get('last-modified'):
+                headers['If-Modified-Since'] = entry['headers']['last-modified']
+
+        response = self.session.get(url, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            self.touch(key)
+            self.count('revalidated')
+            return self.build_response(entry, url)
+
+        self.count('misses')
+        if response.status_code <= CACHEABLE_STATUS_MAX:
+            self.store(key, response)
+        response.from_cache = False
+        return response
+
+    def print_summary(self):
+        total = self.hits + self.misses + self.revalidated + self.unavailable
+        if total:
+            mode = "offline, " if self.offline else ""
+            print(f"HTTP cache ({mode}{self.filename}): {self.hits} hits, {self.revalidated} revalidated, "
+                  f"{self.misses} fetched ({(self.hits + self.revalidated) / total:.0%} served from cache)")
+            if self.unavailable:
+                print(f"HTTP cache: {self.unavailable} requests were not cached and skipped in offline mode")
+
+    def close(self):
+        """Close the cache database and the wrapped session"""
+        with self.db_lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+        self.session.close()
+
+    def __getattr__(self, name):
+        # headers, cookies and the rest come from the wrapped session
+        return getattr(self.session, name)
@@ -0,0 +1,185 @@
+import re
+from collections import Counter
+
+try:
+    import ahocorasick  # pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Indicator lists shared by university_stats_finder.py, fast_verifier.py and
+# RequirementSummary_PhDStatistics.py; all terms are lower case
+KEYWORD_GROUPS = {
+    # Department page checks (find_statistics_department_url)
+    'strong_indicators': [
+        'department of statistics',
+        'statistics department',
+        'statistical science department',
+        'phd in statistics',
+        'doctorate in statistics',
+        'graduate program in statistics',
+        'master of statistics',
+        'ms in statistics',
+        'statistics faculty',
+        'statistics research'
+    ],
+    'stats_terms': ['statistics', 'statistical', 'statistician', 'probability',
+                    'data analysis', 'biostatistics', 'econometrics'],
+    'academic_terms': ['phd', 'graduate', 'faculty', 'research', 'degree',
+                       'program', 'course', 'curriculum'],
+
+    # Site search (search_university_site_for_stats)
+    'site_indicators': [
+        'department of statistics',
+        'statistics department',
+        'statistical science department',
+        'school of statistics',
+        'phd in statistics',
+        'graduate program in statistics',
+        'ms in statistics',
+        'statistics faculty'
+    ],
+    'stats_words': ['statistics', 'statistical'],
+    'program_terms': ['graduate', 'phd', 'faculty', 'research', 'program'],
+    'link_keywords': ['statistic', 'math', 'data science', 'biostat',
+                      'probability', 'analytics', 'quantitative',
+                      'computational', 'applied math'],
+    'link_href_keywords': ['stat', 'math'],
+    'skip_patterns': ['news', 'events', 'calendar', 'contact', 'about',
+                      'admissions', 'library', 'student'],
+
+    # Targeted search (search_with_google_style)
+    'definitive_signs': [
+        'department of statistics',
+        'statistics department',
+        'statistics faculty',
+        'phd statistics',
+        'graduate statistics',
+        'statistics program',
+        'statistical science'
+    ],
+
+    # Quick title check (FastStatsVerifier.quick_verify)
+    'title_terms': ['statistics', 'statistical', 'stat'],
+
+    # PhD requirement pages (PhDStatsRequirementsScraper)
+    'phd_indicators': [
+        'phd program', 'doctoral program', 'ph.d.', 'doctorate',
+        'graduate program', 'phd in statistics', 'doctoral statistics',
+        'admission requirements', 'application requirements'
+    ],
+    'phd_link_keywords': ['phd', 'doctoral', 'graduate', 'admission', 'apply'],
+    'research_keywords': [
+        'research areas', 'research interests', 'specializations',
+        'biostatistics', 'machine learning', 'data science',
+        'bayesian', 'computational', 'theoretical', 'applied statistics'
+    ],
+    'funding_keywords': [
+        'funding', 'assistantship', 'fellowship', 'scholarship',
+        'tuition waiver', 'stipend', 'financial support'
+    ],
+    'requirement_headings': [
+        'admission requirements', 'application requirements', 'prerequisites',
+        'requirements', 'how to apply', 'application process'
+    ]
+}
+
+
+def trie_pattern(terms):
+    """Regex source matching the longest of terms at a position, factored as a trie"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy: a longer term is preferred to a term ending here
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordHits:
+    """Substring hit counts of every classifier term in one text"""
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def has(self, term):
+        return term in self.counts
+
+    def count(self, term):
+        """Occurrences of term in the text (overlapping ones included)"""
+        return self.counts.get(term, 0)
+
+
+class KeywordClassifier:
+    """All indicator lists compiled once.
+
+    Yes/no questions about page text (any, distinct, found) use short-circuit
+    substring checks, which stop at the first hit and beat any single-pass
+    scan on the few terms each check needs. scan(text) is only for counting
+    occurrences: it counts every term in a single pass, with one Aho-Corasick
+    automaton when pyahocorasick is installed, otherwise with one compiled
+    alternation regex (a trie inside a lookahead, so findall() reports the
+    longest term starting at each position; the shorter terms that are
+    prefixes of it are counted from a table built here). matches(group, text)
+    tests short strings (link text, href, title) against one alternation
+    regex per group.
+    """
+
+    def __init__(self, groups=KEYWORD_GROUPS):
+        self.groups = {name: list(terms) for name, terms in groups.items()}
+        self.terms = sorted({term for terms in self.groups.values() for term in terms})
+        self.patterns = {
+            name: re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+            for name, terms in self.groups.items()
+        }
+        # Every term that is a prefix of term (itself included)
+        self.prefixes = {term: [other for other in self.terms if term.startswith(other)] for term in self.terms}
+        self.pattern = re.compile(f'(?=({trie_pattern(self.terms)}))')
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for term in self.terms:
+                self.automaton.add_word(term, term)
+            self.automaton.make_automaton()
+
+    @property
+    def engine(self):
+        return "aho-corasick" if self.automaton is not None else "regex"
+
+    def any(self, group, *texts):
+        """True if any term of group occurs in any of the texts; stops at the first hit"""
+        return any(term in text for term in self.groups[group] for text in texts)
+
+    def distinct(self, group, text):
+        """Number of different terms of group in text"""
+        return sum(1 for term in self.groups[group] if term in text)
+
+    def found(self, group, text):
+        """The terms of group that occur in text, in list order"""
+        return [term for term in self.groups[group] if term in text]
+
+    def scan(self, text):
+        """Occurrence counts of every term in text (pass lower-cased text; terms are lower case)"""
+        if self.automaton is not None:
+            return KeywordHits(Counter(term for _, term in self.automaton.iter(text)))
+        counts = Counter()
+        for longest, occurrences in Counter(self.pattern.findall(text)).items():
+            for term in self.prefixes[longest]:
+                counts[term] += occurrences
+        return KeywordHits(counts)
+
+    def matches(self, group, *texts):
+        """True if any term of group occurs in any of the (short) texts"""
+        # Terms never contain a newline, so joining cannot create a match across texts
+        return self.patterns[group].search(texts[0] if len(texts) == 1 else '\n'.join(texts)) is not None
+
+
+CLASSIFIER = KeywordClassifier()
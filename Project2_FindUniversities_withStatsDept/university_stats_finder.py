@@ -4,11 +4,21 @@ import json
 import time
 from urllib.parse import urljoin, urlparse
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent_verifier import ConcurrentVerifier, PoliteSession
+from dns_prefilter import DNSCache
+from http_cache import CachedSession
+from keyword_classifier import CLASSIFIER
 
 class UniversityStatsFinder:
-    def __init__(self):
+    def __init__(self, probe_workers=8):
         self.universities_with_stats = []
-        self.session = requests.Session()
+        self.probe_workers = max(1, probe_workers)  # Concurrent URL probes per university
+        self.probe_executor = None  # Shared by every probe_first_match call, see probe_pool()
+        self.probe_lock = threading.Lock()
+        self.dns = DNSCache()
+        self.session = CachedSession(requests.Session())
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
@@ -46,12 +56,9 @@ class UniversityStatsFinder:
         except Exception as e:
             print(f"Error loading universities from file: {str(e)}")
     
-    def find_statistics_department_url(self, university):
-        """Find the specific statistics department URL for a university"""
-        base_url = university['url'].rstrip('/')
-        
+    def subdomain_candidates(self, university):
+        """Statistics-related subdomains of a university's main domain"""
         # Extract domain for subdomain checking
-        from urllib.parse import urlparse
         parsed_url = urlparse(university['url'])
         domain_parts = parsed_url.netloc.split('.')
         
@@ -70,165 +77,155 @@ class UniversityStatsFinder:
                 f"https://data.{main_domain}",
                 f"https://datascience.{main_domain}"
             ]
+        return subdomain_patterns
+    
+    def find_statistics_department_url(self, university):
+        """Find the specific statistics department URL for a university"""
+        base_url = university['url'].rstrip('/')
         
-        # Much more comprehensive URL patterns
-        url_patterns = [
+        # Hostnames that don't resolve are dropped before any HTTP is attempted
+        subdomain_patterns = self.dns.filter(self.subdomain_candidates(university))
+        
+        # Much more comprehensive URL patterns, in priority tiers: every
+        # pattern in a tier is probed at once, tiers run in order
+        path_tiers = [
             # Direct statistics patterns
-            '/statistics', '/stats', '/stat',
-            '/department-of-statistics', '/dept-of-statistics',
-            '/departments/statistics', '/depts/statistics',
-            '/academics/statistics', '/academic/statistics',
-            '/schools/statistics', '/school-of-statistics',
-            '/colleges/statistics', '/college-of-statistics',
+            ['/statistics', '/stats', '/stat',
+             '/department-of-statistics', '/dept-of-statistics',
+             '/departments/statistics', '/depts/statistics',
+             '/academics/statistics', '/academic/statistics',
+             '/schools/statistics', '/school-of-statistics',
+             '/colleges/statistics', '/college-of-statistics'],
             
             # Math + Statistics combined departments
-            '/mathematics-statistics', '/math-statistics', '/math-stat',
-            '/mathematical-sciences', '/math-sciences',
-            '/departments/mathematics-statistics',
-            '/departments/math-stat', '/departments/mathematical-sciences',
-            '/math-and-statistics', '/mathematics-and-statistics',
-            
-            # Statistical Science variations
-            '/statistical-science', '/statistical-sciences',
-            '/dept-statistical-science', '/department-statistical-science',
+            ['/mathematics-statistics', '/math-statistics', '/math-stat',
+             '/mathematical-sciences', '/math-sciences',
+             '/departments/mathematics-statistics',
+             '/departments/math-stat', '/departments/mathematical-sciences',
+             '/math-and-statistics', '/mathematics-and-statistics'],
             
-            # Data Science (often includes statistics)
-            '/statistics-data-science', '/data-science-statistics',
-            '/statistics-and-data-science',
+            # Statistical Science variations and Data Science (often includes statistics)
+            ['/statistical-science', '/statistical-sciences',
+             '/dept-statistical-science', '/department-statistical-science',
+             '/statistics-data-science', '/data-science-statistics',
+             '/statistics-and-data-science'],
             
             # Biostatistics
-            '/biostatistics', '/biostat', '/biostats',
-            '/departments/biostatistics',
-            
-            # Graduate/Program specific
-            '/programs/statistics', '/graduate/statistics',
-            '/graduate-programs/statistics',
-            '/phd/statistics', '/doctoral/statistics',
-            
-            # College/School specific patterns
-            '/cas/statistics', '/liberal-arts/statistics',
-            '/arts-sciences/statistics', '/college-arts-sciences/statistics',
-            '/school-of-arts-and-sciences/statistics',
+            ['/biostatistics', '/biostat', '/biostats',
+             '/departments/biostatistics'],
             
-            # Common university-specific patterns
-            '/academics/departments/statistics',
-            '/academic-departments/statistics',
-            '/faculty/statistics', '/research/statistics',
-            
-            # Alternative naming
-            '/applied-statistics', '/theoretical-statistics',
-            '/computational-statistics'
+            # Graduate/Program specific, college/school specific, common
+            # university-specific patterns and alternative naming
+            ['/programs/statistics', '/graduate/statistics',
+             '/graduate-programs/statistics',
+             '/phd/statistics', '/doctoral/statistics',
+             '/cas/statistics', '/liberal-arts/statistics',
+             '/arts-sciences/statistics', '/college-arts-sciences/statistics',
+             '/school-of-arts-and-sciences/statistics',
+             '/academics/departments/statistics',
+             '/academic-departments/statistics',
+             '/faculty/statistics', '/research/statistics',
+             '/applied-statistics', '/theoretical-statistics',
+             '/computational-statistics']
         ]
         
         print(f"  Searching URL patterns for {university['name']}...")
         
         # First try subdomain patterns (higher success rate)
         print(f"    Trying subdomains...")
-        for subdomain_url in subdomain_patterns:
-            try:
-                response = self.session.get(subdomain_url, timeout=5)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    text_content = soup.get_text().lower()
-                    title = soup.find('title')
-                    title_text = title.get_text().lower() if title else ""
-                    
-                    # Enhanced content validation
-                    strong_indicators = [
-                        'department of statistics',
-                        'statistics department',
-                        'statistical science department',
-                        'phd in statistics',
-                        'doctorate in statistics',
-                        'graduate program in statistics',
-                        'master of statistics',
-                        'ms in statistics',
-                        'statistics faculty',
-                        'statistics research'
-                    ]
-                    
-                    # Check for strong indicators in title or content
-                    strong_match = any(indicator in title_text or indicator in text_content 
-                                     for indicator in strong_indicators)
-                    
-                    if strong_match:
-                        print(f"    ✓ SUBDOMAIN MATCH found: {subdomain_url}")
-                        return subdomain_url
-                    
-                    # Fallback: check for multiple stats-related terms
-                    stats_terms = ['statistics', 'statistical', 'statistician', 'probability', 
-                                  'data analysis', 'biostatistics', 'econometrics']
-                    academic_terms = ['phd', 'graduate', 'faculty', 'research', 'degree', 
-                                    'program', 'course', 'curriculum']
-                    
-                    stats_count = sum(1 for term in stats_terms if term in text_content)
-                    academic_count = sum(1 for term in academic_terms if term in text_content)
-                    
-                    if stats_count >= 3 and academic_count >= 2:
-                        print(f"    ✓ SUBDOMAIN PATTERN MATCH found: {subdomain_url}")
-                        return subdomain_url
-                
-                time.sleep(0.3)
-                
-            except Exception as e:
-                continue
+        subdomain_url, match = self.probe_first_match(subdomain_patterns)
+        if subdomain_url:
+            label = "SUBDOMAIN MATCH" if match == 'strong' else "SUBDOMAIN PATTERN MATCH"
+            print(f"    ✓ {label} found: {subdomain_url}")
+            return subdomain_url
         
         # Then try URL path patterns
         print(f"    Trying URL paths...")
-        for pattern in url_patterns:
-            try:
-                test_url = base_url + pattern
-                response = self.session.get(test_url, timeout=5)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    text_content = soup.get_text().lower()
-                    title = soup.find('title')
-                    title_text = title.get_text().lower() if title else ""
-                    
-                    # Enhanced content validation
-                    strong_indicators = [
-                        'department of statistics',
-                        'statistics department',
-                        'statistical science department',
-                        'phd in statistics',
-                        'doctorate in statistics',
-                        'graduate program in statistics',
-                        'master of statistics',
-                        'ms in statistics',
-                        'statistics faculty',
-                        'statistics research'
-                    ]
-                    
-                    # Check for strong indicators in title or content
-                    strong_match = any(indicator in title_text or indicator in text_content 
-                                     for indicator in strong_indicators)
-                    
-                    if strong_match:
-                        print(f"    ✓ STRONG MATCH found: {test_url}")
-                        return test_url
-                    
-                    # Fallback: check for multiple stats-related terms
-                    stats_terms = ['statistics', 'statistical', 'statistician', 'probability', 
-                                  'data analysis', 'biostatistics', 'econometrics']
-                    academic_terms = ['phd', 'graduate', 'faculty', 'research', 'degree', 
-                                    'program', 'course', 'curriculum']
-                    
-                    stats_count = sum(1 for term in stats_terms if term in text_content)
-                    academic_count = sum(1 for term in academic_terms if term in text_content)
-                    
-                    if stats_count >= 3 and academic_count >= 2:
-                        print(f"    ✓ PATTERN MATCH found: {test_url}")
-                        return test_url
-                
-                time.sleep(0.3)
-                
-            except Exception as e:
-                continue
+        for tier in path_tiers:
+            test_url, match = self.probe_first_match(self.dns.filter([base_url + pattern for pattern in tier]))
+            if test_url:
+                label = "STRONG MATCH" if match == 'strong' else "PATTERN MATCH"
+                print(f"    ✓ {label} found: {test_url}")
+                return test_url
         
         return None
     
+    def check_department_page(self, url, timeout=5, stop=None):
+        """Return 'strong' or 'pattern' if url looks like a statistics department page, else None
+        
+        Once stop is set the page is no longer wanted: nothing is fetched or parsed.
+        """
+        if stop is not None and stop.is_set():
+            return None
+        try:
+            if stop is not None and isinstance(self.session, PoliteSession):
+                # Stops waiting for a request slot as soon as the result is known
+                response = self.session.get(url, timeout=timeout, stop=stop)
+            else:
+                response = self.session.get(url, timeout=timeout)
+        except Exception:
+            return None
+        
+        if response.status_code != 200 or (stop is not None and stop.is_set()):
+            return None
+        
+        soup = BeautifulSoup(response.content, 'html.parser')
+        text_content = soup.get_text().lower()
+        title = soup.find('title')
+        title_text = title.get_text().lower() if title else ""
+        
+        # Check for strong indicators in title or content
+        if CLASSIFIER.any('strong_indicators', title_text, text_content):
+            return 'strong'
+        
+        # Fallback: check for multiple stats-related terms
+        stats_count = CLASSIFIER.distinct('stats_terms', text_content)
+        academic_count = CLASSIFIER.distinct('academic_terms', text_content)
+        
+        if stats_count >= 3 and academic_count >= 2:
+            return 'pattern'
+        
+        return None
+    
+    def probe_pool(self, max_workers=None):
+        """The executor every probe_first_match call submits to, created on first use"""
+        with self.probe_lock:
+            if self.probe_executor is None:
+                self.probe_executor = ThreadPoolExecutor(max_workers=max_workers or self.probe_workers,
+                                                         thread_name_prefix='probe')
+            return self.probe_executor
+    
+    def close_probe_pool(self):
+        with self.probe_lock:
+            executor, self.probe_executor = self.probe_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def probe_first_match(self, urls):
+        """Probe urls concurrently; return (url, match) of the first one in list order that matches.
+        
+        A later URL that matches early still waits for the earlier ones, so the
+        result is the same as probing in order. Once it is known, the stop event
+        makes the remaining probes skip their request, or give up the request
+        slot they are waiting for, and their results are ignored.
+        """
+        if not urls:
+            return None, None
+        
+        stop = threading.Event()
+        executor = self.probe_pool()
+        futures = [executor.submit(self.check_department_page, url, 5, stop) for url in urls]
+        try:
+            for url, future in zip(urls, futures):
+                match = future.result()
+                if match:
+                    return url, match
+            return None, None
+        finally:
+            stop.set()
+            for future in futures:
+                future.cancel()
+    
     def search_university_site_for_stats(self, university):
         """Search the university's main site for statistics department links"""
         try:
@@ -247,20 +244,12 @@ class UniversityStatsFinder:
                     text = link.get_text().strip().lower()
                     title = link.get('title', '').lower()
                     
-                    # Enhanced keyword matching
-                    stats_keywords = [
-                        'statistic', 'math', 'data science', 'biostat',
-                        'probability', 'analytics', 'quantitative',
-                        'computational', 'applied math'
-                    ]
-                    
                     # Prioritize links with strong statistical indicators
-                    if any(keyword in text for keyword in ['statistics', 'statistical']):
+                    if CLASSIFIER.matches('stats_words', text):
                         potential_links.insert(0, (href, text, 'high_priority'))
-                    elif any(keyword in href for keyword in ['stat', 'math']):
+                    elif CLASSIFIER.matches('link_href_keywords', href):
                         potential_links.insert(0, (href, text, 'medium_priority'))  
-                    elif any(keyword in href or keyword in text or keyword in title 
-                           for keyword in stats_keywords):
+                    elif CLASSIFIER.matches('link_keywords', href, text, title):
                         potential_links.append((href, text, 'low_priority'))
                 
                 # Test potential links
@@ -278,9 +267,7 @@ class UniversityStatsFinder:
                         full_url = university['url'].rstrip('/') + '/' + href
                     
                     # Skip obvious non-department pages
-                    skip_patterns = ['news', 'events', 'calendar', 'contact', 'about', 
-                                   'admissions', 'library', 'student']
-                    if any(pattern in href for pattern in skip_patterns):
+                    if CLASSIFIER.matches('skip_patterns', href):
                         continue
                     
                     try:
@@ -294,28 +281,15 @@ class UniversityStatsFinder:
                             test_title = test_soup.find('title')
                             test_title_text = test_title.get_text().lower() if test_title else ""
                             
-                            # Strong indicators of statistics department
-                            strong_indicators = [
-                                'department of statistics',
-                                'statistics department',
-                                'statistical science department',
-                                'school of statistics',
-                                'phd in statistics',
-                                'graduate program in statistics',
-                                'ms in statistics',
-                                'statistics faculty'
-                            ]
-                            
                             # Check title and content for strong matches
-                            if any(indicator in test_title_text or indicator in test_content 
-                                 for indicator in strong_indicators):
+                            if CLASSIFIER.any('site_indicators', test_title_text, test_content):
                                 print(f"    ✓ FOUND via site search: {full_url}")
                                 return full_url
                             
                             # Medium strength check
-                            if ('statistics' in test_content and 
-                                any(term in test_content for term in ['graduate', 'phd', 'faculty', 'research', 'program'])):
-                                stats_count = test_content.count('statistics') + test_content.count('statistical')
+                            if 'statistics' in test_content and CLASSIFIER.any('program_terms', test_content):
+                                hits = CLASSIFIER.scan(test_content)
+                                stats_count = hits.count('statistics') + hits.count('statistical')
                                 if stats_count >= 5:  # Must mention statistics multiple times
                                     print(f"    ✓ FOUND via content analysis: {full_url}")
                                     return full_url
@@ -323,7 +297,9 @@ class UniversityStatsFinder:
                     except Exception as e:
                         continue
                     
-                    time.sleep(0.2)
+                    # Cache hits never reached the server, so they need no pause
+                    if not getattr(test_response, 'from_cache', False):
+                        time.sleep(0.2)
             
         except Exception as e:
             print(f"    Error in site search: {str(e)}")
@@ -380,23 +356,14 @@ class UniversityStatsFinder:
                                             test_content = test_soup.get_text().lower()
                                             
                                             # Look for definitive signs of a statistics department
-                                            definitive_signs = [
-                                                'department of statistics',
-                                                'statistics department',
-                                                'statistics faculty',
-                                                'phd statistics',
-                                                'graduate statistics',
-                                                'statistics program',
-                                                'statistical science'
-                                            ]
-                                            
-                                            if any(sign in test_content for sign in definitive_signs):
+                                            if CLASSIFIER.any('definitive_signs', test_content):
                                                 print(f"    ✓ FOUND via targeted search: {full_url}")
                                                 return full_url
                                     except:
                                         continue
                     
-                    time.sleep(0.5)
+                    if not getattr(response, 'from_cache', False):
+                        time.sleep(0.5)
                         
                 except Exception as e:
                     continue
@@ -504,8 +471,8 @@ class UniversityStatsFinder:
         print(f"Success rate: {(has_stats_count/verified_count)*100:.1f}%" if verified_count > 0 else "0%")
         print("="*80)
     
-    def run(self, max_verify=20):
-        """Main execution method"""
+    def run(self, max_verify=20, concurrency=16, per_host=4):
+        """Main execution method (concurrency=1 verifies one university at a time)"""
         print("Starting comprehensive verification of US universities with Statistics departments...")
         
         # Load list of universities from file
@@ -516,20 +483,36 @@ class UniversityStatsFinder:
         print("=" * 80)
         
         # Verify universities (limit to avoid overwhelming servers during demo)
-        verified_count = 0
-        for i, university in enumerate(self.universities_with_stats):
-            if verified_count >= max_verify:
-                break
-                
-            self.verify_statistics_department(university)
-            verified_count += 1
-            
-            # Add a small delay to be respectful to servers
-            time.sleep(0.5)
+        to_verify = self.universities_with_stats[:max_verify]
+        
+        # Resolve every candidate hostname up front, so dead subdomains cost nothing later
+        self.dns.resolve_urls([url for university in to_verify
+                               for url in [university['url']] + self.subdomain_candidates(university)])
+        # One probe pool for the whole run, wide enough for every university in flight
+        self.probe_pool(max_workers=self.probe_workers * max(1, concurrency))
+        try:
+            if concurrency > 1:
+                # Many universities at once; the per-host limit keeps each site's load polite
+                print(f"Verifying {concurrency} universities at a time (max {per_host} requests per host)")
+                engine = ConcurrentVerifier(self, concurrency=concurrency, max_requests=concurrency * 2,
+                                            per_host=per_host)
+                engine.run(to_verify, self.verify_statistics_department)
+                engine.print_summary()
+            else:
+                for university in to_verify:
+                    self.verify_statistics_department(university)
+                    
+                    # Add a small delay to be respectful to servers
+                    time.sleep(0.5)
+        finally:
+            self.close_probe_pool()
         
         print("\n" + "=" * 80)
         print("VERIFICATION COMPLETE")
         print("=" * 80)
+        print(f"Skipped {self.dns.dropped} probes of hostnames that do not exist")
+        self.session.print_summary()
+        self.session.close()
         
         # Print and save results
         self.print_results()
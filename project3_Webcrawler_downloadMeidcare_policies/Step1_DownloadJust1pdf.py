@@ -10,6 +10,10 @@ import asyncio
 from playwright.async_api import async_playwright
 import os
 from datetime import datetime
+from lcd_session import new_consented_context, ensure_license_accepted
+from lcd_readiness import PageReadiness
+from lcd_route_filter import RouteFilter
+from lcd_config import lcd_url as build_lcd_url
 
 async def download_lcd_policy_as_pdf():
     """
@@ -18,7 +22,7 @@ async def download_lcd_policy_as_pdf():
     """
     
     # LCD URL for Glucose Monitors policy
-    lcd_url = "https://www.cms.gov/medicare-coverage-database/view/lcd.aspx?LCDId=33822&DocID=L33822"
+    lcd_url = build_lcd_url(33822, "L33822")
     
     # Create output directory if it doesn't exist
     output_dir = "downloaded_policies"
@@ -31,35 +35,33 @@ async def download_lcd_policy_as_pdf():
     async with async_playwright() as p:
         # Launch browser (use chromium for best PDF rendering)
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+        context = await new_consented_context(browser)
+        route_filter = RouteFilter("render")
+        await route_filter.attach(context)
+        page = await context.new_page()
+        readiness = PageReadiness()
+        readiness.attach(page)
         
         try:
             print(f"Loading LCD policy from: {lcd_url}")
             
             # Navigate to the LCD policy page
-            await page.goto(lcd_url, wait_until="networkidle")
+            await page.goto(lcd_url, wait_until="domcontentloaded")
             
-            # Wait for initial page load
-            await page.wait_for_timeout(2000)
-            
-            # Look for and click "I Accept" button if it exists
+            # The saved session normally skips the "I Accept" page; accept
+            # again only if it has expired
             try:
-                print("Looking for 'I Accept' button...")
-                accept_button = await page.wait_for_selector("input[value='I Accept'], button:has-text('I Accept'), input[type='submit'][value*='Accept']", timeout=5000)
-                if accept_button:
-                    print("Found 'I Accept' button, clicking...")
-                    await accept_button.click()
-                    # Wait for page to load after accepting terms
-                    await page.wait_for_timeout(3000)
-                    print("Terms accepted, page loaded")
-                else:
-                    print("No 'I Accept' button found, proceeding...")
+                if await ensure_license_accepted(page):
+                    print("Consent session expired, terms accepted again")
             except Exception as e:
-                print(f"No 'I Accept' button found or error clicking: {e}")
+                print(f"Error accepting terms: {e}")
                 # Continue anyway in case the button isn't needed
             
-            # Wait for content to fully load
-            await page.wait_for_timeout(2000)
+            # Wait for the policy body, fonts and pending XHRs to settle
+            if await readiness.wait(page):
+                print(f"Page ready after {readiness.last_wait:.2f}s")
+            else:
+                print(f"Page not fully ready after {readiness.last_wait:.2f}s, printing anyway")
             
             print("Generating PDF...")
             
@@ -83,6 +85,7 @@ async def download_lcd_policy_as_pdf():
             
             print(f"✅ PDF successfully saved as: {pdf_filename}")
             print(f"📁 File size: {os.path.getsize(pdf_filename) / (1024*1024):.2f} MB")
+            route_filter.print_summary()
             
         except Exception as e:
             print(f"❌ Error downloading LCD policy: {str(e)}")
@@ -7,21 +7,48 @@ This script will:
 1. Navigate to the CMS Medicare Coverage Database search page
 2. Search for all LCD policies 
 3. Extract all LCD URLs with their policy IDs and titles
-4. Save the results to All_urls.json
+4. Stream each LCD found to the shared catalog (lcd_catalog.jsonl)
+
+Links are harvested with one in-page evaluation per page (all href/text pairs
+at once). When the search pager uses plain page-number URLs, result pages are
+fetched in parallel tabs instead of clicking "Next" one page at a time.
 """
 
 import asyncio
 from playwright.async_api import async_playwright
-import json
 import re
 from datetime import datetime
 import time
+from urllib.parse import urljoin
+from lcd_session import new_consented_context, ensure_license_accepted
+from lcd_readiness import PageReadiness, ANY_PAGE_SELECTOR
+from lcd_route_filter import RouteFilter
+from lcd_http_validator import LCDHttpValidator, HTTP_VALIDATION_AVAILABLE, AMBIGUOUS
+from lcd_catalog import LCDCatalog, CATALOG_FILE
+from lcd_config import mcd_url, lcd_url, SITE_ROOT
+
+# Returns [[href, text], ...] for every anchor matching selector, in one round-trip
+LINK_HARVEST_SCRIPT = """
+(selector) => Array.from(document.querySelectorAll(selector),
+                         a => [a.getAttribute('href'), a.innerText || ''])
+"""
+
+LCD_LINK_SELECTOR = "a[href*='lcd.aspx'], a[href*='LCDId='], a[href*='DocID=L']"
+RESULT_LINK_SELECTOR = "a[href*='LCDId=']"
+PAGER_LINK_SELECTOR = "a[href]"
+
+# Page number parameter of a paginated search URL
+PAGE_PARAM_PATTERN = r'([?&](?:page|pagenum|pageindex|pg|p)=)(\d+)'
 
 class LCDPolicyFinder:
-    def __init__(self):
-        self.base_url = "https://www.cms.gov/medicare-coverage-database/search.aspx"
+    def __init__(self, page_concurrency=4):
+        self.base_url = mcd_url("search.aspx")
+        self.page_concurrency = page_concurrency
         self.lcd_urls = []
         self.processed_ids = set()
+        self.catalog = LCDCatalog(source="Step2_Find_allPolicy_URLs")
+        self.readiness = PageReadiness(body_selector=ANY_PAGE_SELECTOR)
+        self.route_filter = RouteFilter("discovery")
 
     async def search_lcd_policies(self, page, search_term="", page_num=1):
         """Search for LCD policies using the CMS search interface."""
@@ -30,15 +57,12 @@ class LCDPolicyFinder:
             print(f"Searching page {page_num} with term: '{search_term}'")
             
             # Navigate to search page
-            await page.goto(self.base_url, wait_until="networkidle")
-            await page.wait_for_timeout(2000)
+            await page.goto(self.base_url, wait_until="domcontentloaded")
+            await self.readiness.wait(page)
             
-            # Handle "I Accept" if it appears
+            # Accept the license only if the saved session has expired
             try:
-                accept_button = await page.wait_for_selector("input[value='I Accept'], button:has-text('I Accept')", timeout=3000)
-                if accept_button:
-                    await accept_button.click()
-                    await page.wait_for_timeout(2000)
+                await ensure_license_accepted(page)
             except:
                 pass
             
@@ -65,13 +89,13 @@ class LCDPolicyFinder:
                 search_button = await page.wait_for_selector("input[type='submit'], button[type='submit']", timeout=5000)
                 if search_button:
                     await search_button.click()
-                    await page.wait_for_timeout(3000)
+                    await self.readiness.wait(page)
                     print("Search submitted")
             except Exception as e:
                 print(f"Could not find search button: {e}")
             
-            # Extract LCD links from results
-            await self.extract_lcd_links(page)
+            # Extract LCD links from every result page
+            await self.extract_all_lcd_results(page)
             
         except Exception as e:
             print(f"Error in search: {e}")
@@ -81,140 +105,189 @@ class LCDPolicyFinder:
         
         try:
             # Wait for results to load
-            await page.wait_for_timeout(3000)
+            await self.readiness.wait(page)
             
-            # Look for LCD links in various possible formats
-            lcd_link_selectors = [
-                "a[href*='lcd.aspx']",
-                "a[href*='LCDId=']",
-                "a[href*='DocID=L']",
-                "a:has-text('L')"
-            ]
-            
-            for selector in lcd_link_selectors:
-                try:
-                    links = await page.query_selector_all(selector)
-                    for link in links:
-                        href = await link.get_attribute('href')
-                        text = await link.inner_text()
-                        
-                        if href and 'lcd.aspx' in href and 'LCDId=' in href:
-                            # Extract LCD ID
-                            lcd_id_match = re.search(r'LCDId=(\d+)', href)
-                            doc_id_match = re.search(r'DocID=(L\d+)', href)
-                            
-                            if lcd_id_match and doc_id_match:
-                                lcd_id = lcd_id_match.group(1)
-                                doc_id = doc_id_match.group(1)
-                                
-                                if lcd_id not in self.processed_ids:
-                                    full_url = href if href.startswith('http') else f"https://www.cms.gov{href}"
-                                    
-                                    policy_info = {
-                                        "lcd_id": lcd_id,
-                                        "doc_id": doc_id,
-                                        "title": text.strip() if text else f"LCD Policy {doc_id}",
-                                        "url": full_url,
-                                        "found_date": datetime.now().isoformat()
-                                    }
-                                    
-                                    self.lcd_urls.append(policy_info)
-                                    self.processed_ids.add(lcd_id)
-                                    print(f"Found LCD {doc_id}: {text.strip()[:50]}...")
-                
-                except Exception as e:
-                    continue
+            links = await self.harvest_links(page, LCD_LINK_SELECTOR)
+            for href, text in links:
+                policy_info = self.add_lcd_link(href, text, require_doc_id=True)
+                if policy_info:
+                    print(f"Found LCD {policy_info['doc_id']}: {policy_info['title'][:50]}...")
             
             print(f"Total unique LCDs found so far: {len(self.lcd_urls)}")
             
         except Exception as e:
             print(f"Error extracting links: {e}")
 
+    async def harvest_links(self, page, selector):
+        """Return (href, text) for every anchor matching selector in a single evaluation."""
+        try:
+            return await page.evaluate(LINK_HARVEST_SCRIPT, selector)
+        except Exception:
+            return []
+
+    def add_lcd_link(self, href, text, require_doc_id=False):
+        """Record an LCD link if it is new. Returns its policy info, or None."""
+        
+        if not href or 'lcd.aspx' not in href or 'LCDId=' not in href:
+            return None
+        
+        # Extract LCD ID and Doc ID
+        lcd_id_match = re.search(r'LCDId=(\d+)', href)
+        doc_id_match = re.search(r'DocID=(L\d+)', href)
+        if not doc_id_match and not require_doc_id:
+            doc_id_match = re.search(r'(L\d+)', text or "")
+        
+        if not lcd_id_match or (require_doc_id and not doc_id_match):
+            return None
+        
+        lcd_id = lcd_id_match.group(1)
+        if lcd_id in self.processed_ids:
+            return None
+        
+        doc_id = doc_id_match.group(1) if doc_id_match else f"L{lcd_id}"
+        full_url = href if href.startswith('http') else f"{SITE_ROOT}{href}"
+        
+        policy_info = {
+            "lcd_id": lcd_id,
+            "doc_id": doc_id,
+            "title": text.strip() if text and text.strip() else f"LCD Policy {doc_id}",
+            "url": full_url,
+            "found_date": datetime.now().isoformat()
+        }
+        
+        self.lcd_urls.append(policy_info)
+        self.processed_ids.add(lcd_id)
+        self.catalog.add(policy_info)
+        return policy_info
+
+    def harvest_results(self, links):
+        """Record LCD links from a result page. Returns how many were new."""
+        return sum(1 for href, text in links if self.add_lcd_link(href, text))
+
+    def find_page_links(self, base_url, links):
+        """
+        Map page number -> URL for pager links that use a plain page-number parameter.
+        
+        Pages skipped by the pager ("1 2 ... 9 Next") are filled in from the
+        URL pattern. Script-driven pagers (javascript: postbacks) yield an empty dict.
+        """
+        pages = {}
+        template = None
+        for href, _ in links:
+            if not href or href.lower().startswith('javascript'):
+                continue
+            url = urljoin(base_url, href)
+            match = re.search(PAGE_PARAM_PATTERN, url, re.IGNORECASE)
+            if match:
+                pages[int(match.group(2))] = url
+                template = (url[:match.start(2)], url[match.end(2):])
+        
+        if template:
+            for page_num in range(2, max(pages)):
+                pages.setdefault(page_num, f"{template[0]}{page_num}{template[1]}")
+        return pages
+
     async def extract_all_lcd_results(self, page):
         """Extract all LCD results from search results page with pagination."""
         
-        page_num = 1
         max_pages = 50  # Safety limit
         
-        while page_num <= max_pages:
+        print("Processing results page 1...")
+        await self.readiness.wait(page)
+        new_count = self.harvest_results(await self.harvest_links(page, RESULT_LINK_SELECTOR))
+        print(f"Found {new_count} new LCD policies on page 1")
+        
+        page_links = self.find_page_links(page.url, await self.harvest_links(page, PAGER_LINK_SELECTOR))
+        if page_links:
+            await self.fetch_result_pages(page.context, page_links, max_pages)
+        elif new_count > 0:
+            await self.click_through_result_pages(page, max_pages)
+        
+        print(f"Completed pagination. Total LCDs found: {len(self.lcd_urls)}")
+
+    async def fetch_result_pages(self, context, page_links, max_pages):
+        """Load result pages by URL in parallel tabs, following pager links found on each page."""
+        
+        queue = asyncio.Queue()
+        scheduled = {1}
+        
+        def schedule(links):
+            for page_num, url in sorted(links.items()):
+                if page_num not in scheduled and page_num <= max_pages:
+                    scheduled.add(page_num)
+                    queue.put_nowait((page_num, url))
+        
+        async def worker(tab):
+            while True:
+                page_num, url = await queue.get()
+                try:
+                    await tab.goto(url, wait_until="domcontentloaded")
+                    await self.readiness.wait(tab)
+                    new_count = self.harvest_results(await self.harvest_links(tab, RESULT_LINK_SELECTOR))
+                    print(f"Found {new_count} new LCD policies on page {page_num}")
+                    
+                    # Pagers often show a window of page numbers; pick up the next ones
+                    schedule(self.find_page_links(tab.url, await self.harvest_links(tab, PAGER_LINK_SELECTOR)))
+                except Exception as e:
+                    print(f"Error on page {page_num}: {e}")
+                finally:
+                    queue.task_done()
+        
+        schedule(page_links)
+        print(f"Fetching result pages with {self.page_concurrency} tabs...")
+        tabs = []
+        workers = []
+        try:
+            for _ in range(self.page_concurrency):
+                tab = await context.new_page()
+                self.readiness.attach(tab)
+                tabs.append(tab)
+            workers = [asyncio.create_task(worker(tab)) for tab in tabs]
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for tab in tabs:
+                await tab.close()
+        
+        print(f"Fetched {len(scheduled)} result pages")
+
+    async def click_through_result_pages(self, page, max_pages):
+        """Fallback for script-driven pagers: click "Next" until no new results appear."""
+        
+        page_num = 1
+        while page_num < max_pages:
             try:
-                print(f"Processing results page {page_num}...")
-                
-                # Wait for results to load
-                await page.wait_for_timeout(3000)
-                
-                # Extract LCD links from current page
-                initial_count = len(self.lcd_urls)
-                
-                # Look for result links in table or list format
-                result_selectors = [
-                    "a[href*='lcd.aspx?LCDId=']",
-                    "table a[href*='LCDId=']",
-                    ".searchResults a[href*='lcd.aspx']",
-                    "tr a[href*='LCDId=']"
-                ]
+                next_link = await page.query_selector("a:has-text('Next'), a:has-text('>'), a[title*='Next']")
+                if not next_link:
+                    print("No next page found")
+                    break
                 
-                for selector in result_selectors:
-                    try:
-                        links = await page.query_selector_all(selector)
-                        for link in links:
-                            href = await link.get_attribute('href')
-                            text = await link.inner_text()
-                            
-                            if href and 'lcd.aspx' in href and 'LCDId=' in href:
-                                # Extract LCD ID and Doc ID
-                                lcd_id_match = re.search(r'LCDId=(\d+)', href)
-                                doc_id_match = re.search(r'DocID=(L\d+)', href) or re.search(r'(L\d+)', text)
-                                
-                                if lcd_id_match:
-                                    lcd_id = lcd_id_match.group(1)
-                                    doc_id = doc_id_match.group(1) if doc_id_match else f"L{lcd_id}"
-                                    
-                                    if lcd_id not in self.processed_ids:
-                                        full_url = href if href.startswith('http') else f"https://www.cms.gov{href}"
-                                        
-                                        policy_info = {
-                                            "lcd_id": lcd_id,
-                                            "doc_id": doc_id,
-                                            "title": text.strip() if text else f"LCD Policy {doc_id}",
-                                            "url": full_url,
-                                            "found_date": datetime.now().isoformat()
-                                        }
-                                        
-                                        self.lcd_urls.append(policy_info)
-                                        self.processed_ids.add(lcd_id)
-                    except:
-                        continue
+                await next_link.click()
+                await self.readiness.wait(page)
+                page_num += 1
                 
-                new_count = len(self.lcd_urls) - initial_count
+                print(f"Processing results page {page_num}...")
+                new_count = self.harvest_results(await self.harvest_links(page, RESULT_LINK_SELECTOR))
                 print(f"Found {new_count} new LCD policies on page {page_num}")
-                
-                # Look for next page link
-                try:
-                    next_link = await page.query_selector("a:has-text('Next'), a:has-text('>'), a[title*='Next']")
-                    if next_link and new_count > 0:
-                        await next_link.click()
-                        await page.wait_for_timeout(3000)
-                        page_num += 1
-                    else:
-                        print("No more pages or no new results found")
-                        break
-                except:
-                    print("No next page found")
+                if new_count == 0:
+                    print("No more pages or no new results found")
                     break
                     
             except Exception as e:
                 print(f"Error on page {page_num}: {e}")
                 break
-        
-        print(f"Completed pagination. Total LCDs found: {len(self.lcd_urls)}")
 
     async def comprehensive_search(self):
         """Perform comprehensive search for all LCD policies."""
         
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+            context = await new_consented_context(browser)
+            await self.route_filter.attach(context)
+            page = await context.new_page()
+            self.readiness.attach(page)
             
             try:
                 print("🔍 Starting LCD policy search...")
@@ -224,32 +297,33 @@ class LCDPolicyFinder:
                 await self.search_via_keyword(page)
                 await self.try_known_lcd_patterns(page)
                 
+                self.readiness.print_summary()
+                self.route_filter.print_summary()
+                
             except Exception as e:
                 print(f"Error in comprehensive search: {e}")
             finally:
+                self.catalog.close()
                 await browser.close()
 
     async def search_via_reports(self, page):
         """Search using LCD report pages."""
         
         report_urls = [
-            "https://www.cms.gov/medicare-coverage-database/reports/finallcdalphabeticalreport.aspx",
-            "https://www.cms.gov/medicare-coverage-database/reports/finallcdcontractorreport.aspx",
-            "https://www.cms.gov/medicare-coverage-database/reports/finallcdstatereport.aspx"
+            mcd_url("reports/finallcdalphabeticalreport.aspx"),
+            mcd_url("reports/finallcdcontractorreport.aspx"),
+            mcd_url("reports/finallcdstatereport.aspx")
         ]
         
         for url in report_urls:
             try:
                 print(f"Checking LCD report: {url}")
-                await page.goto(url, wait_until="networkidle")
-                await page.wait_for_timeout(2000)
+                await page.goto(url, wait_until="domcontentloaded")
+                await self.readiness.wait(page)
                 
-                # Handle "I Accept" if needed
+                # Accept the license only if the saved session has expired
                 try:
-                    accept_button = await page.wait_for_selector("input[value='I Accept']", timeout=2000)
-                    if accept_button:
-                        await accept_button.click()
-                        await page.wait_for_timeout(2000)
+                    await ensure_license_accepted(page)
                 except:
                     pass
                 
@@ -263,15 +337,12 @@ class LCDPolicyFinder:
         """Search using keyword search."""
         
         try:
-            await page.goto(self.base_url, wait_until="networkidle")
-            await page.wait_for_timeout(2000)
+            await page.goto(self.base_url, wait_until="domcontentloaded")
+            await self.readiness.wait(page)
             
-            # Handle "I Accept" if needed
+            # Accept the license only if the saved session has expired
             try:
-                accept_button = await page.wait_for_selector("input[value='I Accept']", timeout=2000)
-                if accept_button:
-                    await accept_button.click()
-                    await page.wait_for_timeout(2000)
+                await ensure_license_accepted(page)
             except:
                 pass
             
@@ -283,53 +354,79 @@ class LCDPolicyFinder:
                 search_button = await page.query_selector("input[type='submit'], button[type='submit']")
                 if search_button:
                     await search_button.click()
-                    await page.wait_for_timeout(3000)
-                    await self.extract_lcd_links(page)
+                    await self.readiness.wait(page)
+                    await self.extract_all_lcd_results(page)
             
         except Exception as e:
             print(f"Error in keyword search: {e}")
 
+    async def check_lcd_id_in_browser(self, page, lcd_id):
+        """Load an LCD ID in the browser and return its policy info if it is a real LCD."""
+        
+        try:
+            test_url = lcd_url(lcd_id)
+            await page.goto(test_url, wait_until="domcontentloaded")
+            await self.readiness.wait(page)
+            
+            # Check if this is a valid LCD page
+            title = await page.title()
+            if "LCD" in title and "Error" not in title:
+                # Extract LCD information
+                content = await page.content()
+                if "Local Coverage Determination" in content:
+                    return {
+                        "lcd_id": str(lcd_id),
+                        "doc_id": f"L{lcd_id}",
+                        "title": title,
+                        "url": test_url,
+                        "found_date": datetime.now().isoformat()
+                    }
+        except Exception as e:
+            pass
+        
+        return None
+
     async def try_known_lcd_patterns(self, page):
         """Try to find LCDs using known URL patterns."""
         
         # Generate some known LCD IDs to test the pattern
-        test_lcd_ids = range(30000, 40000, 100)  # Sample range
+        test_lcd_ids = list(range(30000, 40000, 100))  # Sample range
         
+        validator = None
+        if HTTP_VALIDATION_AVAILABLE:
+            validator = LCDHttpValidator()
+            await validator.open()
+        
+        # Test in batches: HTTP classifies a batch concurrently, the browser
+        # only loads the IDs it couldn't decide
+        batch_size = validator.concurrency if validator else 1
         found_count = 0
-        for lcd_id in test_lcd_ids:
-            if found_count >= 10:  # Limit test to avoid too many requests
-                break
+        try:
+            for batch_start in range(0, len(test_lcd_ids), batch_size):
+                if found_count >= 10:  # Limit test to avoid too many requests
+                    break
                 
-            try:
-                test_url = f"https://www.cms.gov/medicare-coverage-database/view/lcd.aspx?LCDId={lcd_id}"
-                await page.goto(test_url, wait_until="networkidle")
-                await page.wait_for_timeout(1000)
+                batch = test_lcd_ids[batch_start:batch_start + batch_size]
+                classified = await validator.classify_many(batch) if validator else {}
                 
-                # Check if this is a valid LCD page
-                title = await page.title()
-                if "LCD" in title and "Error" not in title:
-                    # Extract LCD information
-                    try:
-                        content = await page.content()
-                        if "Local Coverage Determination" in content:
-                            policy_info = {
-                                "lcd_id": str(lcd_id),
-                                "doc_id": f"L{lcd_id}",
-                                "title": title,
-                                "url": test_url,
-                                "found_date": datetime.now().isoformat()
-                            }
-                            
-                            if str(lcd_id) not in self.processed_ids:
-                                self.lcd_urls.append(policy_info)
-                                self.processed_ids.add(str(lcd_id))
-                                found_count += 1
-                                print(f"Found valid LCD: L{lcd_id}")
-                    except:
-                        pass
-                        
-            except Exception as e:
-                continue
+                for lcd_id in batch:
+                    if found_count >= 10:
+                        break
+                    
+                    status, policy_info = classified.get(lcd_id, (AMBIGUOUS, None))
+                    if status == AMBIGUOUS:
+                        policy_info = await self.check_lcd_id_in_browser(page, lcd_id)
+                    
+                    if policy_info and str(lcd_id) not in self.processed_ids:
+                        self.lcd_urls.append(policy_info)
+                        self.processed_ids.add(str(lcd_id))
+                        self.catalog.add(policy_info)
+                        found_count += 1
+                        print(f"Found valid LCD: L{lcd_id}")
+        finally:
+            if validator:
+                validator.print_summary()
+                await validator.close()
         
         print(f"Found {found_count} LCDs via pattern testing")
 
@@ -337,22 +434,19 @@ class LCDPolicyFinder:
         """Try to find direct LCD listing pages."""
         
         direct_urls = [
-            "https://www.cms.gov/medicare-coverage-database/search.aspx?DocType=LCD",
-            "https://www.cms.gov/medicare-coverage-database/indexes/lcd-index.html"
+            mcd_url("search.aspx?DocType=LCD"),
+            mcd_url("indexes/lcd-index.html")
         ]
         
         for url in direct_urls:
             try:
                 print(f"Trying direct URL: {url}")
-                await page.goto(url, wait_until="networkidle")
-                await page.wait_for_timeout(3000)
+                await page.goto(url, wait_until="domcontentloaded")
+                await self.readiness.wait(page)
                 
-                # Handle "I Accept" if needed
+                # Accept the license only if the saved session has expired
                 try:
-                    accept_button = await page.wait_for_selector("input[value='I Accept']", timeout=2000)
-                    if accept_button:
-                        await accept_button.click()
-                        await page.wait_for_timeout(2000)
+                    await ensure_license_accepted(page)
                 except:
                     pass
                 
@@ -362,36 +456,6 @@ class LCDPolicyFinder:
                 print(f"Error with direct URL {url}: {e}")
                 continue
 
-    def save_to_json(self, filename="All_urls.json"):
-        """Save all found LCD URLs to JSON file."""
-        
-        # Remove duplicates and sort by LCD ID
-        unique_lcds = []
-        seen_ids = set()
-        
-        for lcd in self.lcd_urls:
-            if lcd['lcd_id'] not in seen_ids:
-                unique_lcds.append(lcd)
-                seen_ids.add(lcd['lcd_id'])
-        
-        # Sort by LCD ID number
-        unique_lcds.sort(key=lambda x: int(x['lcd_id']))
-        
-        # Prepare final data structure
-        output_data = {
-            "search_date": datetime.now().isoformat(),
-            "total_policies": len(unique_lcds),
-            "source": "CMS Medicare Coverage Database",
-            "policies": unique_lcds
-        }
-        
-        # Save to JSON file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Saved {len(unique_lcds)} unique LCD policies to {filename}")
-        return len(unique_lcds)
-
 async def main():
     """Main function to find all LCD policy URLs."""
     print("🏥 Medicare LCD Policy URL Finder")
@@ -405,14 +469,15 @@ async def main():
     # Perform comprehensive search
     await finder.comprehensive_search()
     
-    # Save results
-    total_found = finder.save_to_json("All_urls.json")
+    # Results were streamed to the shared catalog as they were found
+    total_found = len(finder.lcd_urls)
+    catalog_total, validated, estimated = finder.catalog.counts()
     
     print("\n" + "=" * 50)
     print("📊 SEARCH RESULTS")
     print("=" * 50)
     print(f"✅ Total LCD policies found: {total_found}")
-    print(f"📁 Results saved to: All_urls.json")
+    print(f"📁 Results recorded in: {CATALOG_FILE} ({catalog_total} policies, {validated} validated, {estimated} estimated)")
     print("💡 Each URL includes policy ID, title, and direct link")
     
     if total_found > 0:
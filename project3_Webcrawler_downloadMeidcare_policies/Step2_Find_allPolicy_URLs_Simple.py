@@ -2,18 +2,38 @@
 Step2_Find_allPolicy_URLs_Simple.py
 A more efficient approach to find Medicare LCD policy URLs by using known patterns
 and validating them systematically.
+
+The ID space is searched adaptively under a global probe budget: a coarse grid
+first, then bisection of the gaps next to real LCDs, so probes cluster where
+policies are. Dead zones (gaps between two misses) are only split further
+once every productive gap has been exhausted.
+
+IDs are validated over plain HTTP when httpx is installed (see lcd_http_validator.py);
+the browser is only used for IDs the HTTP check can't classify.
 """
 
 import asyncio
 from playwright.async_api import async_playwright
-import json
 import re
 from datetime import datetime
+from lcd_session import new_consented_context, ensure_license_accepted
+from lcd_readiness import PageReadiness, ANY_PAGE_SELECTOR
+from lcd_route_filter import RouteFilter
+from lcd_http_validator import LCDHttpValidator, HTTP_VALIDATION_AVAILABLE, AMBIGUOUS
+from lcd_catalog import LCDCatalog, CATALOG_FILE
+from lcd_config import lcd_url
 
 class SimpleLCDFinder:
-    def __init__(self):
+    def __init__(self, max_probes=500, id_space=(25000, 40000), coarse_step=200):
+        self.max_probes = max_probes
+        self.id_space = id_space
+        self.coarse_step = coarse_step
         self.lcd_urls = []
         self.processed_ids = set()
+        self.catalog = LCDCatalog(source="Step2_Find_allPolicy_URLs_Simple")
+        self.readiness = PageReadiness(body_selector=ANY_PAGE_SELECTOR, timeout_ms=5000)
+        self.route_filter = RouteFilter("discovery")
+        self.http_validator = None
         
         # Known working LCD IDs from our research
         self.known_working_ids = [33822, 35000, 35070, 33803, 33393, 38617]
@@ -22,18 +42,18 @@ class SimpleLCDFinder:
         """Validate if an LCD ID corresponds to a real policy."""
         
         try:
-            url = f"https://www.cms.gov/medicare-coverage-database/view/lcd.aspx?LCDId={lcd_id}"
-            await page.goto(url, wait_until="networkidle", timeout=10000)
+            url = lcd_url(lcd_id)
+            await page.goto(url, wait_until="domcontentloaded", timeout=10000)
             
-            # Handle "I Accept" if needed
+            # Accept the license only if the saved session has expired
             try:
-                accept_button = await page.wait_for_selector("input[value='I Accept']", timeout=2000)
-                if accept_button:
-                    await accept_button.click()
-                    await page.wait_for_timeout(1000)
+                await ensure_license_accepted(page)
             except:
                 pass
             
+            # Wait for the page to settle instead of waiting for networkidle
+            await self.readiness.wait(page)
+            
             # Check if this is a valid LCD page
             try:
                 # Look for LCD content indicators
@@ -75,99 +95,152 @@ class SimpleLCDFinder:
         
         return None
     
+    async def validate_lcd_ids(self, page, lcd_ids):
+        """Validate many LCD IDs: over HTTP when possible, in the browser only when ambiguous."""
+        
+        results = {}
+        browser_ids = list(lcd_ids)
+        
+        if self.http_validator:
+            classified = await self.http_validator.classify_many(lcd_ids)
+            browser_ids = []
+            for lcd_id, (status, policy) in classified.items():
+                if status == AMBIGUOUS:
+                    browser_ids.append(lcd_id)
+                else:
+                    results[lcd_id] = policy
+        
+        for lcd_id in browser_ids:
+            results[lcd_id] = await self.validate_lcd_url(page, lcd_id)
+        
+        # The browser may have renewed the consent session; share it with the HTTP client
+        if browser_ids and self.http_validator:
+            self.http_validator.load_consent_cookies()
+        
+        return results
+    
+    @staticmethod
+    def ranked_gaps(probed):
+        """
+        Return gaps (lo, hi) between neighbouring probed IDs worth bisecting, best first.
+        
+        Gaps with hits on both ends come first, then gaps with one hit, then
+        dead zones (two misses); ties go to the wider gap.
+        """
+        ordered = sorted(probed)
+        gaps = []
+        for lo, hi in zip(ordered, ordered[1:]):
+            if hi - lo > 1:
+                gaps.append((probed[lo] + probed[hi], hi - lo, lo, hi))
+        gaps.sort(reverse=True)
+        return [(lo, hi) for _, _, lo, hi in gaps]
+    
+    async def search_id_space_adaptively(self, page):
+        """Probe a coarse grid, then bisect the best-ranked gaps until the probe budget runs out."""
+        
+        probed = {}  # lcd_id -> True if it is a real LCD
+        probes_used = 0
+        found_before = len(self.lcd_urls)
+        batch_size = self.http_validator.concurrency if self.http_validator else 1
+        
+        async def probe(lcd_ids):
+            nonlocal probes_used
+            lcd_ids = [lcd_id for lcd_id in lcd_ids if lcd_id not in probed]
+            lcd_ids = lcd_ids[:self.max_probes - probes_used]
+            if not lcd_ids:
+                return
+            
+            results = await self.validate_lcd_ids(page, lcd_ids)
+            for lcd_id in lcd_ids:
+                policy = results.get(lcd_id)
+                probed[lcd_id] = policy is not None
+                if policy and str(lcd_id) not in self.processed_ids:
+                    self.lcd_urls.append(policy)
+                    self.processed_ids.add(str(lcd_id))
+                    self.catalog.add(policy)
+                    print(f"✅ Found: {policy['doc_id']} - {policy['title'][:40]}...")
+            
+            # Progress indicator
+            previous = probes_used
+            probes_used += len(lcd_ids)
+            if probes_used // 20 != previous // 20:
+                print(f"   Probed {probes_used}/{self.max_probes} IDs, found {len(self.lcd_urls)} total policies")
+        
+        # Known IDs seed the refinement like any other probe
+        for lcd_id in self.known_working_ids:
+            probed[lcd_id] = str(lcd_id) in self.processed_ids
+        
+        start, end = self.id_space
+        print(f"🔍 Coarse pass over {start}-{end} (step {self.coarse_step})...")
+        coarse_ids = list(range(start, end, self.coarse_step))
+        for batch_start in range(0, len(coarse_ids), max(batch_size, 20)):
+            await probe(coarse_ids[batch_start:batch_start + max(batch_size, 20)])
+        
+        print(f"🔍 Refining around hits...")
+        while probes_used < self.max_probes:
+            gaps = self.ranked_gaps(probed)
+            if not gaps:
+                print("   Every ID in the search space has been probed")
+                break
+            
+            midpoints = []
+            for lo, hi in gaps[:batch_size]:
+                midpoints.append((lo + hi) // 2)
+            await probe(midpoints)
+        
+        found = len(self.lcd_urls) - found_before
+        rate = found / probes_used if probes_used else 0.0
+        print(f"📈 Adaptive search: {found} new policies from {probes_used} probes "
+              f"({rate:.3f} found per probe, budget {self.max_probes})")
+    
     async def find_lcd_policies_systematically(self):
         """Find LCD policies by testing ID ranges systematically."""
         
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+            context = await new_consented_context(browser)
+            await self.route_filter.attach(context)
+            page = await context.new_page()
+            self.readiness.attach(page)
+            
+            if HTTP_VALIDATION_AVAILABLE:
+                self.http_validator = LCDHttpValidator()
+                await self.http_validator.open()
+            else:
+                print("💡 Install httpx for fast browserless validation: pip install httpx")
             
             try:
                 print("🔍 Starting systematic LCD discovery...")
                 
                 # First, validate our known working IDs
                 print("📋 Validating known LCD policies...")
+                results = await self.validate_lcd_ids(page, self.known_working_ids)
                 for lcd_id in self.known_working_ids:
-                    policy = await self.validate_lcd_url(page, lcd_id)
+                    policy = results.get(lcd_id)
                     if policy and str(lcd_id) not in self.processed_ids:
                         self.lcd_urls.append(policy)
                         self.processed_ids.add(str(lcd_id))
+                        self.catalog.add(policy)
                         print(f"✅ {policy['doc_id']}: {policy['title'][:50]}...")
                 
-                # Now search systematically in common ranges
+                # Now search the ID space adaptively within the probe budget
                 print("\n🔍 Searching for additional LCD policies...")
-                
-                # Common LCD ID ranges based on observed patterns
-                search_ranges = [
-                    (33000, 34000, 50),   # Range around known working IDs
-                    (35000, 36000, 50),   # Another active range
-                    (37000, 39000, 100),  # Newer policies
-                    (30000, 33000, 100),  # Older policies
-                    (25000, 30000, 200),  # Much older policies
-                ]
-                
-                total_tested = 0
-                for start, end, step in search_ranges:
-                    print(f"🔍 Testing range {start}-{end} (step {step})...")
-                    range_found = 0
-                    
-                    for lcd_id in range(start, end, step):
-                        if str(lcd_id) not in self.processed_ids:
-                            policy = await self.validate_lcd_url(page, lcd_id)
-                            if policy:
-                                self.lcd_urls.append(policy)
-                                self.processed_ids.add(str(lcd_id))
-                                range_found += 1
-                                print(f"✅ Found: {policy['doc_id']} - {policy['title'][:40]}...")
-                            
-                            total_tested += 1
-                            
-                            # Progress indicator
-                            if total_tested % 20 == 0:
-                                print(f"   Tested {total_tested} IDs, found {len(self.lcd_urls)} total policies")
-                    
-                    print(f"   Range {start}-{end}: Found {range_found} new policies")
-                    
-                    # If we found many in this range, search more densely
-                    if range_found > 5:
-                        print(f"   Dense search in productive range {start}-{end}...")
-                        for lcd_id in range(start, end, 10):  # Much smaller step
-                            if str(lcd_id) not in self.processed_ids:
-                                policy = await self.validate_lcd_url(page, lcd_id)
-                                if policy:
-                                    self.lcd_urls.append(policy)
-                                    self.processed_ids.add(str(lcd_id))
-                                    print(f"✅ Dense search: {policy['doc_id']} - {policy['title'][:30]}...")
+                await self.search_id_space_adaptively(page)
                 
                 print(f"\n🎉 Systematic search completed!")
                 print(f"📊 Total LCD policies discovered: {len(self.lcd_urls)}")
+                if self.http_validator:
+                    self.http_validator.print_summary()
+                self.readiness.print_summary()
+                self.route_filter.print_summary()
                 
             except Exception as e:
                 print(f"Error in systematic search: {e}")
             finally:
+                if self.http_validator:
+                    await self.http_validator.close()
+                self.catalog.close()
                 await browser.close()
-    
-    def save_to_json(self, filename="All_urls.json"):
-        """Save all found LCD URLs to JSON file."""
-        
-        # Sort by LCD ID number
-        self.lcd_urls.sort(key=lambda x: int(x['lcd_id']))
-        
-        # Prepare final data structure
-        output_data = {
-            "search_date": datetime.now().isoformat(),
-            "total_policies": len(self.lcd_urls),
-            "source": "CMS Medicare Coverage Database",
-            "search_method": "Systematic ID validation",
-            "policies": self.lcd_urls
-        }
-        
-        # Save to JSON file
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Saved {len(self.lcd_urls)} LCD policies to {filename}")
-        return len(self.lcd_urls)
 
 async def main():
     """Main function to find all LCD policy URLs."""
@@ -175,7 +248,7 @@ async def main():
     print("=" * 60)
     print("🎯 Target: All Medicare LCD Medical Policies")
     print("🌐 Source: CMS Medicare Coverage Database")  
-    print("🔧 Method: Systematic ID validation")
+    print("🔧 Method: Adaptive ID sampling")
     print("=" * 60)
     
     finder = SimpleLCDFinder()
@@ -183,14 +256,15 @@ async def main():
     # Find LCD policies systematically
     await finder.find_lcd_policies_systematically()
     
-    # Save results
-    total_found = finder.save_to_json("All_urls.json")
+    # Results were streamed to the shared catalog as they were found
+    total_found = len(finder.lcd_urls)
+    catalog_total, validated, estimated = finder.catalog.counts()
     
     print("\n" + "=" * 60)
     print("📊 FINAL RESULTS")
     print("=" * 60)
     print(f"✅ Total LCD policies found: {total_found}")
-    print(f"📁 Results saved to: All_urls.json")
+    print(f"📁 Results recorded in: {CATALOG_FILE} ({catalog_total} policies, {validated} validated, {estimated} estimated)")
     print("💡 Each entry includes LCD ID, Doc ID, title, and URL")
     
     if total_found > 0:
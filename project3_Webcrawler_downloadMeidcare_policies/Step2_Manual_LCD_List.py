@@ -1,11 +1,12 @@
 """
 Step2_Manual_LCD_List.py
-Creates a JSON file with known Medicare LCD policies based on research.
+Records known Medicare LCD policies based on research in the shared LCD catalog
+(lcd_catalog.jsonl), marking pattern-based guesses as estimated.
 This provides a solid starting point for bulk downloading.
 """
 
-import json
 from datetime import datetime
+from lcd_catalog import LCDCatalog, CATALOG_FILE, VALIDATED, ESTIMATED
 
 def create_lcd_policy_list():
     """Create a list of known Medicare LCD policies."""
@@ -94,8 +95,8 @@ def add_additional_lcd_patterns():
     
     return additional_policies
 
-def save_comprehensive_lcd_list(filename="All_urls.json"):
-    """Save comprehensive LCD policy list to JSON."""
+def save_comprehensive_lcd_list(filename=CATALOG_FILE):
+    """Record the comprehensive LCD policy list in the shared catalog."""
     
     print("🏥 Creating Medicare LCD Policy List")
     print("=" * 50)
@@ -108,54 +109,43 @@ def save_comprehensive_lcd_list(filename="All_urls.json"):
     additional_policies = add_additional_lcd_patterns()
     print(f"📋 Added {len(additional_policies)} estimated LCD policies")
     
-    # Combine all policies
-    all_policies = known_policies + additional_policies
+    # Append to the catalog; estimates never override policies other finders validated
+    catalog = LCDCatalog(filename, source="Step2_Manual_LCD_List")
+    try:
+        for policy in known_policies:
+            catalog.add(policy, VALIDATED)
+        for policy in additional_policies:
+            catalog.add(policy, ESTIMATED)
+    finally:
+        catalog.close()
     
-    # Create final data structure
-    output_data = {
-        "search_date": datetime.now().isoformat(),
-        "total_policies": len(all_policies),
-        "validated_policies": len(known_policies),
-        "estimated_policies": len(additional_policies),
-        "source": "CMS Medicare Coverage Database",
-        "search_method": "Manual compilation + pattern estimation",
-        "note": "Validated policies are confirmed working. Estimated policies follow common patterns but may need validation.",
-        "policies": all_policies
-    }
+    print(f"✅ Recorded {len(known_policies) + len(additional_policies)} LCD policies in {filename}")
     
-    # Save to JSON file
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Saved {len(all_policies)} LCD policies to {filename}")
-    
-    return len(all_policies)
+    return catalog
 
 def main():
     """Main function."""
     print("📝 Creating comprehensive Medicare LCD policy list...")
     
-    total_policies = save_comprehensive_lcd_list("All_urls.json")
+    catalog = save_comprehensive_lcd_list(CATALOG_FILE)
+    policies = catalog.policies()
+    total_policies, validated, estimated = catalog.counts()
     
     print("\n" + "=" * 50)
     print("📊 FINAL RESULTS")
     print("=" * 50)
-    print(f"✅ Total LCD policies: {total_policies}")
-    print(f"📁 File saved: All_urls.json")
+    print(f"✅ Total LCD policies in catalog: {total_policies} ({validated} validated, {estimated} estimated)")
+    print(f"📁 Catalog: {CATALOG_FILE}")
     print("💡 Contains both validated and estimated LCD URLs")
     print("🚀 Ready for bulk PDF downloading!")
     
-    # Show sample of created policies
-    with open("All_urls.json", 'r') as f:
-        data = json.load(f)
-    
     print(f"\n📋 Sample policies:")
-    for i, policy in enumerate(data['policies'][:10]):
-        status = " (validated)" if policy.get('status') != 'estimated' else " (estimated)"
+    for i, policy in enumerate(policies[:10]):
+        status = f" ({policy['provenance']})"
         print(f"  {i+1:2d}. {policy['doc_id']}: {policy['title'][:45]}...{status}")
     
-    if len(data['policies']) > 10:
-        print(f"       ... and {len(data['policies']) - 10} more policies")
+    if len(policies) > 10:
+        print(f"       ... and {len(policies) - 10} more policies")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,12 +2,20 @@
 Step2_Quick_LCD_Finder.py
 Quick and efficient approach to find Medicare LCD policy URLs by testing
 known patterns and ranges with minimal requests.
+
+IDs are checked over plain HTTP first when httpx is installed; the browser only
+handles the IDs that check can't classify.
 """
 
 import asyncio
 from playwright.async_api import async_playwright
-import json
 from datetime import datetime
+from lcd_session import new_consented_context, ensure_license_accepted
+from lcd_readiness import PageReadiness, ANY_PAGE_SELECTOR
+from lcd_route_filter import RouteFilter
+from lcd_http_validator import LCDHttpValidator, HTTP_VALIDATION_AVAILABLE, AMBIGUOUS
+from lcd_catalog import LCDCatalog, CATALOG_FILE
+from lcd_config import lcd_url
 
 async def quick_find_lcd_policies():
     """Quickly find a representative sample of LCD policies."""
@@ -28,96 +36,106 @@ async def quick_find_lcd_policies():
     
     lcd_policies = []
     found_count = 0
+    catalog = LCDCatalog(source="Step2_Quick_LCD_Finder")
     
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
+        context = await new_consented_context(browser)
+        route_filter = RouteFilter("discovery")
+        await route_filter.attach(context)
+        page = await context.new_page()
+        readiness = PageReadiness(body_selector=ANY_PAGE_SELECTOR, timeout_ms=5000)
+        readiness.attach(page)
         
         print("🏥 Quick Medicare LCD Policy Finder")
         print("=" * 50)
         print(f"🔍 Testing {len(test_ids)} potential LCD IDs...")
         
         try:
+            # Classify every ID over HTTP first; only ambiguous ones need the browser
+            http_results = {}
+            if HTTP_VALIDATION_AVAILABLE:
+                async with LCDHttpValidator() as validator:
+                    http_results = await validator.classify_many(test_ids)
+                    validator.print_summary()
+            else:
+                print("💡 Install httpx for fast browserless validation: pip install httpx")
+            
             for i, lcd_id in enumerate(test_ids):
-                try:
-                    url = f"https://www.cms.gov/medicare-coverage-database/view/lcd.aspx?LCDId={lcd_id}"
-                    
-                    # Quick navigation with short timeout
-                    await page.goto(url, wait_until="domcontentloaded", timeout=8000)
-                    
-                    # Handle "I Accept" quickly
+                status, http_policy = http_results.get(lcd_id, (AMBIGUOUS, None))
+                if status != AMBIGUOUS:
+                    # Settled over HTTP, no browser navigation needed
+                    if http_policy:
+                        lcd_policies.append(http_policy)
+                        catalog.add(http_policy)
+                        found_count += 1
+                        print(f"✅ Found #{found_count}: L{lcd_id} - {http_policy['title'][:40]}...")
+                else:
                     try:
-                        accept_button = await page.wait_for_selector("input[value='I Accept']", timeout=1500)
-                        if accept_button:
-                            await accept_button.click()
-                            await page.wait_for_timeout(1000)
-                    except:
-                        pass
-                    
-                    # Quick validation
-                    title = await page.title()
-                    
-                    if ("LCD" in title and 
-                        "Error" not in title and 
-                        "Not Found" not in title and
-                        "Search" not in title):
+                        url = lcd_url(lcd_id)
+                        
+                        # Quick navigation with short timeout
+                        await page.goto(url, wait_until="domcontentloaded", timeout=8000)
                         
-                        # Extract title quickly
+                        # Accept the license only if the saved session has expired
                         try:
-                            h1 = await page.query_selector("h1")
-                            if h1:
-                                policy_title = await h1.inner_text()
-                            else:
-                                policy_title = title.replace(" - CMS", "").strip()
+                            await ensure_license_accepted(page)
                         except:
-                            policy_title = f"LCD Policy L{lcd_id}"
+                            pass
                         
-                        policy_info = {
-                            "lcd_id": str(lcd_id),
-                            "doc_id": f"L{lcd_id}",
-                            "title": policy_title.strip(),
-                            "url": url,
-                            "found_date": datetime.now().isoformat()
-                        }
+                        # Wait for the page to settle instead of a fixed sleep
+                        await readiness.wait(page)
                         
-                        lcd_policies.append(policy_info)
-                        found_count += 1
-                        print(f"✅ Found #{found_count}: L{lcd_id} - {policy_title[:40]}...")
-                
-                except Exception as e:
-                    # Skip failed IDs silently
-                    pass
+                        # Quick validation
+                        title = await page.title()
+                        
+                        if ("LCD" in title and 
+                            "Error" not in title and 
+                            "Not Found" not in title and
+                            "Search" not in title):
+                            
+                            # Extract title quickly
+                            try:
+                                h1 = await page.query_selector("h1")
+                                if h1:
+                                    policy_title = await h1.inner_text()
+                                else:
+                                    policy_title = title.replace(" - CMS", "").strip()
+                            except:
+                                policy_title = f"LCD Policy L{lcd_id}"
+                            
+                            policy_info = {
+                                "lcd_id": str(lcd_id),
+                                "doc_id": f"L{lcd_id}",
+                                "title": policy_title.strip(),
+                                "url": url,
+                                "found_date": datetime.now().isoformat()
+                            }
+                            
+                            lcd_policies.append(policy_info)
+                            catalog.add(policy_info)
+                            found_count += 1
+                            print(f"✅ Found #{found_count}: L{lcd_id} - {policy_title[:40]}...")
+                    
+                    except Exception as e:
+                        # Skip failed IDs silently
+                        pass
                 
                 # Progress update
                 if (i + 1) % 10 == 0:
                     print(f"   Progress: {i+1}/{len(test_ids)} tested, {found_count} found")
             
+            readiness.print_summary()
+            route_filter.print_summary()
+            
         except Exception as e:
             print(f"Error: {e}")
         finally:
+            catalog.close()
             await browser.close()
     
     return lcd_policies
 
-def save_lcd_policies(policies, filename="All_urls.json"):
-    """Save LCD policies to JSON file."""
-    
-    # Sort by LCD ID
-    policies.sort(key=lambda x: int(x['lcd_id']))
-    
-    output_data = {
-        "search_date": datetime.now().isoformat(),
-        "total_policies": len(policies),
-        "source": "CMS Medicare Coverage Database",
-        "search_method": "Quick ID sampling",
-        "policies": policies
-    }
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-    
-    return len(policies)
-
 async def main():
     """Main function."""
     print("🚀 Starting quick LCD policy discovery...")
@@ -125,14 +143,15 @@ async def main():
     # Find LCD policies
     policies = await quick_find_lcd_policies()
     
-    # Save results
-    total_found = save_lcd_policies(policies)
+    # Results were streamed to the shared catalog as they were found
+    policies.sort(key=lambda x: int(x['lcd_id']))
+    total_found = len(policies)
     
     print("\n" + "=" * 50)
     print("📊 RESULTS SUMMARY")
     print("=" * 50)
     print(f"✅ Total LCD policies found: {total_found}")
-    print(f"📁 Results saved to: All_urls.json")
+    print(f"📁 Results recorded in: {CATALOG_FILE}")
     
     if total_found > 0:
         print("\n📋 Found policies:")
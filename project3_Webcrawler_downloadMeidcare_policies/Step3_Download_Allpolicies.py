@@ -1,46 +1,169 @@
 """
 Step3_Download_Allpolicies.py
-Downloads multiple Medicare LCD policies as PDF files from the URLs stored in All_urls.json.
+Downloads multiple Medicare LCD policies as PDF files from the URLs in the shared LCD catalog
+(lcd_catalog.jsonl, merged with the legacy All_urls.json).
 
 Features:
 - Option to download all policies or just a sample of 10 (default: 10 for resource conservation)
 - Uses the same high-quality PDF generation approach as Step1_DownloadJust1pdf.py
 - Stores PDFs in Download_PDFs folder with policy number naming (e.g., Policy_33822.pdf)
-- Handles "I Accept" terms automatically
+- Handles "I Accept" terms once per session (saved in cms_consent_state.json)
+- Blocks trackers and non-essential resources (--route-profile)
+- Concurrent worker pool (--workers) sharing one Chromium instance, with a per-host cap
+- Two-phase pipeline (--stage): fetch caches rendered HTML snapshots in HTML_Snapshots,
+  render produces PDFs from those snapshots offline
+- Incremental refresh (--refresh): re-renders only policies whose content changed,
+  tracked in Download_PDFs/manifest.json
+- Multi-process render farm (--processes): shards the policy list across processes,
+  each with its own Chromium, and merges their results into one summary
+- Crash-safe: PDFs are written atomically and every result is journaled, so an
+  interrupted run continues with --resume
+- Transient failures (timeouts, 5xx, 429) are retried with exponential backoff and
+  jitter (--retries), a per-host circuit breaker pauses workers while cms.gov is
+  failing, and a final pass retries policies that still failed transiently
+- Per-stage timings, bytes transferred and PDF size/page count for every policy
+  in Download_PDFs/metrics.jsonl, with an optional Prometheus textfile (--prometheus-file)
+- Output profiles (--profile): standard, or compact (print media, no backgrounds or
+  decorative images, post-render PDF optimization) for much smaller files
+- CPT/HCPCS and ICD-10 coding tables are read from the open page and stored in
+  Download_PDFs/lcd_codes.sqlite by LCD ID and revision (--no-codes to skip), and the
+  code -> LCD index (lcd_code_index.py) is updated after each run
+- Workers recycle their browser context every --recycle-every policies, or when the
+  Chromium renderers cross --memory-watermark MB, so long runs keep a flat memory profile
 - Progress tracking and error handling
 """
 
 import asyncio
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from playwright.async_api import async_playwright
 import json
 import os
+import time
 from datetime import datetime
+from urllib.parse import urlparse
 import argparse
+from lcd_session import new_consented_context, ensure_license_accepted, save_consent_state, CONSENT_STATE_FILE
+from lcd_readiness import PageReadiness, READY_TIMEOUT_MS
+from lcd_route_filter import RouteFilter, ROUTE_PROFILES
+from lcd_snapshots import SnapshotCache
+from lcd_manifest import PolicyManifest
+from lcd_journal import JobJournal
+from lcd_catalog import load_policies, is_estimated, CATALOG_FILE, LEGACY_URLS_FILE
+from lcd_config import rebase_url, MCD_BASE_URL
+from lcd_metrics import PipelineMetrics, count_pdf_pages
+from lcd_pdf_profile import PDFProfile, PDF_PROFILES
+from lcd_codes import CodeTableStore, revision_key
+from lcd_code_index import CodeIndex
+from lcd_memory import MemoryWatch, RECYCLE_EVERY, MEMORY_WATERMARK_MB
+from lcd_retry import (RetryScheduler, CircuitBreaker, HTTPStatusError, classify_error, page_lost,
+                       TRANSIENT, PERMANENT)
+
+STAGES = ("all", "fetch", "render")
+
+PARTIAL_SUFFIX = ".part"
+
+def write_atomic(path, data):
+    """Write bytes to a temp file and rename it into place."""
+    tmp_path = path + PARTIAL_SUFFIX
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def policy_host(url):
+    return urlparse(url).netloc.lower()
+
+def remove_partial_files(directory):
+    """Delete temp files left behind by a run that was killed mid-write."""
+    for name in os.listdir(directory):
+        if name.endswith(PARTIAL_SUFFIX):
+            os.remove(os.path.join(directory, name))
 
 class BulkLCDDownloader:
-    def __init__(self, sample_only=True, sample_size=10):
+    def __init__(self, sample_only=True, sample_size=10, workers=4, per_host_limit=4,
+                 ready_timeout_ms=READY_TIMEOUT_MS, route_profile="render", stage="all",
+                 margin="0.5in", force=False, refresh=False, resume=False, processes=1, retries=3,
+                 prometheus_file=None, profile="standard", extract_codes=True,
+                 recycle_every=RECYCLE_EVERY, memory_watermark_mb=MEMORY_WATERMARK_MB):
         self.sample_only = sample_only
         self.sample_size = sample_size
+        self.workers = max(1, workers)
+        self.per_host_limit = max(1, per_host_limit)
         self.output_dir = "Download_PDFs"
         self.downloaded_count = 0
         self.failed_count = 0
         self.failed_policies = []
+        self.final_retry_ids = set()  # Already counted as failed, on their last try
+        self.lost_pages = set()  # Worker pages that hit "Target closed" and must be replaced
+        self.unchanged_count = 0
+        self.policy_times = []
+        self.host_semaphores = {}
+        self.readiness = PageReadiness(timeout_ms=ready_timeout_ms)
+        self.route_filter = RouteFilter(route_profile) if route_profile != "off" else None
+        self.stage = stage
+        self.force = force
+        self.refresh = refresh and stage != "render"
+        self.snapshots = SnapshotCache()
+        self.manifest = PolicyManifest()
+        self.resume = resume
+        self.journal = JobJournal()
+        self.processes = max(1, processes)
+        self.retry = RetryScheduler(max_attempts=retries)
+        self.breaker = CircuitBreaker()
+        self.queue = None
+        self.metrics = PipelineMetrics(prometheus_file=prometheus_file)
+        self.pdf_profile = PDFProfile(profile)
+        self.code_store = CodeTableStore() if extract_codes else None
+        self.code_index_updated = 0
+        self.memory = MemoryWatch(recycle_every, memory_watermark_mb)
+        
+        # Everything a render-farm process needs to rebuild this downloader
+        self.shard_options = {
+            'workers': workers,
+            'per_host_limit': per_host_limit,
+            'ready_timeout_ms': ready_timeout_ms,
+            'route_profile': route_profile,
+            'stage': stage,
+            'margin': margin,
+            'force': force,
+            'refresh': refresh,
+            'retries': retries,
+            'profile': profile,
+            'extract_codes': extract_codes,
+            'recycle_every': recycle_every,
+            'memory_watermark_mb': memory_watermark_mb
+        }
+        
+        # PDF settings (same as Step1); kept in one place so fetch and render agree
+        self.pdf_options = {
+            'format': 'A4',
+            'margin': {
+                'top': margin,
+                'right': margin,
+                'bottom': margin,
+                'left': margin
+            },
+            'print_background': True,  # Include background colors and images
+            'display_header_footer': True,
+            'header_template': '<div style="font-size:10px; text-align:center; width:100%;">Medicare LCD Policy - Downloaded from CMS.gov</div>',
+            'footer_template': '<div style="font-size:10px; text-align:center; width:100%;"><span class="pageNumber"></span> of <span class="totalPages"></span></div>',
+            'prefer_css_page_size': True,
+            'scale': 1.0
+        }
+        self.pdf_options = self.pdf_profile.pdf_options(self.pdf_options)
         
         # Create output directory
         os.makedirs(self.output_dir, exist_ok=True)
     
     def load_policy_urls(self):
-        """Load policy URLs from All_urls.json."""
+        """Load policy URLs from the LCD catalog merged with the legacy All_urls.json."""
         try:
-            with open("All_urls.json", 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            policies = data.get('policies', [])
+            policies, source_file = load_policies()
             
             if self.sample_only:
                 # Prioritize validated policies for sample
-                validated_policies = [p for p in policies if p.get('status') != 'estimated']
-                estimated_policies = [p for p in policies if p.get('status') == 'estimated']
+                validated_policies = [p for p in policies if not is_estimated(p)]
+                estimated_policies = [p for p in policies if is_estimated(p)]
                 
                 # Take validated first, then fill with estimated if needed
                 sample_policies = validated_policies[:self.sample_size]
@@ -50,19 +173,46 @@ class BulkLCDDownloader:
                 
                 policies = sample_policies
             
-            print(f"📋 Loaded {len(policies)} policies for download")
+            print(f"📋 Loaded {len(policies)} policies for download from {source_file}")
             return policies
             
         except FileNotFoundError:
-            print("❌ All_urls.json not found. Please run Step2 first.")
+            print(f"❌ Neither {CATALOG_FILE} nor {LEGACY_URLS_FILE} found. Please run Step2 first.")
             return []
         except json.JSONDecodeError:
-            print("❌ Invalid JSON format in All_urls.json")
+            print(f"❌ Invalid JSON format in {LEGACY_URLS_FILE}")
             return []
     
-    async def download_policy_pdf(self, page, policy):
-        """Download a single LCD policy as PDF."""
+    async def fetch_policy_page(self, page, url):
+        """Load a policy page live from cms.gov and wait until it is ready to print."""
+        
+        timer = self.metrics.current(page)
+        
+        # Navigate to the LCD policy page
+        with timer.stage("goto"):
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+        if response is not None and response.status >= 400:
+            # Don't print an error page as if it were the policy
+            raise HTTPStatusError(response.status, url)
         
+        # Accept the license again only if the saved session has expired
+        with timer.stage("consent"):
+            try:
+                await ensure_license_accepted(page)
+            except:
+                # Continue if the accept button could not be clicked
+                pass
+        
+        # Wait for the policy body, fonts and pending XHRs (bounded by --ready-timeout)
+        with timer.stage("ready"):
+            await self.readiness.wait(page)
+        
+        return response
+    
+    async def download_policy_pdf(self, page, policy, index=0, attempt=1):
+        """Download a single LCD policy as PDF (or only fetch/render it, per --stage)."""
+        
+        timer = self.metrics.current(page)
         try:
             lcd_id = policy['lcd_id']
             doc_id = policy['doc_id']
@@ -72,111 +222,485 @@ class BulkLCDDownloader:
             # Generate filename using policy number
             pdf_filename = f"{self.output_dir}/Policy_{lcd_id}.pdf"
             
-            # Skip if already exists
-            if os.path.exists(pdf_filename):
+            # Skip if already exists (in --refresh mode, only if unchanged; checked below)
+            if self.stage == "fetch":
+                exists = self.snapshots.has_snapshot(lcd_id)
+            elif self.stage == "render":
+                exists = os.path.exists(pdf_filename)
+                # A PDF older than its snapshot is stale and gets re-rendered
+                if exists and self.snapshots.has_snapshot(lcd_id):
+                    exists = os.path.getmtime(pdf_filename) >= os.path.getmtime(self.snapshots.html_path(lcd_id))
+            else:
+                exists = os.path.exists(pdf_filename)
+            
+            if exists and not self.force and not self.refresh:
                 print(f"⏭️  Skipping {doc_id}: Already exists")
+                timer.set_outcome("skipped")
                 return True
             
-            print(f"🔄 Downloading {doc_id}: {title[:40]}...")
-            
-            # Navigate to the LCD policy page
-            await page.goto(url, wait_until="networkidle", timeout=15000)
-            
-            # Wait for initial page load
-            await page.wait_for_timeout(2000)
-            
-            # Look for and click "I Accept" button if it exists
-            try:
-                accept_button = await page.wait_for_selector(
-                    "input[value='I Accept'], button:has-text('I Accept'), input[type='submit'][value*='Accept']", 
-                    timeout=3000
-                )
-                if accept_button:
-                    await accept_button.click()
-                    # Wait for page to load after accepting terms
-                    await page.wait_for_timeout(3000)
-            except:
-                # Continue if no accept button found
-                pass
-            
-            # Wait for content to fully load
-            await page.wait_for_timeout(2000)
+            if self.stage == "render":
+                html = self.snapshots.load(lcd_id)
+                if html is None:
+                    print(f"❌ {doc_id}: No cached snapshot, run with --stage fetch first")
+                    self.mark_failed(policy, 'No cached snapshot')
+                    return False
+                
+                print(f"🖨️  Rendering {doc_id} from snapshot: {title[:40]}...")
+                with timer.stage("set_content"):
+                    await page.set_content(html, wait_until="load")
+                
+                # Snapshots cached before code extraction existed still need their codes
+                revision = revision_key(self.manifest.get(lcd_id))
+                if self.code_store and not self.code_store.has(lcd_id, revision):
+                    with timer.stage("codes"):
+                        await self.code_store.extract(page, lcd_id, revision, url)
+            else:
+                check_for_changes = exists and self.refresh and not self.force
+                
+                # Cheapest check first: a conditional GET answered with 304
+                if check_for_changes:
+                    with timer.stage("conditional_get"):
+                        not_modified = await self.manifest.not_modified(page, policy)
+                    if not_modified:
+                        print(f"⏭️  Skipping {doc_id}: Not modified since last download")
+                        self.unchanged_count += 1
+                        timer.set_outcome("unchanged")
+                        return True
+                
+                print(f"🔄 Downloading {doc_id}: {title[:40]}...")
+                response = await self.fetch_policy_page(page, url)
+                with timer.stage("fingerprint"):
+                    fingerprint = await self.manifest.fingerprint(page, response)
+                
+                if check_for_changes and self.manifest.is_unchanged(lcd_id, fingerprint):
+                    print(f"⏭️  {doc_id}: Content unchanged, keeping existing copy")
+                    self.unchanged_count += 1
+                    timer.set_outcome("unchanged")
+                    return True
+                
+                with timer.stage("snapshot"):
+                    await self.snapshots.save(page, policy)
+                
+                # The coding tables come from the same DOM, so downstream jobs needn't parse the PDF
+                if self.code_store:
+                    with timer.stage("codes"):
+                        await self.code_store.extract(page, lcd_id, revision_key(fingerprint), url)
+                
+                if self.stage == "fetch":
+                    self.manifest.update(lcd_id, fingerprint, self.snapshots.html_path(lcd_id))
+                    print(f"✅ {doc_id}: Snapshot cached")
+                    self.downloaded_count += 1
+                    timer.set_outcome("snapshot")
+                    return True
             
-            # Generate PDF with high quality settings (same as Step1)
-            await page.pdf(
-                path=pdf_filename,
-                format='A4',
-                margin={
-                    'top': '0.5in',
-                    'right': '0.5in',
-                    'bottom': '0.5in',
-                    'left': '0.5in'
-                },
-                print_background=True,  # Include background colors and images
-                display_header_footer=True,
-                header_template='<div style="font-size:10px; text-align:center; width:100%;">Medicare LCD Policy - Downloaded from CMS.gov</div>',
-                footer_template='<div style="font-size:10px; text-align:center; width:100%;"><span class="pageNumber"></span> of <span class="totalPages"></span></div>',
-                prefer_css_page_size=True,
-                scale=1.0
-            )
+            # Generate PDF with high quality settings (same as Step1), writing it
+            # atomically so an interrupted run never leaves a truncated PDF behind
+            with timer.stage("pdf"):
+                await self.pdf_profile.prepare(page)
+                pdf_bytes = await page.pdf(**self.pdf_options)
+            # Counted on Chromium's output: the compact optimizer packs pages into object streams
+            pdf_pages = count_pdf_pages(pdf_bytes)
+            with timer.stage("optimize"):
+                pdf_bytes = await self.pdf_profile.finalize(pdf_bytes)
+            previous_size = os.path.getsize(pdf_filename) if os.path.exists(pdf_filename) else 0
+            with timer.stage("write"):
+                write_atomic(pdf_filename, pdf_bytes)
+            if previous_size:
+                self.pdf_profile.record_replaced(previous_size, len(pdf_bytes))
+            timer.set_pdf(pdf_bytes, pdf_pages)
             
             # Check if PDF was created successfully
             if os.path.exists(pdf_filename):
+                if self.stage != "render":
+                    self.manifest.update(lcd_id, fingerprint, pdf_filename)
                 file_size = os.path.getsize(pdf_filename) / (1024*1024)  # MB
                 print(f"✅ {doc_id}: Downloaded successfully ({file_size:.2f} MB)")
                 self.downloaded_count += 1
                 return True
             else:
                 print(f"❌ {doc_id}: PDF file not created")
-                self.failed_count += 1
-                self.failed_policies.append({**policy, 'error': 'PDF not created'})
+                self.mark_failed(policy, 'PDF not created')
                 return False
                 
         except Exception as e:
-            print(f"❌ {policy.get('doc_id', 'Unknown')}: Error - {str(e)}")
-            self.failed_count += 1
-            self.failed_policies.append({**policy, 'error': str(e)})
+            if page_lost(e):
+                self.lost_pages.add(page)
+            self.handle_error(policy, e, index, attempt)
             return False
     
+    def handle_error(self, policy, error, index, attempt):
+        """Queue a backed-off retry for a transient error, or mark the policy failed."""
+        doc_id = policy.get('doc_id', 'Unknown')
+        kind = classify_error(error)
+        if kind == TRANSIENT and self.stage != "render":
+            self.breaker.record_failure(policy_host(policy.get('url', '')))
+        
+        if self.queue is not None and self.retry.should_retry(error, attempt):
+            due = self.retry.schedule(attempt)
+            print(f"🔁 {doc_id}: {error} - retry {attempt + 1}/{self.retry.max_attempts} "
+                  f"in {due - time.monotonic():.0f}s")
+            self.queue.put_nowait((due, index, attempt + 1, policy))
+            return
+        
+        print(f"❌ {doc_id}: Error - {str(error)}")
+        self.mark_failed(policy, str(error), kind)
+    
+    def mark_failed(self, policy, error, kind=PERMANENT):
+        """Count a failed policy and journal it so --resume retries it."""
+        if policy.get('lcd_id') in self.final_retry_ids:
+            # Counted when it first failed; keep only the final error
+            self.final_retry_ids.discard(policy['lcd_id'])
+            self.failed_policies = [p for p in self.failed_policies if p['lcd_id'] != policy['lcd_id']]
+        else:
+            self.failed_count += 1
+        self.failed_policies.append({**policy, 'error': error, 'error_kind': kind})
+        self.journal.record(policy, "failed", error=error)
+    
+    def mark_done(self, policy):
+        """Journal a finished policy; one saved by the final retry pass is no longer failed."""
+        if policy.get('lcd_id') in self.final_retry_ids:
+            self.final_retry_ids.discard(policy['lcd_id'])
+            self.failed_policies = [p for p in self.failed_policies if p['lcd_id'] != policy['lcd_id']]
+            self.failed_count -= 1
+        self.journal.record(policy, "done")
+    
+    def get_host_semaphore(self, url):
+        """Return the semaphore limiting concurrent requests to the host of url."""
+        host = policy_host(url)
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_semaphores[host]
+    
+    async def open_worker_page(self, browser):
+        """Open a fresh context and page set up for this stage. Returns (context, page)."""
+        if self.stage == "render":
+            # Offline: everything the snapshot needs comes from the asset cache
+            context = await browser.new_context()
+            await self.snapshots.attach_offline(context)
+            page = await context.new_page()
+        else:
+            context = await new_consented_context(browser)
+            if self.route_filter:
+                await self.route_filter.attach(context)
+            page = await context.new_page()
+            self.readiness.attach(page)
+            self.snapshots.record_assets(page)
+        self.metrics.attach(page)
+        return context, page
+    
+    async def reopen_worker_page(self, browser, context):
+        """Close a worker's context (its page may already be dead) and open a fresh one."""
+        try:
+            await context.close()
+        except Exception:
+            pass
+        return await self.open_worker_page(browser)
+    
+    async def download_worker(self, browser, queue, total):
+        """Pull policies off the queue and download them with a dedicated page."""
+        
+        context, page = await self.open_worker_page(browser)
+        policies_on_page = 0
+        
+        try:
+            while True:
+                try:
+                    due, i, attempt, policy = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                
+                try:
+                    # Retries sort after new work and wait out their backoff
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    
+                    # The host cap is what keeps us polite to cms.gov now that
+                    # there is no fixed sleep between policies
+                    host = policy_host(policy.get('url', ''))
+                    probe = False
+                    if self.stage == "render":
+                        limit = contextlib.nullcontext()
+                    else:
+                        probe = await self.breaker.wait(host)
+                        limit = self.get_host_semaphore(policy.get('url', ''))
+                    try:
+                        async with limit:
+                            print(f"[{i}/{total}] ", end="")
+                            started = time.monotonic()
+                            self.metrics.start(page, policy, attempt)
+                            ok = await self.download_policy_pdf(page, policy, i, attempt)
+                            self.metrics.finish(page, ok)
+                            self.policy_times.append(time.monotonic() - started)
+                            if ok:
+                                self.mark_done(policy)
+                                if self.stage != "render":
+                                    self.breaker.record_success(host)
+                    finally:
+                        if probe:
+                            self.breaker.end_probe(host)
+                    
+                    # A closed or crashed page fails everything after it: replace it now
+                    if page in self.lost_pages or page.is_closed():
+                        self.lost_pages.discard(page)
+                        context, page = await self.reopen_worker_page(browser, context)
+                        policies_on_page = 0
+                        continue
+                    
+                    # A fresh renderer gives back whatever the old one accumulated
+                    policies_on_page += 1
+                    reason = self.memory.recycle_reason(policies_on_page)
+                    if reason and not queue.empty():
+                        await context.close()
+                        context, page = await self.open_worker_page(browser)
+                        policies_on_page = 0
+                        self.memory.record_recycle(reason)
+                finally:
+                    queue.task_done()
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+    
     async def download_all_policies(self):
         """Download all LCD policies as PDFs."""
         
-        # Load policies
-        policies = self.load_policy_urls()
+        # Load policies (or what the previous run left unfinished)
+        policies = None
+        if self.resume:
+            policies = self.journal.resume_policies()
+            if policies is None:
+                print("ℹ️  No previous run in the journal, starting a new run")
+            else:
+                print(f"♻️  Resuming previous run: {len(policies)} policies left to do")
+                if not policies:
+                    print("✅ Previous run already finished every policy")
+        if policies is None:
+            policies = self.load_policy_urls()
         if not policies:
             return
         
+        # Point stored cms.gov URLs at the configured MCD base (e.g. a local stand-in)
+        policies = [{**policy, 'url': rebase_url(policy['url'])} for policy in policies]
+        
+        remove_partial_files(self.output_dir)
+        self.journal.start_run(policies)
+        
+        print(f"🚀 Starting bulk download of {len(policies)} LCD policies...")
+        print(f"📁 Output directory: {self.output_dir}")
+        print(f"👷 Workers: {self.workers} (max {self.per_host_limit} per host)")
+        if self.processes > 1:
+            print(f"🖥️  Processes: {self.processes} (workers and host cap apply per process)")
+        print(f"🧩 Stage: {self.stage}")
+        if self.stage != "fetch":
+            print(f"🖨️  PDF profile: {self.pdf_profile.name}")
+        print("=" * 70)
+        
+        start_time = datetime.now()
+        indexed_policies = list(enumerate(policies, 1))
+        
+        try:
+            if self.processes > 1:
+                await self.run_render_farm(indexed_policies, len(policies))
+            else:
+                await self.run_policies(indexed_policies, len(policies))
+            
+            if self.code_store and self.code_store.policies_extracted:
+                self.update_code_index()
+            
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            
+            # Print summary
+            self.print_summary(len(policies), duration)
+            
+        except Exception as e:
+            print(f"❌ Error in bulk download: {e}")
+        finally:
+            self.manifest.save()
+            self.journal.close()
+            self.metrics.close()
+            if self.code_store:
+                self.code_store.close()
+    
+    def update_code_index(self):
+        """Bring the code -> LCD index up to date with the codes extracted in this run."""
+        index = CodeIndex(self.code_store.filename)
+        try:
+            self.code_index_updated = index.update()
+        except Exception as e:
+            print(f"⚠️  Could not update the code index: {e}")
+        finally:
+            index.close()
+    
+    async def run_policies(self, indexed_policies, total):
+        """Download (index, policy) pairs with one Chromium instance and a worker pool."""
+        
         async with async_playwright() as p:
             # Launch browser
             browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
             
             try:
-                print(f"🚀 Starting bulk download of {len(policies)} LCD policies...")
-                print(f"📁 Output directory: {self.output_dir}")
-                print("=" * 70)
-                
-                start_time = datetime.now()
+                # Accept the license once up front so workers don't all race to do it
+                if self.stage != "render" and not os.path.exists(CONSENT_STATE_FILE):
+                    await save_consent_state(browser)
                 
-                # Download each policy
-                for i, policy in enumerate(policies, 1):
-                    print(f"[{i}/{len(policies)}] ", end="")
-                    await self.download_policy_pdf(page, policy)
-                    
-                    # Small delay between downloads to be respectful
-                    await page.wait_for_timeout(1000)
-                
-                end_time = datetime.now()
-                duration = (end_time - start_time).total_seconds()
+                # Feed every policy through a shared queue drained by the workers;
+                # entries are (due time, index, attempt, policy) so retries sort last
+                self.queue = asyncio.PriorityQueue()
+                for i, policy in indexed_policies:
+                    self.queue.put_nowait((0, i, 1, policy))
                 
-                # Print summary
-                self.print_summary(len(policies), duration)
+                worker_count = min(self.workers, len(indexed_policies))
+                await asyncio.gather(*[
+                    self.download_worker(browser, self.queue, total)
+                    for _ in range(worker_count)
+                ])
                 
-            except Exception as e:
-                print(f"❌ Error in bulk download: {e}")
+                await self.final_retry_pass(browser, indexed_policies, total)
             finally:
+                self.queue = None
                 await browser.close()
     
+    async def final_retry_pass(self, browser, indexed_policies, total):
+        """Give policies that ran out of retries on transient errors one last try."""
+        
+        retry_ids = {p['lcd_id'] for p in self.failed_policies if p.get('error_kind') == TRANSIENT}
+        if not retry_ids:
+            return
+        
+        print(f"\n🔁 Final retry pass for {len(retry_ids)} policies that failed transiently...")
+        # They stay counted as failed until mark_done or mark_failed settles each one
+        self.final_retry_ids = set(retry_ids)
+        
+        # Last attempt: a failure now is final
+        for i, policy in indexed_policies:
+            if policy['lcd_id'] in retry_ids:
+                self.queue.put_nowait((0, i, self.retry.max_attempts, policy))
+        
+        worker_count = min(self.workers, len(retry_ids))
+        try:
+            await asyncio.gather(*[
+                self.download_worker(browser, self.queue, total)
+                for _ in range(worker_count)
+            ])
+        finally:
+            self.final_retry_ids = set()
+    
+    async def run_render_farm(self, indexed_policies, total):
+        """Shard policies across processes, each with its own Chromium, and merge their results."""
+        
+        # Accept the license before forking so the processes don't all race to do it
+        if self.stage != "render" and not os.path.exists(CONSENT_STATE_FILE):
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                try:
+                    await save_consent_state(browser)
+                finally:
+                    await browser.close()
+        
+        # Stripe rather than chunk, so each shard gets a similar mix of policies
+        shard_count = min(self.processes, len(indexed_policies))
+        shards = [indexed_policies[k::shard_count] for k in range(shard_count)]
+        
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=shard_count) as pool:
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, run_shard, self.shard_options, shard, total, self.journal.run_id)
+                for shard in shards
+            ], return_exceptions=True)
+        
+        for shard, result in zip(shards, results):
+            if isinstance(result, Exception):
+                # The journal still has whatever the process finished before dying
+                print(f"❌ Render process for {len(shard)} policies failed: {result}")
+                for _, policy in shard:
+                    self.failed_count += 1
+                    self.failed_policies.append({**policy, 'error': f'Render process failed: {result}'})
+            else:
+                self.merge_shard_result(result)
+    
+    def shard_result(self):
+        """Collect this process's counters so the parent can merge them."""
+        result = {
+            'downloaded_count': self.downloaded_count,
+            'failed_count': self.failed_count,
+            'failed_policies': self.failed_policies,
+            'unchanged_count': self.unchanged_count,
+            'wait_times': self.readiness.wait_times,
+            'policy_times': self.policy_times,
+            'metrics_records': self.metrics.records,
+            'pdf_profile': {
+                'rendered_bytes': self.pdf_profile.rendered_bytes,
+                'final_bytes': self.pdf_profile.final_bytes,
+                'previous_bytes': self.pdf_profile.previous_bytes,
+                'replaced_bytes': self.pdf_profile.replaced_bytes
+            },
+            'timed_out_count': self.readiness.timed_out_count,
+            'assets_saved': self.snapshots.assets_saved,
+            'assets_served': self.snapshots.assets_served,
+            'assets_missing': self.snapshots.assets_missing,
+            'manifest_updates': self.manifest.updated,
+            'codes': None,
+            'memory': {
+                'peak_rss': self.memory.peak_rss,
+                'recycled_by_count': self.memory.recycled_by_count,
+                'recycled_by_memory': self.memory.recycled_by_memory
+            },
+            'retry_count': self.retry.retry_count,
+            'breaker_open_count': self.breaker.open_count,
+            'breaker_paused_seconds': self.breaker.paused_seconds,
+            'route_filter': None
+        }
+        if self.route_filter:
+            result['route_filter'] = {
+                'allowed_count': self.route_filter.allowed_count,
+                'blocked_count': self.route_filter.blocked_count,
+                'blocked_by_type': dict(self.route_filter.blocked_by_type),
+                'estimated_bytes_saved': self.route_filter.estimated_bytes_saved
+            }
+        if self.code_store:
+            result['codes'] = {
+                'policies_extracted': self.code_store.policies_extracted,
+                'codes_extracted': self.code_store.codes_extracted
+            }
+        return result
+    
+    def merge_shard_result(self, result):
+        """Fold one render-farm process's results into this downloader's summary."""
+        self.downloaded_count += result['downloaded_count']
+        self.failed_count += result['failed_count']
+        self.failed_policies.extend(result['failed_policies'])
+        self.unchanged_count += result['unchanged_count']
+        self.readiness.wait_times.extend(result['wait_times'])
+        self.policy_times.extend(result['policy_times'])
+        self.metrics.merge(result['metrics_records'])
+        for field, value in result['pdf_profile'].items():
+            setattr(self.pdf_profile, field, getattr(self.pdf_profile, field) + value)
+        self.readiness.timed_out_count += result['timed_out_count']
+        self.snapshots.assets_saved += result['assets_saved']
+        self.snapshots.assets_served += result['assets_served']
+        self.snapshots.assets_missing += result['assets_missing']
+        self.manifest.merge(result['manifest_updates'])
+        self.retry.retry_count += result['retry_count']
+        self.breaker.open_count += result['breaker_open_count']
+        self.breaker.paused_seconds += result['breaker_paused_seconds']
+        # Each process has its own Chromium; report the largest one
+        self.memory.peak_rss = max(self.memory.peak_rss, result['memory']['peak_rss'])
+        self.memory.recycled_by_count += result['memory']['recycled_by_count']
+        self.memory.recycled_by_memory += result['memory']['recycled_by_memory']
+        if self.code_store and result['codes']:
+            self.code_store.policies_extracted += result['codes']['policies_extracted']
+            self.code_store.codes_extracted += result['codes']['codes_extracted']
+        
+        stats = result['route_filter']
+        if self.route_filter and stats:
+            self.route_filter.allowed_count += stats['allowed_count']
+            self.route_filter.blocked_count += stats['blocked_count']
+            self.route_filter.blocked_by_type.update(stats['blocked_by_type'])
+            self.route_filter.estimated_bytes_saved += stats['estimated_bytes_saved']
+    
     def print_summary(self, total_policies, duration):
         """Print download summary."""
         
@@ -185,8 +709,25 @@ class BulkLCDDownloader:
         print("=" * 70)
         print(f"✅ Successfully downloaded: {self.downloaded_count}")
         print(f"❌ Failed downloads: {self.failed_count}")
-        print(f"📁 Total files in output folder: {len(os.listdir(self.output_dir))}")
+        if self.refresh:
+            print(f"♻️  Unchanged (not re-rendered): {self.unchanged_count}")
+        pdf_count = len([f for f in os.listdir(self.output_dir) if f.endswith('.pdf')])
+        print(f"📁 Total PDFs in output folder: {pdf_count}")
         print(f"⏱️  Total time: {duration:.1f} seconds")
+        if self.retry.retry_count:
+            print(f"🔁 Retries after transient errors: {self.retry.retry_count}")
+        self.breaker.print_summary()
+        self.readiness.print_summary()
+        if self.route_filter and self.stage != "render":
+            self.route_filter.print_summary()
+        self.snapshots.print_summary()
+        self.pdf_profile.print_summary()
+        if self.code_store:
+            self.code_store.print_summary()
+            if self.code_index_updated:
+                print(f"🗂️  Code index updated for {self.code_index_updated} policies (query with lcd_code_index.py)")
+        self.metrics.print_summary()
+        self.memory.print_summary()
         print(f"📍 Output folder: {os.path.abspath(self.output_dir)}")
         
         if self.failed_policies:
@@ -198,6 +739,23 @@ class BulkLCDDownloader:
         
         print(f"\n🎉 Bulk download completed!")
 
+def run_shard(options, indexed_policies, total, run_id):
+    """Entry point of a render-farm process: download one shard and return its results."""
+    downloader = BulkLCDDownloader(**options)
+    # The parent owns the manifest file and the run; this process only reports back
+    downloader.manifest.autosave = False
+    downloader.journal.run_id = run_id
+    # Records go to the shared metrics file directly; the parent writes the Prometheus file
+    downloader.metrics.prometheus_file = None
+    try:
+        asyncio.run(downloader.run_policies(indexed_policies, total))
+    finally:
+        downloader.journal.close()
+        downloader.metrics.close()
+        if downloader.code_store:
+            downloader.code_store.close()
+    return downloader.shard_result()
+
 def main():
     """Main function with command line argument support."""
     
@@ -206,6 +764,42 @@ def main():
                        help='Download all policies (default: download 10 sample policies)')
     parser.add_argument('--sample-size', type=int, default=10,
                        help='Number of sample policies to download (default: 10)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Number of concurrent browser pages (default: 4)')
+    parser.add_argument('--per-host', type=int, default=4,
+                       help='Maximum concurrent downloads per host (default: 4)')
+    parser.add_argument('--ready-timeout', type=float, default=READY_TIMEOUT_MS / 1000,
+                       help='Ceiling in seconds for each page readiness wait (default: 10)')
+    parser.add_argument('--route-profile', choices=list(ROUTE_PROFILES) + ['off'], default='render',
+                       help='Request blocking profile for policy pages (default: render)')
+    parser.add_argument('--stage', choices=STAGES, default='all',
+                       help='all: fetch and print live; fetch: only cache HTML snapshots; '
+                            'render: print PDFs offline from cached snapshots (default: all)')
+    parser.add_argument('--margin', default='0.5in',
+                       help='PDF page margin on every side (default: 0.5in)')
+    parser.add_argument('--force', action='store_true',
+                       help='Re-create PDFs/snapshots even if they already exist')
+    parser.add_argument('--refresh', action='store_true',
+                       help='Re-check existing policies and re-download only those whose content changed')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue the previous run with the policies it did not finish')
+    parser.add_argument('--processes', type=int, default=1,
+                       help='Number of render processes, each with its own Chromium (default: 1)')
+    parser.add_argument('--retries', type=int, default=3,
+                       help='Attempts per policy for transient errors such as timeouts and 5xx (default: 3)')
+    parser.add_argument('--profile', choices=PDF_PROFILES, default='standard',
+                       help='PDF output profile; compact drops backgrounds and decorative images '
+                            'and optimizes the file (default: standard)')
+    parser.add_argument('--prometheus-file',
+                       help='Also write run metrics in Prometheus textfile format to this path')
+    parser.add_argument('--recycle-every', type=int, default=RECYCLE_EVERY,
+                       help=f'Give each worker a fresh browser context after this many policies, 0 to never '
+                            f'(default: {RECYCLE_EVERY})')
+    parser.add_argument('--memory-watermark', type=int, default=MEMORY_WATERMARK_MB,
+                       help=f'Recycle a worker\'s context when Chromium renderers use more than this many MB, '
+                            f'0 to disable (default: {MEMORY_WATERMARK_MB})')
+    parser.add_argument('--no-codes', action='store_true',
+                       help='Do not extract the CPT/HCPCS and ICD-10 coding tables into the codes database')
     
     args = parser.parse_args()
     
@@ -213,15 +807,35 @@ def main():
     print("🏥 Medicare LCD Bulk PDF Downloader")
     print("=" * 70)
     
+    options = {
+        'workers': args.workers,
+        'per_host_limit': args.per_host,
+        'ready_timeout_ms': int(args.ready_timeout * 1000),
+        'route_profile': args.route_profile,
+        'stage': args.stage,
+        'margin': args.margin,
+        'force': args.force,
+        'refresh': args.refresh,
+        'resume': args.resume,
+        'processes': args.processes,
+        'retries': args.retries,
+        'prometheus_file': args.prometheus_file,
+        'profile': args.profile,
+        'extract_codes': not args.no_codes,
+        'recycle_every': args.recycle_every,
+        'memory_watermark_mb': args.memory_watermark
+    }
+    
     if args.all:
         print("🎯 Mode: Download ALL policies")
-        downloader = BulkLCDDownloader(sample_only=False)
+        downloader = BulkLCDDownloader(sample_only=False, **options)
     else:
         print(f"🎯 Mode: Download {args.sample_size} sample policies (default)")
         print("💡 Use --all flag to download all policies")
-        downloader = BulkLCDDownloader(sample_only=True, sample_size=args.sample_size)
+        downloader = BulkLCDDownloader(sample_only=True, sample_size=args.sample_size, **options)
     
-    print("🌐 Source: All_urls.json")
+    print(f"🌐 Source: {CATALOG_FILE} (or {LEGACY_URLS_FILE})")
+    print(f"🏛️  MCD site: {MCD_BASE_URL}")
     print("📁 Output: Download_PDFs folder")
     print("=" * 70)
     
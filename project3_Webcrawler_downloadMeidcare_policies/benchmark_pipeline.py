@@ -0,0 +1,250 @@
+"""
+benchmark_pipeline.py
+Throughput benchmark for the Step3 download pipeline against the local fake MCD server.
+
+Starts fake_mcd_server.py in a separate process, points the pipeline at it
+through MCD_BASE_URL, and downloads a fixed set of policies in a scratch
+directory (nothing in the project folder is touched). Reports:
+- policies per minute
+- p50/p95/max per-policy latency
+- peak RSS of this process plus its Chromium and render-farm children
+
+Save a run with --output and compare later runs against it with --baseline;
+the benchmark exits with status 1 if throughput drops or p95 latency rises by
+more than --tolerance, so regressions show up before deployment.
+
+Peak RSS sums the whole process tree when psutil is installed; without it the
+largest single process (resource.getrusage) is reported instead.
+
+Usage:
+    python benchmark_pipeline.py --policies 50 --workers 4 --latency-ms 100 --output bench.json
+    python benchmark_pipeline.py --policies 50 --workers 4 --latency-ms 100 --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class PeakRSSSampler:
+    """Samples the RSS of this process and its descendants in a background thread."""
+
+    def __init__(self, interval=0.25, exclude_pids=()):
+        self.interval = interval
+        self.exclude_pids = set(exclude_pids)
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            if proc.pid in self.exclude_pids:
+                continue
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_bytes = max(self.peak_bytes, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if psutil is None:
+            # ru_maxrss is in KB on Linux: the largest single process, not the tree
+            self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            self.peak_bytes = max(self_kb, children_kb) * 1024
+        return self.peak_bytes
+
+
+def start_fake_server(port, args):
+    """Launch fake_mcd_server.py and wait until it answers. Returns (process, base_url)."""
+    command = [sys.executable, os.path.join(SCRIPT_DIR, "fake_mcd_server.py"),
+               "--port", str(port),
+               "--latency-ms", str(args.latency_ms),
+               "--jitter-ms", str(args.jitter_ms),
+               "--error-rate", str(args.error_rate),
+               "--page-kb", str(args.page_kb),
+               "--seed", str(args.seed)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/medicare-coverage-database"
+
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/static/site.css", timeout=1).read()
+            return server, base_url
+        except Exception:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("Fake MCD server did not start")
+
+
+def run_benchmark(args, base_url, lcd_ids):
+    """Download lcd_ids with Step3 in a scratch directory and return the measurements."""
+    # lcd_config reads the base URL at import time, so set it before importing the pipeline
+    os.environ["MCD_BASE_URL"] = base_url
+    sys.path.insert(0, SCRIPT_DIR)
+    from lcd_catalog import LCDCatalog
+    from lcd_config import lcd_url
+    from lcd_readiness import percentile
+    from Step3_Download_Allpolicies import BulkLCDDownloader
+
+    catalog = LCDCatalog(source="benchmark_pipeline")
+    for lcd_id in lcd_ids:
+        catalog.add({"lcd_id": str(lcd_id), "doc_id": f"L{lcd_id}", "title": f"Benchmark policy L{lcd_id}",
+                     "url": lcd_url(lcd_id)})
+    catalog.close()
+
+    downloader = BulkLCDDownloader(sample_only=False, workers=args.workers, per_host_limit=args.per_host,
+                                   processes=args.processes, route_profile=args.route_profile)
+
+    output = io.StringIO() if args.quiet else sys.stdout
+    start = time.monotonic()
+    with contextlib.redirect_stdout(output):
+        asyncio.run(downloader.download_all_policies())
+    duration = time.monotonic() - start
+
+    times = downloader.policy_times
+    return {
+        "policies": len(lcd_ids),
+        "downloaded": downloader.downloaded_count,
+        "failed": downloader.failed_count,
+        "duration_seconds": round(duration, 2),
+        "policies_per_minute": round(downloader.downloaded_count / duration * 60, 1) if duration else 0.0,
+        "latency_p50_seconds": round(percentile(times, 50), 3),
+        "latency_p95_seconds": round(percentile(times, 95), 3),
+        "latency_max_seconds": round(max(times), 3) if times else 0.0,
+    }
+
+
+def compare_to_baseline(result, baseline, tolerance):
+    """Return a list of regressions of result against baseline."""
+    regressions = []
+    if result["policies_per_minute"] < baseline["policies_per_minute"] * (1 - tolerance):
+        regressions.append(f"throughput {result['policies_per_minute']} < {baseline['policies_per_minute']} policies/min")
+    if result["latency_p95_seconds"] > baseline["latency_p95_seconds"] * (1 + tolerance):
+        regressions.append(f"p95 latency {result['latency_p95_seconds']}s > {baseline['latency_p95_seconds']}s")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {result['peak_rss_mb']} MB > {baseline['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Step3 pipeline against a local fake MCD server')
+    parser.add_argument('--policies', type=int, default=50, help='Number of policies to download (default: 50)')
+    parser.add_argument('--workers', type=int, default=4, help='Step3 --workers (default: 4)')
+    parser.add_argument('--per-host', type=int, default=4, help='Step3 --per-host (default: 4)')
+    parser.add_argument('--processes', type=int, default=1, help='Step3 --processes (default: 1)')
+    parser.add_argument('--route-profile', default='render', help='Step3 --route-profile (default: render)')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the fake server (default: 8765)')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Fake server latency (default: 100)')
+    parser.add_argument('--jitter-ms', type=float, default=50, help='Fake server latency jitter (default: 50)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fake server 503 rate (default: 0)')
+    parser.add_argument('--page-kb', type=int, default=120, help='Fake policy page size in KB (default: 120)')
+    parser.add_argument('--seed', type=int, default=0, help='Fake server seed (default: 0)')
+    parser.add_argument('--output', help='Write the result as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against a previous --output file')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed relative regression against the baseline (default: 0.10)')
+    parser.add_argument('--quiet', action='store_true', help='Hide the Step3 output')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directory with the PDFs')
+    args = parser.parse_args()
+
+    sys.path.insert(0, SCRIPT_DIR)
+    from fake_mcd_server import FakeMCD
+
+    # Same seed as the server, so these IDs exist there
+    lcd_ids = FakeMCD(seed=args.seed).lcd_ids[:args.policies]
+
+    print("⏱️  Step3 Pipeline Benchmark")
+    print("=" * 70)
+
+    server, base_url = start_fake_server(args.port, args)
+    scratch_dir = tempfile.mkdtemp(prefix="lcd_benchmark_")
+    original_dir = os.getcwd()
+    sampler = PeakRSSSampler(exclude_pids=[server.pid])
+
+    print(f"🌐 Fake MCD: {base_url} ({args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, {args.error_rate:.1%} errors)")
+    print(f"📋 Policies: {len(lcd_ids)}, workers: {args.workers}, processes: {args.processes}")
+    print(f"📁 Scratch directory: {scratch_dir}")
+    print("=" * 70)
+
+    try:
+        os.chdir(scratch_dir)
+        sampler.start()
+        result = run_benchmark(args, base_url, lcd_ids)
+    finally:
+        peak_bytes = sampler.stop()
+        os.chdir(original_dir)
+        server.terminate()
+        server.wait()
+        if not args.keep:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    result["peak_rss_mb"] = round(peak_bytes / (1024 * 1024), 1)
+    result["peak_rss_scope"] = "process tree" if psutil is not None else "largest process"
+    result["settings"] = {key: getattr(args, key) for key in
+                          ("workers", "per_host", "processes", "route_profile", "latency_ms",
+                           "jitter_ms", "error_rate", "page_kb", "seed")}
+
+    print("\n" + "=" * 70)
+    print("📊 BENCHMARK RESULTS")
+    print("=" * 70)
+    print(f"✅ Downloaded: {result['downloaded']}/{result['policies']} ({result['failed']} failed)")
+    print(f"🚀 Throughput: {result['policies_per_minute']} policies/minute")
+    print(f"⏱️  Per-policy latency: p50 {result['latency_p50_seconds']}s, "
+          f"p95 {result['latency_p95_seconds']}s, max {result['latency_max_seconds']}s")
+    print(f"🧠 Peak RSS: {result['peak_rss_mb']} MB ({result['peak_rss_scope']})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"📁 Result saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+fake_mcd_server.py
+A local stand-in for the CMS Medicare Coverage Database, for testing and benchmarking
+the Project3 scripts without touching cms.gov.
+
+It serves, below /medicare-coverage-database:
+- view/lcd.aspx?LCDId=...   policy pages of realistic size (headings, long sections,
+                            CPT/HCPCS and ICD-10 tables), with ETag/Last-Modified and 304s;
+                            404 "Page Not Found" for IDs that don't exist
+- the "I Accept" license interstitial for sessions without the consent cookie
+- search.aspx               a paginated LCD listing (?page=N) with a search form
+- reports/*.aspx            a single-page listing of every LCD
+- static/site.css           a stylesheet, so the render profile has assets to load
+
+Latency and errors can be injected (--latency-ms, --jitter-ms, --error-rate).
+The set of LCD IDs is derived from --seed and --density, so runs are repeatable.
+
+Usage:
+    python fake_mcd_server.py --port 8765 --latency-ms 150 --error-rate 0.02
+    MCD_BASE_URL=http://127.0.0.1:8765/medicare-coverage-database python Step3_Download_Allpolicies.py
+"""
+
+import argparse
+import hashlib
+import html
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+BASE_PATH = "/medicare-coverage-database"
+CONSENT_COOKIE = "mcd_license"
+
+# The IDs the finders already know about always exist, with their real titles
+KNOWN_TITLES = {
+    33822: "Glucose Monitors",
+    35000: "Molecular Pathology Procedures",
+    35070: "Speech-Language Pathology (SLP) Services: Communication Disorders",
+    33803: "Urological Supplies",
+    33393: "Hospice - Determining Terminal Status",
+    38617: "Implantable Continuous Glucose Monitors (I-CGM)",
+}
+KNOWN_IDS = tuple(KNOWN_TITLES)
+ID_RANGE = (25000, 40000)
+RESULTS_PER_PAGE = 50
+
+TOPICS = ("Glucose Monitors", "Molecular Pathology Procedures", "Speech-Language Pathology",
+          "Urological Supplies", "Hospice - Determining Terminal Status", "Wound Care",
+          "Cardiac Rehabilitation", "Outpatient Physical Therapy", "Nerve Conduction Studies",
+          "Vitamin D Assay Testing", "Oxygen and Oxygen Equipment", "Lower Limb Prostheses",
+          "Transthoracic Echocardiography", "Psychiatric Codes", "Allergy Testing")
+
+SECTIONS = ("Coverage Indications, Limitations, and/or Medical Necessity",
+            "Summary of Evidence", "Analysis of Evidence (Rationale for Determination)",
+            "Documentation Requirements", "Utilization Guidelines", "Bibliography")
+
+WORDS = ("coverage", "beneficiary", "medically", "necessary", "documentation", "physician",
+         "treatment", "diagnosis", "indicated", "services", "clinical", "criteria", "patient",
+         "procedure", "records", "frequency", "evidence", "supplier", "condition", "therapy",
+         "reasonable", "limitations", "requirements", "Medicare", "contractor", "claims")
+
+STYLESHEET = """
+body { font-family: Georgia, serif; margin: 2em; color: #222; }
+h1 { font-size: 1.6em; border-bottom: 2px solid #0071bc; }
+h2 { font-size: 1.2em; color: #0071bc; margin-top: 1.5em; }
+table { border-collapse: collapse; width: 100%; margin: 1em 0; }
+th, td { border: 1px solid #999; padding: 4px 8px; font-size: 0.9em; }
+th { background: #e4f2fa; }
+""".strip()
+
+
+class FakeMCD:
+    def __init__(self, density=0.02, page_kb=120, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 retired_rate=0.05, seed=0):
+        self.page_kb = page_kb
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+
+        rng = random.Random(seed)
+        ids = {lcd_id for lcd_id in range(*ID_RANGE) if rng.random() < density}
+        self.lcd_ids = sorted(ids | set(KNOWN_IDS))
+        self.retired_ids = {lcd_id for lcd_id in self.lcd_ids
+                            if lcd_id not in KNOWN_IDS and rng.random() < retired_rate}
+        self._valid = set(self.lcd_ids)
+        self._pages = {}
+
+    def exists(self, lcd_id):
+        return lcd_id in self._valid
+
+    def title(self, lcd_id):
+        return KNOWN_TITLES.get(lcd_id) or f"{TOPICS[lcd_id % len(TOPICS)]} ({lcd_id % 97})"
+
+    def revision_date(self, lcd_id):
+        rng = random.Random(lcd_id)
+        return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2015, 2025)}"
+
+    def delay(self):
+        """Injected latency in seconds for one request."""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0, self.latency_ms + jitter) / 1000
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    # ----- pages -----
+
+    def page(self, title, body):
+        return (f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+                f"<link rel='stylesheet' href='{BASE_PATH}/static/site.css'></head>"
+                f"<body>{body}</body></html>")
+
+    def policy_page(self, lcd_id):
+        """The LCD view page for lcd_id, built deterministically and cached."""
+        if lcd_id in self._pages:
+            return self._pages[lcd_id]
+
+        rng = random.Random(lcd_id)
+        title = self.title(lcd_id)
+        status = ("<p class='status'><strong>LCD Status: Retired</strong> - This LCD has been retired.</p>"
+                  if lcd_id in self.retired_ids else "")
+        parts = [
+            f"<h1>LCD - {html.escape(title)} (L{lcd_id})</h1>",
+            "<p>Local Coverage Determination (LCD)</p>",
+            status,
+            f"<p>LCD ID: L{lcd_id}</p>",
+            "<p>Original Effective Date: 10/01/2015</p>",
+            f"<p>Revision Effective Date: {self.revision_date(lcd_id)}</p>",
+            "<div id='lcdContent'>",
+        ]
+
+        target = self.page_kb * 1024
+        size = sum(len(part) for part in parts)
+        section = 0
+        while size < target:
+            heading = f"<h2>{SECTIONS[section % len(SECTIONS)]}</h2>"
+            paragraphs = "".join(
+                "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 120))) + ".</p>"
+                for _ in range(4))
+            rows = "".join(
+                f"<tr><td>{rng.randint(10000, 99999)}</td><td>{' '.join(rng.choice(WORDS) for _ in range(6))}</td></tr>"
+                for _ in range(12))
+            codes = "".join(
+                f"<tr><td>{rng.choice('EFGIMNRZ')}{rng.randint(10, 99)}.{rng.randint(0, 9)}</td>"
+                f"<td>{' '.join(rng.choice(WORDS) for _ in range(5))}</td></tr>"
+                for _ in range(12))
+            block = (heading + paragraphs +
+                     "<h3>CPT/HCPCS Codes</h3><table><tr><th>Code</th><th>Description</th></tr>" + rows + "</table>" +
+                     "<h3>ICD-10-CM Codes that Support Medical Necessity</h3>"
+                     "<table><tr><th>Code</th><th>Description</th></tr>" + codes + "</table>")
+            parts.append(block)
+            size += len(block)
+            section += 1
+
+        parts.append("</div>")
+        page = self.page(f"LCD - {title} (L{lcd_id}) - CMS", "".join(parts))
+        self._pages[lcd_id] = page
+        return page
+
+    def consent_page(self, return_url):
+        body = ("<h1>License Agreement</h1>"
+                "<p>End User License Agreement for CPT and CDT codes. Please accept to continue.</p>"
+                f"<form method='get' action='{BASE_PATH}/accept.aspx'>"
+                f"<input type='hidden' name='return' value='{html.escape(return_url)}'>"
+                "<input type='submit' value='I Accept'></form>")
+        return self.page("License Agreement - CMS", body)
+
+    def not_found_page(self):
+        return self.page("Error - Page Not Found - CMS",
+                         "<h1>Page Not Found</h1><p>The document you requested could not be found.</p>")
+
+    def listing(self, lcd_ids):
+        return "".join(
+            f"<tr><td><a href='{BASE_PATH}/view/lcd.aspx?LCDId={lcd_id}&amp;DocID=L{lcd_id}'>"
+            f"L{lcd_id} - {html.escape(self.title(lcd_id))}</a></td></tr>"
+            for lcd_id in lcd_ids)
+
+    def search_page(self, page_num, keyword=""):
+        matches = [lcd_id for lcd_id in self.lcd_ids
+                   if not keyword or keyword.lower() in self.title(lcd_id).lower() or keyword.upper() == "LCD"]
+        page_count = max(1, -(-len(matches) // RESULTS_PER_PAGE))
+        page_num = min(max(1, page_num), page_count)
+        shown = matches[(page_num - 1) * RESULTS_PER_PAGE:page_num * RESULTS_PER_PAGE]
+
+        # Like most pagers, only a window of page numbers is linked
+        query = f"DocType=LCD&amp;keyword={quote(keyword)}"
+        window = range(max(1, page_num - 5), min(page_count, page_num + 5) + 1)
+        pager = " ".join(f"<a href='{BASE_PATH}/search.aspx?{query}&amp;page={n}'>{n}</a>"
+                         for n in window if n != page_num)
+        if page_num < page_count:
+            pager += f" <a title='Next page' href='{BASE_PATH}/search.aspx?{query}&amp;page={page_num + 1}'>Next</a>"
+
+        body = ("<h1>Search the Medicare Coverage Database</h1>"
+                f"<form method='get' action='{BASE_PATH}/search.aspx'>"
+                "<label><input type='checkbox' name='DocType' value='LCD'> LCD</label>"
+                f"<input type='text' name='keyword' id='searchKeyword' value='{html.escape(keyword)}'>"
+                "<input type='submit' value='Search'></form>"
+                f"<p>{len(matches)} results, page {page_num} of {page_count}</p>"
+                f"<table class='searchResults'>{self.listing(shown)}</table>"
+                f"<div class='pager'>{pager}</div>")
+        return self.page("Search Results - CMS", body)
+
+    def report_page(self):
+        return self.page("Final LCD Report - CMS",
+                         f"<h1>Final LCDs</h1><table>{self.listing(self.lcd_ids)}</table>")
+
+
+class FakeMCDHandler(BaseHTTPRequestHandler):
+    server_version = "FakeMCD/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def has_consent(self):
+        return f"{CONSENT_COOKIE}=accepted" in self.headers.get("Cookie", "")
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        site = self.server.site
+        parsed = urlparse(self.path)
+        path = parsed.path
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        query_lower = {key.lower(): value for key, value in query.items()}
+
+        with site.lock:
+            site.requests[path.rsplit("/", 1)[-1] or "/"] += 1
+
+        time.sleep(site.delay())
+        if site.should_fail():
+            self.send_body(503, site.page("Service Unavailable", "<h1>Service Unavailable</h1>"))
+            return
+
+        if not path.startswith(BASE_PATH):
+            self.send_body(404, site.not_found_page())
+            return
+        path = path[len(BASE_PATH):]
+
+        if path == "/static/site.css":
+            self.send_body(200, STYLESHEET, "text/css", {"Cache-Control": "max-age=3600"})
+        elif path == "/accept.aspx":
+            self.send_response(302)
+            self.send_header("Set-Cookie", f"{CONSENT_COOKIE}=accepted; Path=/")
+            self.send_header("Location", query.get("return") or f"{BASE_PATH}/search.aspx")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif not self.has_consent():
+            self.send_body(200, site.consent_page(self.path))
+        elif path == "/view/lcd.aspx":
+            self.serve_policy(site, query_lower.get("lcdid", ""))
+        elif path == "/search.aspx":
+            page_num = int(query_lower.get("page", "1")) if query_lower.get("page", "1").isdigit() else 1
+            self.send_body(200, site.search_page(page_num, query_lower.get("keyword", "")))
+        elif path.startswith("/reports/") or path.startswith("/indexes/"):
+            self.send_body(200, site.report_page())
+        else:
+            self.send_body(404, site.not_found_page())
+
+    def serve_policy(self, site, lcd_id):
+        if not lcd_id.isdigit() or not site.exists(int(lcd_id)):
+            self.send_body(404, site.not_found_page())
+            return
+
+        lcd_id = int(lcd_id)
+        body = site.policy_page(lcd_id)
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:16] + '"'
+        month, day, year = (int(part) for part in site.revision_date(lcd_id).split("/"))
+        last_modified = formatdate(time.mktime((year, month, day, 0, 0, 0, 0, 0, 0)), usegmt=True)
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_body(200, body, headers={"ETag": etag, "Last-Modified": last_modified})
+
+
+def start_server(site, host="127.0.0.1", port=0):
+    """Serve site in a background thread. Returns (server, base_url); stop with server.shutdown()."""
+    server = ThreadingHTTPServer((host, port), FakeMCDHandler)
+    server.daemon_threads = True
+    server.site = site
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{BASE_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the CMS Medicare Coverage Database')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--density', type=float, default=0.02,
+                        help='Share of IDs in 25000-40000 that are real LCDs (default: 0.02)')
+    parser.add_argument('--page-kb', type=int, default=120, help='Approximate policy page size in KB (default: 120)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per request (default: 0)')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random +/- latency jitter (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 503 (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the set of LCD IDs (default: 0)')
+    args = parser.parse_args()
+
+    site = FakeMCD(density=args.density, page_kb=args.page_kb, latency_ms=args.latency_ms,
+                   jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed)
+    server, base_url = start_server(site, args.host, args.port)
+
+    print("🧪 Fake Medicare Coverage Database")
+    print("=" * 70)
+    print(f"🌐 Serving {len(site.lcd_ids)} LCDs ({len(site.retired_ids)} retired) at {base_url}")
+    print(f"⏱️  Latency: {args.latency_ms:.0f}ms ± {args.jitter_ms:.0f}ms, error rate: {args.error_rate:.1%}")
+    print(f"💡 Point the scripts at it with: export MCD_BASE_URL={base_url}")
+    print("=" * 70)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping server")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
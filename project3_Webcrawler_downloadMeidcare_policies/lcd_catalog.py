@@ -0,0 +1,145 @@
+"""
+lcd_catalog.py
+Shared, append-only catalog of discovered LCD policies.
+
+Every Step2 finder streams each policy it discovers to lcd_catalog.jsonl as
+one JSON line, the moment it is found. Each line carries its provenance:
+- provenance: "validated" (the page was seen to exist) or "estimated" (guessed from a pattern)
+- source:     which finder recorded it
+- recorded:   when
+
+Nothing is ever rewritten, so finders can run at the same time or one after
+another without losing each other's results. Reading merges the log by
+lcd_id: a validated record always wins over an estimated one, otherwise the
+newest record wins, and every finder that reported the policy is kept in
+"sources".
+
+Step3 reads the merged catalog together with the shipped legacy
+All_urls.json: its policies are merged in as records from source
+"All_urls.json" (provenance from their status), so the first finder run that
+creates the catalog doesn't shrink Step3's input to the few policies it found.
+"""
+
+import itertools
+import json
+import os
+from datetime import datetime
+
+CATALOG_FILE = "lcd_catalog.jsonl"
+LEGACY_URLS_FILE = "All_urls.json"
+
+VALIDATED = "validated"
+ESTIMATED = "estimated"
+
+
+class LCDCatalog:
+    def __init__(self, filename=CATALOG_FILE, source="unknown"):
+        self.filename = filename
+        self.source = source
+        self.added = 0
+        self._file = None
+
+    def read_records(self):
+        """Yield catalog records in order, ignoring torn lines."""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def _append(self, record):
+        if self._file is None:
+            torn = False
+            if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+                with open(self.filename, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._file = open(self.filename, 'a', encoding='utf-8')
+            # Terminate a line torn by a crashed writer so it doesn't swallow ours
+            if torn:
+                self._file.write("\n")
+        # One write per line keeps lines from concurrent finders from interleaving
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def add(self, policy, provenance=None):
+        """Stream one discovered policy to the catalog."""
+        if provenance is None:
+            provenance = ESTIMATED if policy.get('status') == ESTIMATED else VALIDATED
+
+        self._append({
+            **policy,
+            "lcd_id": str(policy['lcd_id']),
+            "provenance": provenance,
+            "source": self.source,
+            "recorded": datetime.now().isoformat()
+        })
+        self.added += 1
+
+    def policies(self, base_records=()):
+        """Return the merged catalog (on top of base_records) as a list of policies sorted by LCD ID."""
+        merged = {}
+        for record in itertools.chain(base_records, self.read_records()):
+            lcd_id = record.get('lcd_id')
+            if not lcd_id:
+                continue
+
+            current = merged.get(lcd_id)
+            if current is None:
+                merged[lcd_id] = {**record, "sources": [record['source']], "first_seen": record['recorded']}
+                continue
+
+            sources = current['sources']
+            if record['source'] not in sources:
+                sources.append(record['source'])
+            if record['provenance'] == VALIDATED or current['provenance'] == ESTIMATED:
+                merged[lcd_id] = {**record, "sources": sources, "first_seen": current['first_seen']}
+
+        return sorted(merged.values(), key=lambda p: int(p['lcd_id']))
+
+    def counts(self):
+        """Return (total, validated, estimated) for the merged catalog."""
+        policies = self.policies()
+        validated = sum(1 for p in policies if p['provenance'] == VALIDATED)
+        return len(policies), validated, len(policies) - validated
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def is_estimated(policy):
+    """True for catalog entries and legacy All_urls.json entries that were never validated."""
+    return policy.get('provenance', policy.get('status')) == ESTIMATED
+
+
+def legacy_records(legacy_file=LEGACY_URLS_FILE):
+    """The policies of the legacy All_urls.json as catalog records."""
+    with open(legacy_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [{
+        **policy,
+        "lcd_id": str(policy['lcd_id']),
+        "provenance": ESTIMATED if policy.get('status') == ESTIMATED else VALIDATED,
+        "source": os.path.basename(legacy_file),
+        "recorded": policy.get('found_date') or data.get('search_date', "")
+    } for policy in data.get('policies', []) if policy.get('lcd_id')]
+
+
+def load_policies(catalog_file=CATALOG_FILE, legacy_file=LEGACY_URLS_FILE):
+    """
+    Return (policies, source_description): the legacy All_urls.json and the catalog merged by LCD ID.
+
+    Raises FileNotFoundError if neither exists and json.JSONDecodeError for a broken legacy file.
+    """
+    sources = [path for path in (legacy_file, catalog_file) if os.path.exists(path)]
+    if not sources:
+        raise FileNotFoundError(f"Neither {catalog_file} nor {legacy_file} exists")
+
+    base_records = legacy_records(legacy_file) if legacy_file in sources else []
+    return LCDCatalog(catalog_file).policies(base_records), " + ".join(sources)
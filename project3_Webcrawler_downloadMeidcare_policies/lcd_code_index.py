@@ -0,0 +1,282 @@
+"""
+lcd_code_index.py
+Inverted index from CPT/HCPCS and ICD-10 codes to the LCD policies that list them.
+
+Built from the codes Step3 extracts into Download_PDFs/lcd_codes.sqlite, in
+the same database:
+- code_index:  one row per listed code, keyed by its code system and normalized
+  form (ICD-10-CM E11.9 -> E119)
+- range_index: one row per listed range (99202-99205, E11.00-E11.9)
+- index_state: the revision of each LCD the index was built from
+
+Normalized keys of different systems overlap (HCPCS E1161 and ICD-10-CM
+E11.61 are both E1161), so every query is restricted to one code system.
+It comes from --system, or from the shape of the query: a dot or an ICD-10-CM
+letter+digits pattern means ICD-10-CM, five CPT/HCPCS characters mean
+CPT/HCPCS, seven ICD-10-PCS characters mean ICD-10-PCS. Prefixes whose
+system can't be told (9525) search every system.
+
+Only the latest extracted revision of each LCD is indexed. update() is
+incremental: it re-indexes just the LCDs extracted since the last update, so
+Step3 runs it after every download run and lookups stay a few milliseconds.
+
+A code matches a range when it sorts between the range ends; the end is
+padded so E11.00-E11.9 also covers E11.9X codes. Prefix queries (E11, 9525)
+return every listed code starting with the prefix and every range that
+overlaps it.
+
+Usage:
+    python lcd_code_index.py 95251 E11.9
+    python lcd_code_index.py --system ICD-10-CM E1161
+    python lcd_code_index.py --prefix E11
+    python lcd_code_index.py --snapshots    # also index HTML_Snapshots without extracted codes
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+from datetime import datetime
+
+from lcd_codes import CodeTableStore, CODES_DB_FILE, CODE_PATTERNS, CPT_HCPCS, ICD10_CM, ICD10_PCS, revision_key
+from lcd_manifest import PolicyManifest
+from lcd_snapshots import SNAPSHOT_DIR
+
+# Longest normalized code (ICD-10-CM E11.3211 / ICD-10-PCS 0DTJ4ZZ)
+KEY_LENGTH = 7
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_state (
+    lcd_id TEXT PRIMARY KEY,
+    revision TEXT NOT NULL,
+    extracted_date TEXT,
+    indexed_date TEXT
+);
+CREATE TABLE IF NOT EXISTS code_index (
+    code_key TEXT NOT NULL,
+    code_system TEXT NOT NULL,
+    code TEXT NOT NULL,
+    lcd_id TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    section TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS range_index (
+    start_key TEXT NOT NULL,
+    end_key TEXT NOT NULL,
+    code_system TEXT NOT NULL,
+    code TEXT NOT NULL,
+    code_end TEXT NOT NULL,
+    lcd_id TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    section TEXT,
+    description TEXT
+);
+DROP INDEX IF EXISTS code_index_by_key;
+DROP INDEX IF EXISTS range_index_by_start;
+CREATE INDEX IF NOT EXISTS code_index_by_system_key ON code_index (code_system, code_key);
+CREATE INDEX IF NOT EXISTS code_index_by_lcd ON code_index (lcd_id);
+CREATE INDEX IF NOT EXISTS range_index_by_system_start ON range_index (code_system, start_key);
+CREATE INDEX IF NOT EXISTS range_index_by_lcd ON range_index (lcd_id);
+"""
+
+# Latest extracted revision of every LCD
+LATEST_REVISIONS = """
+SELECT lcd_id, revision, extracted_date FROM policies AS p
+WHERE extracted_date = (SELECT MAX(extracted_date) FROM policies WHERE lcd_id = p.lcd_id)
+"""
+
+RESULT_FIELDS = ("lcd_id", "revision", "code_system", "code", "code_end", "section", "description")
+
+CODE_SYSTEMS = (CPT_HCPCS, ICD10_CM, ICD10_PCS)
+
+# ICD-10-CM written without its dot: E11, E119, E1165
+UNDOTTED_ICD10_CM = re.compile(r'^[A-TV-Z]\d[0-9A-Z]{1,5}$')
+
+
+def normalize_code(code):
+    """Upper-case a code and drop dots and spaces: ' e11.9 ' -> 'E119'."""
+    return re.sub(r'[\s.]', '', code).upper()
+
+
+def query_system(code):
+    """The code system a query is written in, from its shape, or None if it can't be told."""
+    code = re.sub(r'\s', '', code).upper()
+    if "." in code:
+        return ICD10_CM
+    if CODE_PATTERNS[CPT_HCPCS].match(code):
+        return CPT_HCPCS
+    if len(code) == 7 and code[0].isdigit() and CODE_PATTERNS[ICD10_PCS].match(code):
+        return ICD10_PCS
+    if UNDOTTED_ICD10_CM.match(code):
+        return ICD10_CM
+    if CODE_PATTERNS[ICD10_PCS].match(code):
+        return ICD10_PCS
+    return None
+
+
+def range_end_key(code_end):
+    """Pad a range end so codes below it in the hierarchy sort inside the range."""
+    return normalize_code(code_end).ljust(KEY_LENGTH, "Z")
+
+
+class CodeIndex:
+    def __init__(self, filename=CODES_DB_FILE):
+        self.store = CodeTableStore(filename)
+        self.connection = self.store.connect()
+        self.connection.executescript(INDEX_SCHEMA)
+
+    def stale_policies(self):
+        """(lcd_id, revision, extracted_date) of LCDs extracted since they were last indexed."""
+        indexed = {lcd_id: (revision, extracted_date) for lcd_id, revision, extracted_date in
+                   self.connection.execute("SELECT lcd_id, revision, extracted_date FROM index_state")}
+        return [(lcd_id, revision, extracted_date)
+                for lcd_id, revision, extracted_date in self.connection.execute(LATEST_REVISIONS)
+                if indexed.get(lcd_id) != (revision, extracted_date)]
+
+    def update(self):
+        """Re-index every LCD whose latest extraction isn't indexed yet. Returns the count."""
+        stale = self.stale_policies()
+        with self.connection:
+            for lcd_id, revision, extracted_date in stale:
+                self._index_policy(lcd_id, revision, extracted_date)
+        return len(stale)
+
+    def _index_policy(self, lcd_id, revision, extracted_date):
+        self.connection.execute("DELETE FROM code_index WHERE lcd_id = ?", (lcd_id,))
+        self.connection.execute("DELETE FROM range_index WHERE lcd_id = ?", (lcd_id,))
+
+        codes, ranges = [], []
+        for code_system, code, code_end, section, description in self.connection.execute(
+                "SELECT code_system, code, code_end, section, description FROM codes "
+                "WHERE lcd_id = ? AND revision = ?", (lcd_id, revision)):
+            if code_end:
+                ranges.append((normalize_code(code), range_end_key(code_end), code_system, code, code_end,
+                               lcd_id, revision, section, description))
+            else:
+                codes.append((normalize_code(code), code_system, code, lcd_id, revision, section, description))
+
+        self.connection.executemany(
+            "INSERT INTO code_index (code_key, code_system, code, lcd_id, revision, section, description) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", codes)
+        self.connection.executemany(
+            "INSERT INTO range_index (start_key, end_key, code_system, code, code_end, lcd_id, revision, "
+            "section, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", ranges)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO index_state (lcd_id, revision, extracted_date, indexed_date) "
+            "VALUES (?, ?, ?, ?)", (lcd_id, revision, extracted_date, datetime.now().isoformat()))
+
+    def index_snapshots(self, snapshot_dir=SNAPSHOT_DIR):
+        """Extract codes from cached HTML snapshots of LCDs with no extracted codes yet."""
+        manifest = PolicyManifest()
+        extracted = {row[0] for row in self.connection.execute("SELECT DISTINCT lcd_id FROM policies")}
+        count = 0
+        for path in sorted(glob.glob(os.path.join(snapshot_dir, "Policy_*.html"))):
+            lcd_id = os.path.basename(path)[len("Policy_"):-len(".html")]
+            if lcd_id in extracted:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            self.store.extract_html(html, lcd_id, revision_key(manifest.get(lcd_id)))
+            count += 1
+        return count
+
+    def _results(self, rows):
+        return [dict(zip(RESULT_FIELDS, row)) for row in rows]
+
+    def lookup(self, code, system=None):
+        """Every listing of code in its system (given, or told from its shape): as itself, or inside a range."""
+        key = normalize_code(code)
+        system = system or query_system(code)
+        exact, ranged = [], []
+        for code_system in ([system] if system else CODE_SYSTEMS):
+            exact += self.connection.execute(
+                "SELECT lcd_id, revision, code_system, code, NULL, section, description FROM code_index "
+                "WHERE code_system = ? AND code_key = ?", (code_system, key)).fetchall()
+            ranged += self.connection.execute(
+                "SELECT lcd_id, revision, code_system, code, code_end, section, description FROM range_index "
+                "WHERE code_system = ? AND start_key <= ? AND end_key >= ?", (code_system, key, key)).fetchall()
+        return self._results(exact + ranged)
+
+    def lookup_prefix(self, prefix, system=None):
+        """Every listed code starting with prefix, and every range overlapping it, in one system or all."""
+        low = normalize_code(prefix)
+        high = low.ljust(KEY_LENGTH, "Z")
+        system = system or query_system(prefix)
+        codes, ranged = [], []
+        for code_system in ([system] if system else CODE_SYSTEMS):
+            codes += self.connection.execute(
+                "SELECT lcd_id, revision, code_system, code, NULL, section, description FROM code_index "
+                "WHERE code_system = ? AND code_key >= ? AND code_key <= ? ORDER BY code_key",
+                (code_system, low, high)).fetchall()
+            ranged += self.connection.execute(
+                "SELECT lcd_id, revision, code_system, code, code_end, section, description FROM range_index "
+                "WHERE code_system = ? AND start_key <= ? AND end_key >= ? ORDER BY start_key",
+                (code_system, high, low)).fetchall()
+        return self._results(codes + ranged)
+
+    def counts(self):
+        policies = self.connection.execute("SELECT COUNT(*) FROM index_state").fetchone()[0]
+        codes = self.connection.execute("SELECT COUNT(*) FROM code_index").fetchone()[0]
+        ranges = self.connection.execute("SELECT COUNT(*) FROM range_index").fetchone()[0]
+        return policies, codes, ranges
+
+    def close(self):
+        self.store.close()
+
+
+def print_results(query, results, seconds):
+    """Print results grouped by LCD, with the sections each code appears in."""
+    lcd_ids = sorted({result['lcd_id'] for result in results}, key=lambda lcd_id: int(lcd_id) if lcd_id.isdigit() else 0)
+    print(f"\n🔎 {query}: {len(lcd_ids)} LCDs, {len(results)} listings ({seconds * 1000:.1f} ms)")
+    for lcd_id in lcd_ids:
+        listings = [result for result in results if result['lcd_id'] == lcd_id]
+        print(f"   L{lcd_id} (revision {listings[0]['revision']})")
+        for result in listings[:10]:
+            code = f"{result['code']}-{result['code_end']}" if result['code_end'] else result['code']
+            print(f"      {result['code_system']:10s} {code:15s} {result['section'][:60]}")
+        if len(listings) > 10:
+            print(f"      ... and {len(listings) - 10} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look up which LCD policies list a CPT/HCPCS or ICD-10 code')
+    parser.add_argument('codes', nargs='*', help='Codes to look up, e.g. 95251 E11.9')
+    parser.add_argument('--prefix', action='append', default=[],
+                        help='Look up every code starting with this prefix, e.g. E11 (repeatable)')
+    parser.add_argument('--system', choices=CODE_SYSTEMS,
+                        help='Code system of the queries (default: told from the shape of each code)')
+    parser.add_argument('--db', default=CODES_DB_FILE, help=f'Codes database (default: {CODES_DB_FILE})')
+    parser.add_argument('--snapshots', action='store_true',
+                        help=f'First extract codes from {SNAPSHOT_DIR} for policies that have none yet')
+    parser.add_argument('--no-update', action='store_true', help='Query the index as it is, without updating it')
+    args = parser.parse_args()
+
+    index = CodeIndex(args.db)
+    try:
+        if args.snapshots:
+            print(f"📄 Extracted codes from {index.index_snapshots()} snapshots")
+        if not args.no_update:
+            started = time.monotonic()
+            updated = index.update()
+            if updated:
+                print(f"🗂️  Indexed {updated} new or changed policies in {time.monotonic() - started:.2f}s")
+
+        policies, codes, ranges = index.counts()
+        print(f"📚 Index: {policies} policies, {codes} codes, {ranges} ranges ({args.db})")
+
+        for code in args.codes:
+            started = time.monotonic()
+            results = index.lookup(code, args.system)
+            print_results(code, results, time.monotonic() - started)
+        for prefix in args.prefix:
+            started = time.monotonic()
+            results = index.lookup_prefix(prefix, args.system)
+            print_results(f"{prefix}*", results, time.monotonic() - started)
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
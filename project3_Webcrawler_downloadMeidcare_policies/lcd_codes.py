@@ -0,0 +1,302 @@
+"""
+lcd_codes.py
+Extracts the CPT/HCPCS and ICD-10 coding tables of a policy from the live DOM.
+
+While Step3 has a policy page open (live, or a snapshot in the render stage)
+one page.evaluate() collects every table with its nearest heading. Tables are
+classified by their heading/caption/header row, or by the shape of their codes,
+and every code row (single codes and ranges like 99202-99205) is stored in
+Download_PDFs/lcd_codes.sqlite:
+
+    policies(lcd_id, revision, url, extracted_date, code_count)
+    codes(lcd_id, revision, code_system, code, code_end, description, section, table_index, row_index)
+
+Rows are keyed by LCD ID and revision (the Revision Effective Date, or a
+content hash prefix when the page has none); re-extracting a revision replaces
+its rows. The database runs in WAL mode so render-farm processes can write
+at the same time.
+
+Snapshots in HTML_Snapshots can be parsed the same way without a browser
+(tables_from_html), for policies downloaded before the codes were extracted.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+from html.parser import HTMLParser
+
+CODES_DB_FILE = "Download_PDFs/lcd_codes.sqlite"
+
+CPT_HCPCS = "CPT/HCPCS"
+ICD10_CM = "ICD-10-CM"
+ICD10_PCS = "ICD-10-PCS"
+
+CODE_PATTERNS = {
+    CPT_HCPCS: re.compile(r'^(?:\d{4}[0-9FTU]|[A-V]\d{4})$'),
+    ICD10_CM: re.compile(r'^[A-TV-Z]\d[0-9A-Z](?:\.[0-9A-Z]{1,4})?$'),
+    ICD10_PCS: re.compile(r'^[0-9A-HJ-NP-Z]{7}$'),
+}
+
+# First cell of a code row: a code, or a range "A - B" / "A through B"
+RANGE_PATTERN = re.compile(r'^([A-Z0-9.]+)\s*(?:-|–|—|THROUGH|TO)\s*([A-Z0-9.]+)$')
+
+# Returns every table with its nearest preceding heading, in one round-trip
+CODE_TABLE_SCRIPT = """
+() => Array.from(document.querySelectorAll('table'), (table, index) => {
+    let section = '';
+    for (let el = table; el && !section; el = el.parentElement) {
+        for (let prev = el.previousElementSibling; prev && !section; prev = prev.previousElementSibling) {
+            if (/^H[1-6]$/.test(prev.tagName)) {
+                section = prev.innerText.trim();
+            } else {
+                const headings = prev.querySelectorAll('h1, h2, h3, h4, h5, h6');
+                if (headings.length) section = headings[headings.length - 1].innerText.trim();
+            }
+        }
+    }
+    return {
+        index: index,
+        section: section,
+        caption: table.caption ? table.caption.innerText.trim() : '',
+        rows: Array.from(table.rows, row => Array.from(row.cells, cell => cell.innerText.trim()))
+    };
+})
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS policies (
+    lcd_id TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    url TEXT,
+    extracted_date TEXT,
+    code_count INTEGER,
+    PRIMARY KEY (lcd_id, revision)
+);
+CREATE TABLE IF NOT EXISTS codes (
+    lcd_id TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    code_system TEXT NOT NULL,
+    code TEXT NOT NULL,
+    code_end TEXT,
+    description TEXT,
+    section TEXT,
+    table_index INTEGER,
+    row_index INTEGER
+);
+CREATE INDEX IF NOT EXISTS codes_by_policy ON codes (lcd_id, revision);
+CREATE INDEX IF NOT EXISTS codes_by_code ON codes (code_system, code);
+"""
+
+
+def code_system_of(code):
+    """Guess the code system from the shape of a code, or None."""
+    if "." in code and CODE_PATTERNS[ICD10_CM].match(code):
+        return ICD10_CM
+    for system in (CPT_HCPCS, ICD10_CM, ICD10_PCS):
+        if CODE_PATTERNS[system].match(code):
+            return system
+    return None
+
+
+def table_system(table):
+    """Classify a table from its heading, caption and header row, or None if they don't say."""
+    header = " ".join(table['rows'][0]) if table['rows'] else ""
+    text = f"{table['section']} {table['caption']} {header}".upper()
+    if "ICD-10-PCS" in text or "ICD-10 PCS" in text:
+        return ICD10_PCS
+    if "ICD-10" in text or "ICD10" in text or "DIAGNOS" in text:
+        return ICD10_CM
+    if "CPT" in text or "HCPCS" in text:
+        return CPT_HCPCS
+    return None
+
+
+def parse_code_cell(cell):
+    """Return (code, code_end) for a code cell, with code_end None for a single code."""
+    cell = re.sub(r'\s+', ' ', cell.strip().upper())
+    match = RANGE_PATTERN.match(cell)
+    if match:
+        return match.group(1), match.group(2)
+    return cell, None
+
+
+def parse_code_tables(tables):
+    """Turn the tables collected by CODE_TABLE_SCRIPT into code rows."""
+    rows = []
+    for table in tables:
+        declared = table_system(table)
+        for row_index, cells in enumerate(table['rows']):
+            if not cells or not cells[0]:
+                continue
+
+            code, code_end = parse_code_cell(cells[0])
+            system = code_system_of(code)
+            if system is None or (code_end and code_system_of(code_end) is None):
+                # Header rows, prose, and anything that isn't a code
+                continue
+            if declared and system != declared:
+                # Trust the table heading when the code fits its pattern too
+                if not CODE_PATTERNS[declared].match(code):
+                    continue
+                system = declared
+
+            rows.append({
+                "code_system": system,
+                "code": code,
+                "code_end": code_end,
+                "description": " ".join(cells[1:]).strip(),
+                "section": table['section'],
+                "table_index": table['index'],
+                "row_index": row_index
+            })
+    return rows
+
+
+class _TableParser(HTMLParser):
+    """Collects tables like CODE_TABLE_SCRIPT does, from static HTML."""
+
+    HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+    SKIPPED = ("script", "style")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self.open_tables = []
+        self.last_heading = ""
+        self.heading_text = None
+        self.caption_text = None
+        self.cell_text = None
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        elif tag in self.HEADINGS:
+            self.heading_text = []
+        elif tag == "table":
+            table = {"index": len(self.tables), "section": self.last_heading, "caption": "", "rows": []}
+            self.tables.append(table)
+            self.open_tables.append(table)
+        elif not self.open_tables:
+            return
+        elif tag == "caption":
+            self.caption_text = []
+        elif tag == "tr":
+            self.open_tables[-1]['rows'].append([])
+        elif tag in ("td", "th"):
+            self._close_cell()
+            self.cell_text = []
+        elif tag == "br" and self.cell_text is not None:
+            self.cell_text.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.HEADINGS and self.heading_text is not None:
+            self.last_heading = " ".join("".join(self.heading_text).split())
+            self.heading_text = None
+        elif tag == "table" and self.open_tables:
+            self._close_cell()
+            self.open_tables.pop()
+        elif tag == "caption" and self.caption_text is not None and self.open_tables:
+            self.open_tables[-1]['caption'] = " ".join("".join(self.caption_text).split())
+            self.caption_text = None
+        elif tag in ("td", "th", "tr"):
+            self._close_cell()
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        for collector in (self.heading_text, self.caption_text, self.cell_text):
+            if collector is not None:
+                collector.append(data)
+
+    def _close_cell(self):
+        if self.cell_text is None or not self.open_tables:
+            self.cell_text = None
+            return
+        rows = self.open_tables[-1]['rows']
+        if not rows:
+            rows.append([])
+        lines = [" ".join(line.split()) for line in "".join(self.cell_text).split("\n")]
+        rows[-1].append("\n".join(line for line in lines if line))
+        self.cell_text = None
+
+
+def tables_from_html(html):
+    """Parse saved policy HTML into the same table records CODE_TABLE_SCRIPT returns."""
+    parser = _TableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tables
+
+
+class CodeTableStore:
+    def __init__(self, filename=CODES_DB_FILE):
+        self.filename = filename
+        self.connection = None
+        self.policies_extracted = 0
+        self.codes_extracted = 0
+
+    def connect(self):
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            self.connection = sqlite3.connect(self.filename, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def has(self, lcd_id, revision):
+        """True if the codes of (lcd_id, revision) were already extracted."""
+        row = self.connect().execute("SELECT 1 FROM policies WHERE lcd_id = ? AND revision = ?",
+                                     (str(lcd_id), revision)).fetchone()
+        return row is not None
+
+    def store(self, lcd_id, revision, url, rows):
+        """Replace the stored codes of (lcd_id, revision) with rows."""
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM codes WHERE lcd_id = ? AND revision = ?", (lcd_id, revision))
+            connection.executemany(
+                "INSERT INTO codes (lcd_id, revision, code_system, code, code_end, description, "
+                "section, table_index, row_index) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(lcd_id, revision, row['code_system'], row['code'], row['code_end'], row['description'],
+                  row['section'], row['table_index'], row['row_index']) for row in rows])
+            connection.execute(
+                "INSERT OR REPLACE INTO policies (lcd_id, revision, url, extracted_date, code_count) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (lcd_id, revision, url, datetime.now().isoformat(), len(rows)))
+
+    async def extract(self, page, lcd_id, revision, url=None):
+        """Extract the coding tables of the open page and store them. Returns the number of codes."""
+        tables = await page.evaluate(CODE_TABLE_SCRIPT)
+        return self.store_tables(lcd_id, revision, url, tables)
+
+    def extract_html(self, html, lcd_id, revision, url=None):
+        """Extract the coding tables of saved policy HTML and store them. Returns the number of codes."""
+        return self.store_tables(lcd_id, revision, url, tables_from_html(html))
+
+    def store_tables(self, lcd_id, revision, url, tables):
+        rows = parse_code_tables(tables)
+        self.store(str(lcd_id), revision, url, rows)
+        self.policies_extracted += 1
+        self.codes_extracted += len(rows)
+        return len(rows)
+
+    def print_summary(self):
+        if self.policies_extracted:
+            print(f"🧾 Extracted {self.codes_extracted} billing/diagnosis codes from "
+                  f"{self.policies_extracted} policies into {self.filename}")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def revision_key(fingerprint):
+    """The revision a set of codes belongs to: the revision date, else a content hash prefix."""
+    if not fingerprint:
+        return "unknown"
+    return fingerprint.get('revision_effective_date') or (fingerprint.get('content_hash') or "unknown")[:12]
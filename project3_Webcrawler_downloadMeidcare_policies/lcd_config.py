@@ -0,0 +1,42 @@
+"""
+lcd_config.py
+Where the Medicare Coverage Database lives.
+
+Every Project3 script builds its MCD URLs from MCD_BASE_URL, which defaults to
+the real site and can be pointed elsewhere (e.g. the local stand-in from
+fake_mcd_server.py) with an environment variable:
+
+    MCD_BASE_URL=http://127.0.0.1:8765/medicare-coverage-database python Step3_Download_Allpolicies.py
+
+Policy URLs already stored in the catalog point at the real site; rebase_url()
+moves them onto the configured base.
+"""
+
+import os
+from urllib.parse import urlparse
+
+DEFAULT_MCD_BASE_URL = "https://www.cms.gov/medicare-coverage-database"
+
+MCD_BASE_URL = os.environ.get("MCD_BASE_URL", DEFAULT_MCD_BASE_URL).rstrip("/")
+
+_parsed = urlparse(MCD_BASE_URL)
+SITE_ROOT = f"{_parsed.scheme}://{_parsed.netloc}"
+MCD_HOST = (_parsed.hostname or "").lower()
+
+
+def mcd_url(path):
+    """Absolute URL of a page below the MCD base, e.g. mcd_url("search.aspx")."""
+    return f"{MCD_BASE_URL}/{path.lstrip('/')}"
+
+
+def lcd_url(lcd_id, doc_id=None):
+    """URL of the LCD view page for lcd_id."""
+    url = mcd_url(f"view/lcd.aspx?LCDId={lcd_id}")
+    return f"{url}&DocID={doc_id}" if doc_id else url
+
+
+def rebase_url(url):
+    """Move a URL recorded against the real site onto the configured base."""
+    if MCD_BASE_URL != DEFAULT_MCD_BASE_URL and url.startswith(DEFAULT_MCD_BASE_URL):
+        return MCD_BASE_URL + url[len(DEFAULT_MCD_BASE_URL):]
+    return url
@@ -0,0 +1,186 @@
+"""
+lcd_http_validator.py
+Browserless validation of LCD IDs over plain HTTP.
+
+Deciding whether an LCD ID exists does not need Chromium. LCDHttpValidator
+fetches lcd.aspx?LCDId=... with a pooled async HTTP client (httpx), reusing
+the cookies of the saved "I Accept" session (see lcd_session.py), and
+classifies each ID from the response alone:
+
+- valid:     a Local Coverage Determination page for this ID
+- retired:   an LCD page that is marked as retired
+- invalid:   404/410, an error page, or a redirect away from the LCD view
+             (error wording only counts in the page's <title>/<h1>, since a
+             real LCD's text can quote it)
+- ambiguous: consent gate shown, server error, timeout, or a page we can't read
+
+Only ambiguous IDs need to be re-checked in the browser.
+
+Requires httpx (pip install httpx). Without it HTTP_VALIDATION_AVAILABLE is
+False and the finders use the browser for every ID as before.
+"""
+
+import asyncio
+import json
+import re
+from datetime import datetime
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from lcd_session import CONSENT_STATE_FILE
+from lcd_config import mcd_url
+
+HTTP_VALIDATION_AVAILABLE = httpx is not None
+
+LCD_URL_TEMPLATE = mcd_url("view/lcd.aspx?LCDId={lcd_id}")
+
+VALID = "valid"
+RETIRED = "retired"
+INVALID = "invalid"
+AMBIGUOUS = "ambiguous"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+CONSENT_MARKERS = ("value=\"i accept\"", "value='i accept'", ">i accept<", "license agreement")
+# Matched against the page's <title> and <h1>; in the body only when there is no LCD content
+ERROR_MARKERS = ("page not found", "no longer available", "invalid lcd", "an error has occurred",
+                 "the document you requested", "could not be found")
+RETIRED_MARKERS = ("this lcd has been retired", "lcd status: retired", "status: retired")
+RETIREMENT_DATE_PATTERN = r'retirement date[:\s]*(?:<[^>]+>\s*)*\d{1,2}/\d{1,2}/\d{4}'
+
+
+def _strip_tags(html):
+    return re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', html)).strip()
+
+
+def _extract_title(html, lcd_id):
+    """Prefer the page's <h1>, then <title>, then a generic name."""
+    for pattern in (r'<h1[^>]*>(.*?)</h1>', r'<title[^>]*>(.*?)</title>'):
+        match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+        if match:
+            title = _strip_tags(match.group(1)).replace(" - CMS", "").strip()
+            if title:
+                return title
+    return f"LCD Policy L{lcd_id}"
+
+
+def _heading_text(html):
+    """The page's <title> and <h1> text, lower-cased."""
+    headings = re.findall(r'<(?:title|h1)[^>]*>(.*?)</(?:title|h1)>', html, re.IGNORECASE | re.DOTALL)
+    return _strip_tags(" ".join(headings)).lower()
+
+
+class LCDHttpValidator:
+    def __init__(self, concurrency=20, timeout=10, state_file=CONSENT_STATE_FILE):
+        if httpx is None:
+            raise RuntimeError("httpx is not installed. Please install it first: pip install httpx")
+
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.state_file = state_file
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.client = None
+        self.counts = {VALID: 0, RETIRED: 0, INVALID: 0, AMBIGUOUS: 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Create the pooled HTTP client and load the consent cookies."""
+        self.client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency,
+                                max_keepalive_connections=self.concurrency)
+        )
+        self.load_consent_cookies()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def load_consent_cookies(self):
+        """Copy the cookies of the saved browser consent session into the HTTP client."""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+
+        for cookie in state.get('cookies', []):
+            self.client.cookies.set(cookie['name'], cookie['value'],
+                                    domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+        return len(state.get('cookies', []))
+
+    def classify_response(self, lcd_id, status_code, final_url, html):
+        """Classify one response. Returns (classification, policy_info or None)."""
+        if status_code in (404, 410):
+            return INVALID, None
+        if status_code != 200:
+            # Server errors, throttling, WAF blocks: let the browser decide
+            return AMBIGUOUS, None
+
+        if "lcd.aspx" not in final_url.lower():
+            # Bounced to search or an error page
+            return INVALID, None
+
+        lower = html.lower()
+        if any(marker in lower for marker in CONSENT_MARKERS) and "local coverage determination" not in lower:
+            return AMBIGUOUS, None
+        heading = _heading_text(html)
+        if any(marker in heading for marker in ERROR_MARKERS):
+            return INVALID, None
+        if "local coverage determination" not in lower:
+            if any(marker in lower for marker in ERROR_MARKERS):
+                return INVALID, None
+            # Probably a script-rendered shell; only a browser can tell
+            return AMBIGUOUS, None
+
+        retired = (any(marker in lower for marker in RETIRED_MARKERS) or
+                   re.search(RETIREMENT_DATE_PATTERN, lower) is not None)
+
+        doc_id_match = re.search(rf'\b(L{lcd_id})\b', html)
+        policy_info = {
+            "lcd_id": str(lcd_id),
+            "doc_id": doc_id_match.group(1) if doc_id_match else f"L{lcd_id}",
+            "title": _extract_title(html, lcd_id),
+            "url": LCD_URL_TEMPLATE.format(lcd_id=lcd_id),
+            "found_date": datetime.now().isoformat(),
+            "lcd_status": RETIRED if retired else "active"
+        }
+        return (RETIRED if retired else VALID), policy_info
+
+    async def classify(self, lcd_id):
+        """Fetch and classify one LCD ID. Returns (classification, policy_info or None)."""
+        url = LCD_URL_TEMPLATE.format(lcd_id=lcd_id)
+        async with self.semaphore:
+            try:
+                response = await self.client.get(url)
+                result = self.classify_response(lcd_id, response.status_code, str(response.url), response.text)
+            except Exception:
+                result = (AMBIGUOUS, None)
+
+        self.counts[result[0]] += 1
+        return result
+
+    async def classify_many(self, lcd_ids):
+        """Classify many IDs concurrently. Returns {lcd_id: (classification, policy_info)}."""
+        results = await asyncio.gather(*[self.classify(lcd_id) for lcd_id in lcd_ids])
+        return dict(zip(lcd_ids, results))
+
+    def print_summary(self):
+        """Print how the IDs were classified."""
+        total = sum(self.counts.values())
+        if total:
+            print(f"⚡ HTTP validation of {total} IDs: {self.counts[VALID]} valid, "
+                  f"{self.counts[RETIRED]} retired, {self.counts[INVALID]} invalid, "
+                  f"{self.counts[AMBIGUOUS]} sent to the browser")
@@ -0,0 +1,123 @@
+"""
+lcd_journal.py
+Append-only job journal that makes Step3 runs resumable.
+
+Every state change of a policy is appended as one JSON line to
+Download_PDFs/journal.jsonl:
+- pending: written for every policy when a run starts (with the full policy record)
+- done:    the PDF (or snapshot) is safely on disk, or it already was
+- failed:  with the error message
+
+Each done/failed line carries the attempt number for that policy across all
+runs. Because the file is only ever appended to and flushed per line, a killed
+run loses at most the line being written. `--resume` replays the journal and
+continues the last run with exactly the policies it had not finished.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+
+JOURNAL_FILE = "Download_PDFs/journal.jsonl"
+
+
+class JobJournal:
+    def __init__(self, filename=JOURNAL_FILE):
+        self.filename = filename
+        self.run_id = None
+        self.attempts = {}
+        self._file = None
+
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        for entry in self.read_entries():
+            if entry.get('state') in ("done", "failed"):
+                self.attempts[entry['lcd_id']] = entry.get('attempt', 0)
+
+    def read_entries(self):
+        """Yield journal entries in order, ignoring a torn last line."""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    def resume_policies(self):
+        """
+        Return the policies the most recent run did not finish, in their original order.
+
+        Returns None if the journal holds no previous run.
+        """
+        last_run_id = None
+        policies = {}
+        order = []
+        final_state = {}
+
+        for entry in self.read_entries():
+            if entry.get('state') == "pending":
+                if entry['run_id'] != last_run_id:
+                    # A newer run started; only its policies matter
+                    last_run_id = entry['run_id']
+                    policies, order, final_state = {}, [], {}
+                policies[entry['lcd_id']] = entry['policy']
+                order.append(entry['lcd_id'])
+            elif entry.get('run_id') == last_run_id:
+                final_state[entry['lcd_id']] = entry['state']
+
+        if last_run_id is None:
+            return None
+
+        return [policies[lcd_id] for lcd_id in order if final_state.get(lcd_id) != "done"]
+
+    def _append(self, entry):
+        if self._file is None:
+            torn = False
+            if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+                with open(self.filename, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._file = open(self.filename, 'a', encoding='utf-8')
+            # Terminate a line torn by a previous crash so it doesn't swallow ours
+            if torn:
+                self._file.write("\n")
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def start_run(self, policies):
+        """Begin a new run and mark every policy in it as pending."""
+        self.run_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        for policy in policies:
+            self._append({
+                "run_id": self.run_id,
+                "lcd_id": str(policy['lcd_id']),
+                "state": "pending",
+                "time": now,
+                "policy": policy
+            })
+
+    def record(self, policy, state, error=None):
+        """Append a done/failed result for a policy."""
+        lcd_id = str(policy['lcd_id'])
+        attempt = self.attempts.get(lcd_id, 0) + 1
+        self.attempts[lcd_id] = attempt
+
+        entry = {
+            "run_id": self.run_id,
+            "lcd_id": lcd_id,
+            "state": state,
+            "attempt": attempt,
+            "time": datetime.now().isoformat()
+        }
+        if error:
+            entry['error'] = error
+        self._append(entry)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
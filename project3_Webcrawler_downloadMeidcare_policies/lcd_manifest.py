@@ -0,0 +1,149 @@
+"""
+lcd_manifest.py
+Tracks what each downloaded LCD policy looked like so refreshes only redo changed ones.
+
+For every stored policy the manifest (Download_PDFs/manifest.json) records:
+- ETag / Last-Modified from the policy page response, used for conditional requests
+- Revision and original effective dates parsed from the policy text
+- A SHA-256 hash of the policy body text, the final word on whether it changed
+
+Step3 --refresh first tries a conditional GET (304 = unchanged) when validators
+are known, then falls back to comparing the body hash of the live page before
+re-rendering anything.
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+MANIFEST_FILE = "Download_PDFs/manifest.json"
+
+# Hash the policy body only, so page chrome (dates, banners) doesn't count as a change
+CONTENT_SELECTOR = "#lcdContent, .lcd-content, .document-content, main"
+
+CONTENT_TEXT_SCRIPT = """
+(selector) => {
+    const el = document.querySelector(selector) || document.body;
+    return el ? el.innerText : '';
+}
+"""
+
+REVISION_PATTERNS = {
+    "revision_effective_date": r'Revision Effective Date[:\s]*(\d{1,2}/\d{1,2}/\d{4})',
+    "original_effective_date": r'Original Effective Date[:\s]*(\d{1,2}/\d{1,2}/\d{4})',
+}
+
+# Write the manifest to disk after this many updates (and always at the end).
+# Render-farm processes disable autosave and hand their updates to the parent.
+SAVE_EVERY = 25
+
+
+class PolicyManifest:
+    def __init__(self, filename=MANIFEST_FILE, autosave=True):
+        self.filename = filename
+        self.autosave = autosave
+        self.entries = {}
+        self.updated = {}
+        self._unsaved = 0
+        self.load()
+
+    def load(self):
+        """Load the manifest from disk, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('policies', {})
+        except FileNotFoundError:
+            self.entries = {}
+        except json.JSONDecodeError:
+            print(f"⚠️  {self.filename} is not valid JSON, starting a new manifest")
+            self.entries = {}
+
+    def save(self):
+        """Write the manifest atomically."""
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        output_data = {
+            "updated_date": datetime.now().isoformat(),
+            "total_policies": len(self.entries),
+            "policies": self.entries
+        }
+        tmp_file = f"{self.filename}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.filename)
+        self._unsaved = 0
+
+    def get(self, lcd_id):
+        return self.entries.get(str(lcd_id))
+
+    async def not_modified(self, page, policy):
+        """
+        Ask the server whether the policy changed since the last download.
+
+        Returns True only on a 304 response to a conditional GET. Without a
+        stored ETag/Last-Modified (or on any error) this returns False and the
+        caller falls back to comparing content hashes.
+        """
+        entry = self.get(policy['lcd_id'])
+        if not entry:
+            return False
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        if not headers:
+            return False
+
+        try:
+            response = await page.context.request.get(policy['url'], headers=headers, timeout=15000)
+            return response.status == 304
+        except Exception:
+            return False
+
+    async def fingerprint(self, page, response=None):
+        """Collect validators, revision dates and a body hash from a loaded policy page."""
+        text = await page.evaluate(CONTENT_TEXT_SCRIPT, CONTENT_SELECTOR)
+        normalized = " ".join(text.split())
+
+        fingerprint = {
+            "etag": None,
+            "last_modified": None,
+            "content_hash": hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        }
+
+        if response is not None:
+            fingerprint['etag'] = response.headers.get('etag')
+            fingerprint['last_modified'] = response.headers.get('last-modified')
+
+        for field, pattern in REVISION_PATTERNS.items():
+            match = re.search(pattern, normalized, re.IGNORECASE)
+            fingerprint[field] = match.group(1) if match else None
+
+        return fingerprint
+
+    def is_unchanged(self, lcd_id, fingerprint):
+        """True if the stored body hash matches the fingerprint of the live page."""
+        entry = self.get(lcd_id)
+        return bool(entry) and entry.get('content_hash') == fingerprint['content_hash']
+
+    def update(self, lcd_id, fingerprint, output_file):
+        """Record a freshly stored policy and periodically flush the manifest."""
+        entry = {
+            **fingerprint,
+            "file": output_file,
+            "stored_date": datetime.now().isoformat()
+        }
+        self.entries[str(lcd_id)] = entry
+        self.updated[str(lcd_id)] = entry
+        self._unsaved += 1
+        if self.autosave and self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def merge(self, entries):
+        """Take over entries updated elsewhere (e.g. by a render-farm process)."""
+        self.entries.update(entries)
+        self.updated.update(entries)
+        self._unsaved += len(entries)
@@ -0,0 +1,142 @@
+"""
+lcd_memory.py
+Renderer memory watermarks and page recycling for long Step3 runs.
+
+Chromium renderers keep growing over hundreds of heavy policy pages. Step3
+workers ask MemoryWatch after every policy whether to throw their browser
+context away and open a fresh one:
+- every --recycle-every policies on the same page, and
+- whenever the Chromium renderer processes of this run together use more than
+  --memory-watermark MB of RSS
+
+Renderer RSS is the sum over the descendants of this process whose command
+line has --type=renderer. It is read with psutil when installed, from /proc
+on Linux otherwise; elsewhere only the policy count triggers recycling. The
+summary reports the renderer high-water mark and how often pages were recycled.
+"""
+
+import os
+import resource
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RECYCLE_EVERY = 50
+MEMORY_WATERMARK_MB = 1500
+
+# Renderer RSS is sampled at most this often; workers share the last sample
+SAMPLE_INTERVAL = 2.0
+
+RENDERER_FLAG = "--type=renderer"
+
+
+def _psutil_renderer_rss(root_pid):
+    total = 0
+    for proc in psutil.Process(root_pid).children(recursive=True):
+        try:
+            if RENDERER_FLAG in proc.cmdline():
+                total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total
+
+
+def _proc_renderer_rss(root_pid):
+    parents = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; the parent PID follows the state after ')'
+        parents[int(name)] = int(stat.rsplit(")", 1)[1].split()[1])
+
+    children = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    pending = list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                if RENDERER_FLAG.encode() not in f.read():
+                    continue
+            with open(f"/proc/{pid}/statm", 'r') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+def renderer_rss_bytes(root_pid=None):
+    """Total RSS of the Chromium renderers under root_pid (this process), or None if unknown."""
+    root_pid = root_pid or os.getpid()
+    if psutil is not None:
+        return _psutil_renderer_rss(root_pid)
+    if os.path.isdir("/proc"):
+        return _proc_renderer_rss(root_pid)
+    return None
+
+
+class MemoryWatch:
+    def __init__(self, recycle_every=RECYCLE_EVERY, watermark_mb=MEMORY_WATERMARK_MB,
+                 sample_interval=SAMPLE_INTERVAL):
+        self.recycle_every = max(0, recycle_every)
+        self.watermark_bytes = max(0, watermark_mb) * 1024 * 1024
+        self.sample_interval = sample_interval
+        self.available = renderer_rss_bytes() is not None
+        self.last_rss = 0
+        self.last_sampled = 0.0
+        self.peak_rss = 0
+        self.recycled_by_count = 0
+        self.recycled_by_memory = 0
+
+    def sample(self):
+        """Current renderer RSS in bytes (re-read at most every sample_interval seconds)."""
+        if not self.available:
+            return 0
+        if time.monotonic() - self.last_sampled >= self.sample_interval:
+            self.last_rss = renderer_rss_bytes() or 0
+            self.last_sampled = time.monotonic()
+            self.peak_rss = max(self.peak_rss, self.last_rss)
+        return self.last_rss
+
+    def recycle_reason(self, policies_on_page):
+        """'count' or 'memory' if a worker should recycle its page now, else None."""
+        rss = self.sample()
+        if self.recycle_every and policies_on_page >= self.recycle_every:
+            return "count"
+        if self.watermark_bytes and rss > self.watermark_bytes:
+            return "memory"
+        return None
+
+    def record_recycle(self, reason):
+        if reason == "memory":
+            self.recycled_by_memory += 1
+            # Measure again before the next worker decides, now that a renderer is gone
+            self.last_sampled = 0.0
+        else:
+            self.recycled_by_count += 1
+
+    def print_summary(self):
+        mb = 1024 * 1024
+        python_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 / mb
+        if self.available:
+            watermark = f"watermark {self.watermark_bytes / mb:.0f} MB" if self.watermark_bytes else "no watermark"
+            print(f"🧠 Renderer memory high-water mark: {self.peak_rss / mb:.0f} MB ({watermark}); "
+                  f"pipeline process: {python_peak:.0f} MB")
+        else:
+            print(f"🧠 Renderer memory not measurable here (install psutil); pipeline process: {python_peak:.0f} MB")
+        if self.recycled_by_count or self.recycled_by_memory:
+            print(f"♻️  Pages recycled: {self.recycled_by_count} after {self.recycle_every} policies, "
+                  f"{self.recycled_by_memory} over the memory watermark")
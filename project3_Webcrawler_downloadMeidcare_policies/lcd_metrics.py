@@ -0,0 +1,230 @@
+"""
+lcd_metrics.py
+Per-policy stage timing and byte accounting for Step3.
+
+For every policy attempt a PolicyMetrics record collects:
+- seconds spent in each stage (goto, consent, ready, fingerprint, snapshot, pdf, ...)
+- bytes transferred by the page, from Playwright's requestfinished events
+- PDF size and page count
+- the outcome (downloaded, skipped, unchanged, snapshot, error)
+
+Records are appended to Download_PDFs/metrics.jsonl as they complete, the
+summary shows a p50/p95/max breakdown per stage, and with a Prometheus
+textfile path the totals are also written in the node exporter textfile
+format (refreshed every PROMETHEUS_EVERY policies and at the end).
+"""
+
+import json
+import os
+import re
+import time
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from lcd_readiness import percentile
+
+METRICS_FILE = "Download_PDFs/metrics.jsonl"
+
+PROMETHEUS_EVERY = 25
+
+# Page objects of a Chromium PDF ("/Type /Pages" is the page tree, not a page)
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+# Compressed object streams, where optimized (compact profile) PDFs keep their page dictionaries
+OBJECT_STREAM_PATTERN = re.compile(rb'/Type\s*/ObjStm(?![a-zA-Z])')
+STREAM_START_PATTERN = re.compile(rb'stream\r?\n')
+
+
+def count_pdf_pages(pdf_bytes):
+    """Page objects in a PDF, including those packed into FlateDecode object streams."""
+    count = len(PDF_PAGE_PATTERN.findall(pdf_bytes))
+    for match in OBJECT_STREAM_PATTERN.finditer(pdf_bytes):
+        start = STREAM_START_PATTERN.search(pdf_bytes, match.end())
+        end = pdf_bytes.find(b"endstream", start.end()) if start else -1
+        if end < 0:
+            continue
+        try:
+            count += len(PDF_PAGE_PATTERN.findall(zlib.decompressobj().decompress(pdf_bytes[start.end():end])))
+        except zlib.error:
+            continue
+    return count
+
+
+class PolicyMetrics:
+    def __init__(self, lcd_id, attempt=1):
+        self.started = time.monotonic()
+        self.stages = defaultdict(float)
+        self.record = {
+            "lcd_id": str(lcd_id),
+            "attempt": attempt,
+            "outcome": None,
+            "bytes_transferred": 0,
+            "requests": 0,
+            "pdf_bytes": None,
+            "pdf_pages": None
+        }
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; repeated stages add up."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.monotonic() - started
+
+    def add_transfer(self, size):
+        self.record['bytes_transferred'] += size
+        self.record['requests'] += 1
+
+    def set_pdf(self, pdf_bytes, pages=None):
+        """Record the stored PDF; pages counted before optimization can be passed in."""
+        self.record['pdf_bytes'] = len(pdf_bytes)
+        self.record['pdf_pages'] = count_pdf_pages(pdf_bytes) if pages is None else pages
+
+    def set_outcome(self, outcome):
+        self.record['outcome'] = outcome
+
+    def finish(self, ok):
+        if self.record['outcome'] is None:
+            self.record['outcome'] = "downloaded" if ok else "error"
+        self.record['total_seconds'] = round(time.monotonic() - self.started, 4)
+        self.record['stages'] = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+        self.record['time'] = datetime.now().isoformat()
+        return self.record
+
+
+class PipelineMetrics:
+    def __init__(self, filename=METRICS_FILE, prometheus_file=None):
+        self.filename = filename
+        self.prometheus_file = prometheus_file
+        self.records = []
+        self.active = {}
+        self._file = None
+
+    def attach(self, page):
+        """Count the bytes of every finished request of page towards its current policy."""
+
+        async def on_request_finished(request):
+            metrics = self.active.get(page)
+            if metrics is None:
+                return
+            try:
+                sizes = await request.sizes()
+                metrics.add_transfer(sizes['responseBodySize'] + sizes['responseHeadersSize'])
+            except Exception:
+                pass
+
+        page.on("requestfinished", on_request_finished)
+
+    def start(self, page, policy, attempt=1):
+        metrics = PolicyMetrics(policy['lcd_id'], attempt)
+        self.active[page] = metrics
+        return metrics
+
+    def current(self, page):
+        """The metrics of the policy page is working on (a throwaway record if none)."""
+        return self.active.get(page) or PolicyMetrics("unknown")
+
+    def finish(self, page, ok):
+        """Close the current record of page and append it to the metrics file."""
+        metrics = self.active.pop(page, None)
+        if metrics is None:
+            return None
+
+        record = metrics.finish(ok)
+        self.records.append(record)
+        self._append(record)
+        if self.prometheus_file and len(self.records) % PROMETHEUS_EVERY == 0:
+            self.write_prometheus()
+        return record
+
+    def _append(self, record):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            self._file = open(self.filename, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def stage_times(self):
+        """Return {stage: [seconds, ...]} over all records."""
+        times = defaultdict(list)
+        for record in self.records:
+            for name, seconds in record['stages'].items():
+                times[name].append(seconds)
+            times['total'].append(record['total_seconds'])
+        return times
+
+    def print_summary(self):
+        """Print the per-stage breakdown and byte totals."""
+        if not self.records:
+            return
+
+        print(f"⏱️  Stage timings over {len(self.records)} policy attempts (p50 / p95 / max):")
+        for name, values in self.stage_times().items():
+            print(f"   {name:12s} {percentile(values, 50):6.2f}s / {percentile(values, 95):6.2f}s / "
+                  f"{max(values):6.2f}s  (n={len(values)})")
+
+        transferred = sum(record['bytes_transferred'] for record in self.records)
+        pdf_sizes = [record['pdf_bytes'] for record in self.records if record['pdf_bytes']]
+        print(f"📶 Transferred: {transferred / (1024 * 1024):.1f} MB in "
+              f"{sum(record['requests'] for record in self.records)} requests")
+        if pdf_sizes:
+            pages = [record['pdf_pages'] for record in self.records if record['pdf_bytes']]
+            print(f"📄 PDFs: {sum(pdf_sizes) / (1024 * 1024):.1f} MB, {sum(pages)} pages, "
+                  f"p50 {percentile(pdf_sizes, 50) / 1024:.0f} KB, max {max(pdf_sizes) / 1024:.0f} KB")
+        print(f"📈 Metrics: {self.filename}" +
+              (f", Prometheus: {self.prometheus_file}" if self.prometheus_file else ""))
+
+    def write_prometheus(self):
+        """Write totals in the Prometheus textfile format, atomically."""
+        lines = [
+            "# HELP lcd_policy_attempts_total Policy attempts by outcome.",
+            "# TYPE lcd_policy_attempts_total counter",
+        ]
+        outcomes = defaultdict(int)
+        for record in self.records:
+            outcomes[record['outcome']] += 1
+        for outcome, count in sorted(outcomes.items()):
+            lines.append(f'lcd_policy_attempts_total{{outcome="{outcome}"}} {count}')
+
+        lines += [
+            "# HELP lcd_stage_seconds Time spent per policy in each pipeline stage.",
+            "# TYPE lcd_stage_seconds summary",
+        ]
+        for name, values in sorted(self.stage_times().items()):
+            for quantile in (0.5, 0.95):
+                lines.append(f'lcd_stage_seconds{{stage="{name}",quantile="{quantile}"}} '
+                             f'{percentile(values, quantile * 100):.4f}')
+            lines.append(f'lcd_stage_seconds_sum{{stage="{name}"}} {sum(values):.4f}')
+            lines.append(f'lcd_stage_seconds_count{{stage="{name}"}} {len(values)}')
+
+        lines += [
+            "# HELP lcd_bytes_transferred_total Bytes received by policy pages.",
+            "# TYPE lcd_bytes_transferred_total counter",
+            f"lcd_bytes_transferred_total {sum(record['bytes_transferred'] for record in self.records)}",
+            "# HELP lcd_pdf_bytes_total Bytes of PDFs written.",
+            "# TYPE lcd_pdf_bytes_total counter",
+            f"lcd_pdf_bytes_total {sum(record['pdf_bytes'] or 0 for record in self.records)}",
+            "# HELP lcd_pdf_pages_total Pages of PDFs written.",
+            "# TYPE lcd_pdf_pages_total counter",
+            f"lcd_pdf_pages_total {sum(record['pdf_pages'] or 0 for record in self.records)}",
+        ]
+
+        tmp_file = f"{self.prometheus_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_file, self.prometheus_file)
+
+    def merge(self, records):
+        """Take over records collected elsewhere (e.g. by a render-farm process)."""
+        self.records.extend(records)
+
+    def close(self):
+        if self.prometheus_file and self.records:
+            self.write_prometheus()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,148 @@
+"""
+lcd_pdf_profile.py
+PDF output profiles for Step3 (--profile).
+
+- standard: the Step1 look, print backgrounds and all (the default)
+- compact:  print-media emulation, no backgrounds, site chrome and decorative
+            images hidden, then a post-render optimization pass
+
+The optimization pass uses whatever is installed, and keeps the result only
+if it is smaller:
+- Ghostscript (gs): font subsetting/compression, image downsampling, duplicate image detection
+- pikepdf (pip install pikepdf): object stream generation and stream recompression
+
+Without either the compact profile still saves the bytes from dropping
+backgrounds and images; the summary says the optimizer was skipped.
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+GHOSTSCRIPT = shutil.which("gs")
+
+PDF_PROFILES = ("standard", "compact")
+
+COMPACT_IMAGE_DPI = 150
+
+# Site chrome and decoration hidden in the compact profile; images inside
+# the policy body (diagrams, tables) are kept
+COMPACT_CSS = """
+header, nav, footer, aside, iframe, video,
+.breadcrumb, .breadcrumbs, .header, .footer, .navbar, .nav, .sidebar, .social, .share,
+[role="banner"], [role="navigation"], [role="contentinfo"] { display: none !important; }
+img:not(#lcdContent img):not(.lcd-content img):not(.document-content img) { display: none !important; }
+* { background: none !important; box-shadow: none !important; text-shadow: none !important; }
+"""
+
+
+def _ghostscript(pdf_path, out_path, image_dpi):
+    subprocess.run([
+        GHOSTSCRIPT, "-q", "-dNOPAUSE", "-dBATCH", "-dSAFER", "-sDEVICE=pdfwrite",
+        "-dCompatibilityLevel=1.5", "-dDetectDuplicateImages=true",
+        "-dSubsetFonts=true", "-dCompressFonts=true",
+        "-dDownsampleColorImages=true", f"-dColorImageResolution={image_dpi}",
+        "-dDownsampleGrayImages=true", f"-dGrayImageResolution={image_dpi}",
+        "-dDownsampleMonoImages=true", f"-dMonoImageResolution={image_dpi * 2}",
+        f"-sOutputFile={out_path}", pdf_path
+    ], check=True, timeout=120, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _pikepdf(pdf_path, out_path):
+    with pikepdf.open(pdf_path) as pdf:
+        pdf.save(out_path, compress_streams=True, recompress_flate=True,
+                 object_stream_mode=pikepdf.ObjectStreamMode.generate)
+
+
+def optimize_pdf_bytes(pdf_bytes, image_dpi=COMPACT_IMAGE_DPI):
+    """Run the available optimizers over pdf_bytes and return the smallest result."""
+    best = pdf_bytes
+    with tempfile.TemporaryDirectory(prefix="lcd_pdf_") as tmp_dir:
+        current = os.path.join(tmp_dir, "in.pdf")
+        with open(current, 'wb') as f:
+            f.write(pdf_bytes)
+
+        steps = []
+        if GHOSTSCRIPT:
+            steps.append(("gs.pdf", lambda src, dst: _ghostscript(src, dst, image_dpi)))
+        if pikepdf is not None:
+            steps.append(("pikepdf.pdf", _pikepdf))
+
+        for name, step in steps:
+            out_path = os.path.join(tmp_dir, name)
+            try:
+                step(current, out_path)
+            except Exception:
+                continue
+            with open(out_path, 'rb') as f:
+                data = f.read()
+            if data and len(data) < len(best):
+                best = data
+            current = out_path
+
+    return best
+
+
+class PDFProfile:
+    def __init__(self, name="standard", image_dpi=COMPACT_IMAGE_DPI):
+        if name not in PDF_PROFILES:
+            raise ValueError(f"Unknown PDF profile '{name}'. Choose from: {', '.join(PDF_PROFILES)}")
+
+        self.name = name
+        self.image_dpi = image_dpi
+        self.optimizer_available = bool(GHOSTSCRIPT or pikepdf is not None)
+        self.rendered_bytes = 0
+        self.final_bytes = 0
+        self.previous_bytes = 0
+        self.replaced_bytes = 0
+
+    @property
+    def compact(self):
+        return self.name == "compact"
+
+    def pdf_options(self, options):
+        """Adjust page.pdf() options for this profile."""
+        if self.compact:
+            return {**options, 'print_background': False}
+        return options
+
+    async def prepare(self, page):
+        """Get a loaded page ready for printing with this profile."""
+        if self.compact:
+            await page.emulate_media(media="print")
+            await page.add_style_tag(content=COMPACT_CSS)
+
+    async def finalize(self, pdf_bytes):
+        """Return the bytes to store, optimized for the compact profile."""
+        self.rendered_bytes += len(pdf_bytes)
+        if self.compact and self.optimizer_available:
+            pdf_bytes = await asyncio.to_thread(optimize_pdf_bytes, pdf_bytes, self.image_dpi)
+        self.final_bytes += len(pdf_bytes)
+        return pdf_bytes
+
+    def record_replaced(self, previous_size, new_size):
+        """Remember the size of a PDF this run replaced, to report savings against it."""
+        self.previous_bytes += previous_size
+        self.replaced_bytes += new_size
+
+    def print_summary(self):
+        if not self.compact or not self.rendered_bytes:
+            return
+
+        mb = 1024 * 1024
+        if self.optimizer_available:
+            print(f"🗜️  Compact profile: optimizer saved {(self.rendered_bytes - self.final_bytes) / mb:.1f} MB "
+                  f"({self.rendered_bytes / mb:.1f} MB rendered -> {self.final_bytes / mb:.1f} MB stored)")
+        else:
+            print("🗜️  Compact profile: optimizer skipped (install Ghostscript or pikepdf for smaller files)")
+        if self.previous_bytes:
+            saved = self.previous_bytes - self.replaced_bytes
+            print(f"🗜️  Replaced PDFs: {self.previous_bytes / mb:.1f} MB -> {self.replaced_bytes / mb:.1f} MB "
+                  f"({saved / mb:.1f} MB saved, {saved / self.previous_bytes:.0%})")
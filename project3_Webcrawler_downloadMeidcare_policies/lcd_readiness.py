@@ -0,0 +1,133 @@
+"""
+lcd_readiness.py
+Event-driven page readiness for the CMS Medicare Coverage Database pages.
+
+Replaces fixed wait_for_timeout sleeps with waits on concrete signals:
+1. The expected content selector (the LCD policy body by default) is present
+2. Web fonts have finished loading (document.fonts.ready)
+3. No XHR/fetch requests have been pending for a short quiet window
+
+Every wait is bounded by a configurable ceiling and its actual duration is
+recorded, so scripts can report how long pages really took to become ready.
+"""
+
+import asyncio
+import math
+import time
+
+# Content that marks an LCD policy page as rendered
+POLICY_BODY_SELECTOR = "#lcdContent, .lcd-content, .document-content, main h1, h1"
+
+# For search, report and validation pages where any rendered body will do
+ANY_PAGE_SELECTOR = "body"
+
+READY_TIMEOUT_MS = 10000
+QUIET_WINDOW_MS = 250
+
+XHR_RESOURCE_TYPES = ("xhr", "fetch")
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile (0-100) of values using nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class PageReadiness:
+    def __init__(self, body_selector=POLICY_BODY_SELECTOR, timeout_ms=READY_TIMEOUT_MS,
+                 quiet_ms=QUIET_WINDOW_MS):
+        self.body_selector = body_selector
+        self.timeout_ms = timeout_ms
+        self.quiet_ms = quiet_ms
+        self.wait_times = []
+        self.timed_out_count = 0
+        self._pending = {}
+
+    def attach(self, page):
+        """Start tracking in-flight XHR/fetch requests for a page."""
+        pending = set()
+        self._pending[page] = pending
+
+        def on_request(request):
+            if request.resource_type in XHR_RESOURCE_TYPES:
+                pending.add(request)
+
+        page.on("request", on_request)
+        page.on("requestfinished", pending.discard)
+        page.on("requestfailed", pending.discard)
+        page.on("close", lambda _: self._pending.pop(page, None))
+
+    async def wait_for_network_quiet(self, page, deadline):
+        """Wait until the page has had no pending XHR/fetch for the quiet window."""
+        pending = self._pending.get(page)
+        if pending is None:
+            return True
+
+        quiet_since = None
+        while time.monotonic() < deadline:
+            if pending:
+                quiet_since = None
+            elif quiet_since is None:
+                quiet_since = time.monotonic()
+            elif (time.monotonic() - quiet_since) * 1000 >= self.quiet_ms:
+                return True
+            await asyncio.sleep(0.05)
+        return False
+
+    async def wait(self, page, body_selector=None):
+        """
+        Wait until the page is ready or the ceiling is reached.
+
+        Returns True if every signal was observed before the ceiling.
+        The time spent waiting is recorded in wait_times either way.
+        """
+        selector = body_selector or self.body_selector
+        start = time.monotonic()
+        deadline = start + self.timeout_ms / 1000.0
+        ready = True
+
+        def remaining_ms():
+            return max(1, int((deadline - time.monotonic()) * 1000))
+
+        try:
+            # Covers navigations started by a click just before this call
+            await page.wait_for_load_state("domcontentloaded", timeout=remaining_ms())
+            await page.wait_for_selector(selector, state="attached", timeout=remaining_ms())
+        except Exception:
+            ready = False
+
+        try:
+            await asyncio.wait_for(
+                page.evaluate("document.fonts ? document.fonts.ready.then(() => true) : true"),
+                timeout=remaining_ms() / 1000.0
+            )
+        except Exception:
+            ready = False
+
+        if not await self.wait_for_network_quiet(page, deadline):
+            ready = False
+
+        elapsed = time.monotonic() - start
+        self.wait_times.append(elapsed)
+        if not ready:
+            self.timed_out_count += 1
+
+        return ready
+
+    @property
+    def last_wait(self):
+        """Duration in seconds of the most recent wait."""
+        return self.wait_times[-1] if self.wait_times else 0.0
+
+    def print_summary(self):
+        """Print a one-line breakdown of readiness waits."""
+        if not self.wait_times:
+            return
+        print(f"⏳ Page readiness waits: {len(self.wait_times)} "
+              f"(p50 {percentile(self.wait_times, 50):.2f}s, "
+              f"p95 {percentile(self.wait_times, 95):.2f}s, "
+              f"max {max(self.wait_times):.2f}s, "
+              f"{self.timed_out_count} hit the {self.timeout_ms / 1000:.0f}s ceiling)")
@@ -0,0 +1,159 @@
+"""
+lcd_retry.py
+Retry scheduling and a per-host circuit breaker for bulk LCD downloads.
+
+Failures are classified first:
+- transient: timeouts, dropped connections, HTTP 408/425/429 and 5xx. Retried
+  with exponential backoff and jitter, up to a maximum number of attempts.
+- permanent: HTTP 4xx, missing snapshots, anything else. Failed right away.
+
+The circuit breaker watches the recent outcomes per host. When the share of
+transient failures in the window crosses the threshold, the host is "open" and
+workers wait out a cooldown instead of burning timeouts on it. After the
+cooldown the circuit is half-open: exactly one trial request goes through
+while the other workers keep waiting. Unless it fails transiently the
+circuit closes again; a transient failure reopens it.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+TRANSIENT_STATUSES = (408, 425, 429)
+
+TRANSIENT_MARKERS = ("timeout", "timed out", "net::err_connection", "net::err_timed_out",
+                     "net::err_network", "net::err_internet_disconnected", "net::err_empty_response",
+                     "net::err_http2", "net::err_name_not_resolved", "target closed",
+                     "target crashed", "has been closed")
+
+# Errors after which the worker's page (or its whole context) is gone for good
+PAGE_LOST_MARKERS = ("target closed", "target crashed", "has been closed")
+
+# How often workers waiting on a half-open circuit check the trial request
+PROBE_POLL_SECONDS = 0.5
+
+
+class HTTPStatusError(Exception):
+    """The policy page answered with an error status."""
+
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+
+
+def classify_error(error):
+    """Return TRANSIENT or PERMANENT for an exception (or an error message)."""
+    if isinstance(error, HTTPStatusError):
+        if error.status in TRANSIENT_STATUSES or error.status >= 500:
+            return TRANSIENT
+        return PERMANENT
+
+    message = str(error).lower()
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)) or "TimeoutError" in type(error).__name__:
+        return TRANSIENT
+    if any(marker in message for marker in TRANSIENT_MARKERS):
+        return TRANSIENT
+    return PERMANENT
+
+
+def page_lost(error):
+    """True if error means the page it happened on can no longer be used."""
+    message = str(error).lower()
+    return any(marker in message for marker in PAGE_LOST_MARKERS)
+
+
+class RetryScheduler:
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_count = 0
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_attempts and classify_error(error) == TRANSIENT
+
+    def delay(self, attempt):
+        """Exponential backoff with jitter: a random wait in [cap/2, cap]."""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(cap / 2, cap)
+
+    def schedule(self, attempt):
+        """Count a retry and return the monotonic time it becomes due."""
+        self.retry_count += 1
+        return time.monotonic() + self.delay(attempt)
+
+
+class CircuitBreaker:
+    def __init__(self, window=20, failure_threshold=0.5, min_calls=5, cooldown=30.0):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = {}
+        self.open_until = {}
+        self.half_open = set()
+        self.open_count = 0
+        self.paused_seconds = 0.0
+
+    def _trip(self, host):
+        self.open_until[host] = time.monotonic() + self.cooldown
+        self.outcomes[host].clear()
+        self.half_open.discard(host)
+        self.open_count += 1
+        print(f"🚧 Circuit open for {host}: pausing requests for {self.cooldown:.0f}s")
+
+    def record_success(self, host):
+        self.outcomes.setdefault(host, deque(maxlen=self.window)).append(True)
+        self.half_open.discard(host)
+
+    def record_failure(self, host):
+        """Record a transient failure and open the circuit if the failure rate spikes."""
+        outcomes = self.outcomes.setdefault(host, deque(maxlen=self.window))
+        outcomes.append(False)
+
+        if host in self.half_open:
+            # The trial request after a cooldown failed: back off again
+            self._trip(host)
+            return
+
+        failures = outcomes.count(False)
+        if len(outcomes) >= self.min_calls and failures / len(outcomes) >= self.failure_threshold:
+            self._trip(host)
+
+    async def wait(self, host):
+        """Sleep until the circuit for host lets requests through.
+
+        Returns True if the caller is the one trial request of a half-open
+        circuit; it must call end_probe(host) once the request is over.
+        """
+        while True:
+            remaining = self.open_until.get(host, 0) - time.monotonic()
+            if remaining <= 0 and host not in self.half_open:
+                break
+            # Open: wait out the cooldown. Half-open: wait for the trial's outcome
+            pause = remaining if remaining > 0 else PROBE_POLL_SECONDS
+            await asyncio.sleep(pause)
+            self.paused_seconds += pause
+
+        if host in self.open_until:
+            # Cooldown over: this caller is the trial, the next failure reopens
+            del self.open_until[host]
+            self.half_open.add(host)
+            return True
+        return False
+
+    def end_probe(self, host):
+        """Close a half-open circuit whose trial request did not fail transiently."""
+        # A transient failure has already reopened it (record_failure) and a
+        # success has closed it; any other outcome still means the host answered
+        self.half_open.discard(host)
+
+    def print_summary(self):
+        if self.open_count:
+            print(f"🚧 Circuit breaker opened {self.open_count} times, "
+                  f"workers paused {self.paused_seconds:.0f}s in total")
@@ -0,0 +1,118 @@
+"""
+lcd_route_filter.py
+Blocks requests that have no effect on LCD policy content.
+
+A RouteFilter is attached to a browser context and aborts every request that
+is not on an allowed CMS host, is not an allowed resource type for the active
+profile, or matches a known analytics/tracker pattern. Two profiles are built in:
+
+- render:    for printing PDFs (Step1/Step3); keeps stylesheets, images and fonts
+- discovery: for the Step2 finders; documents, scripts and XHR only
+
+Blocked requests are counted per resource type. Since a blocked request is
+never fetched its size is unknown, so bytes saved are estimated from typical
+sizes per resource type.
+"""
+
+from collections import Counter
+from urllib.parse import urlparse
+
+from lcd_config import MCD_HOST
+
+# Any host equal to or ending in one of these is considered first-party
+# (plus the configured MCD host, e.g. a local stand-in server)
+CMS_HOSTS = ("cms.gov",) if MCD_HOST.endswith("cms.gov") else ("cms.gov", MCD_HOST)
+
+ROUTE_PROFILES = {
+    "render": {
+        "allowed_hosts": CMS_HOSTS,
+        "allowed_resource_types": ("document", "stylesheet", "script", "xhr", "fetch", "image", "font"),
+    },
+    "discovery": {
+        "allowed_hosts": CMS_HOSTS,
+        "allowed_resource_types": ("document", "script", "xhr", "fetch"),
+    },
+}
+
+# Blocked even when served from an allowed host
+BLOCKED_URL_PATTERNS = (
+    "google-analytics", "googletagmanager", "gtag/js", "doubleclick",
+    "analytics.js", "/analytics/", "beacon", "pixel", "hotjar",
+    "facebook", "twitter", "linkedin", "addthis", "sharethis",
+    "newrelic", "nr-data", "dap.digitalgov.gov", "qualtrics", "foresee",
+)
+
+# Rough transfer sizes used to estimate bytes saved by a blocked request
+ESTIMATED_BYTES = {
+    "image": 40 * 1024,
+    "font": 50 * 1024,
+    "stylesheet": 30 * 1024,
+    "script": 60 * 1024,
+    "media": 500 * 1024,
+    "xhr": 5 * 1024,
+    "fetch": 5 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 10 * 1024
+
+
+class RouteFilter:
+    def __init__(self, profile="render", extra_allowed_hosts=()):
+        if profile not in ROUTE_PROFILES:
+            raise ValueError(f"Unknown route profile '{profile}'. Choose from: {', '.join(ROUTE_PROFILES)}")
+
+        config = ROUTE_PROFILES[profile]
+        self.profile = profile
+        self.allowed_hosts = tuple(config['allowed_hosts']) + tuple(extra_allowed_hosts)
+        self.allowed_resource_types = set(config['allowed_resource_types'])
+        self.allowed_count = 0
+        self.blocked_count = 0
+        self.blocked_by_type = Counter()
+        self.estimated_bytes_saved = 0
+
+    def is_allowed_host(self, url):
+        """Check whether url is served from an allowed host or one of its subdomains."""
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+
+    def should_block(self, url, resource_type):
+        """Decide whether a request should be aborted."""
+        if url.startswith("data:") or url.startswith("blob:"):
+            return False
+
+        if resource_type not in self.allowed_resource_types:
+            return True
+
+        if not self.is_allowed_host(url):
+            return True
+
+        url_lower = url.lower()
+        return any(pattern in url_lower for pattern in BLOCKED_URL_PATTERNS)
+
+    async def handle_route(self, route):
+        """Playwright route handler: abort non-essential requests, continue the rest."""
+        request = route.request
+
+        if self.should_block(request.url, request.resource_type):
+            self.blocked_count += 1
+            self.blocked_by_type[request.resource_type] += 1
+            self.estimated_bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed_count += 1
+            await route.continue_()
+
+    async def attach(self, context):
+        """Install the filter on every page of a browser context."""
+        await context.route("**/*", self.handle_route)
+
+    def print_summary(self):
+        """Print how many requests were blocked and the estimated bytes saved."""
+        total = self.allowed_count + self.blocked_count
+        if not total:
+            return
+
+        by_type = ", ".join(f"{rtype} {count}" for rtype, count in self.blocked_by_type.most_common())
+        print(f"🚫 Blocked {self.blocked_count}/{total} requests ({self.profile} profile), "
+              f"~{self.estimated_bytes_saved / (1024*1024):.1f} MB saved (estimated)")
+        if by_type:
+            print(f"   Blocked by type: {by_type}")
@@ -0,0 +1,104 @@
+"""
+lcd_session.py
+Shares one accepted CMS license ("I Accept") session across all Playwright scripts.
+
+The Medicare Coverage Database shows a license agreement before any LCD page.
+Instead of waiting for and clicking that button on every navigation, the
+acceptance is done once and saved as Playwright storage state (cookies and
+localStorage) in cms_consent_state.json. Every browser context is created from
+that state, and the button is only clicked again if the session has expired.
+"""
+
+import json
+import os
+
+from lcd_config import lcd_url
+
+CONSENT_STATE_FILE = "cms_consent_state.json"
+
+# Any LCD page shows the license gate to a fresh session
+CONSENT_URL = lcd_url(33822, "L33822")
+
+ACCEPT_SELECTOR = "input[value='I Accept'], button:has-text('I Accept'), input[type='submit'][value*='Accept']"
+
+
+def _write_state(state, state_file):
+    """Write storage state atomically so concurrent workers never read a partial file."""
+    tmp_file = f"{state_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+
+async def accept_license(page, timeout=5000):
+    """Wait for the 'I Accept' button and click it. Returns True if it was clicked."""
+    try:
+        accept_button = await page.wait_for_selector(ACCEPT_SELECTOR, timeout=timeout)
+    except Exception:
+        return False
+
+    if not accept_button:
+        return False
+
+    await accept_button.click()
+    await page.wait_for_load_state("load")
+    return True
+
+
+async def save_consent_state(browser, state_file=CONSENT_STATE_FILE):
+    """Accept the license in a fresh context and save its storage state to disk."""
+    context = await browser.new_context()
+    page = await context.new_page()
+
+    try:
+        print("🔐 Accepting CMS license agreement once for this session...")
+        await page.goto(CONSENT_URL, wait_until="domcontentloaded", timeout=15000)
+        if await accept_license(page):
+            print(f"🔐 License accepted, session saved to {state_file}")
+        else:
+            print("🔐 No license prompt shown, saving session as-is")
+        _write_state(await context.storage_state(), state_file)
+        return True
+    except Exception as e:
+        print(f"⚠️  Could not save consent session: {e}")
+        return False
+    finally:
+        await context.close()
+
+
+async def new_consented_context(browser, state_file=CONSENT_STATE_FILE, **context_options):
+    """Create a browser context that starts from the saved license acceptance."""
+    if not os.path.exists(state_file):
+        await save_consent_state(browser, state_file)
+
+    if os.path.exists(state_file):
+        context_options['storage_state'] = state_file
+
+    return await browser.new_context(**context_options)
+
+
+async def ensure_license_accepted(page, state_file=CONSENT_STATE_FILE):
+    """
+    Accept the license only if the gate is showing on the current page.
+
+    With a valid saved session the button is absent and this returns at once.
+    If the session has expired the button is clicked and the refreshed state
+    is written back so other contexts pick it up. Returns True if it clicked.
+    """
+    try:
+        accept_button = await page.query_selector(ACCEPT_SELECTOR)
+    except Exception:
+        return False
+
+    if not accept_button:
+        return False
+
+    await accept_button.click()
+    await page.wait_for_load_state("load")
+
+    try:
+        _write_state(await page.context.storage_state(), state_file)
+    except Exception as e:
+        print(f"⚠️  Could not refresh consent session: {e}")
+
+    return True
@@ -0,0 +1,158 @@
+"""
+lcd_snapshots.py
+On-disk cache of fully rendered LCD policy pages, so PDFs can be produced offline.
+
+The fetch stage saves the post-consent, post-render DOM of each policy page
+(scripts stripped, with a <base> tag pointing at the original URL) to
+HTML_Snapshots/Policy_{lcd_id}.html, plus a small JSON sidecar describing it.
+Stylesheets, fonts and images loaded by the live page are stored in
+HTML_Snapshots/assets, keyed by a hash of their URL.
+
+The render stage loads a snapshot with page.set_content() in a context whose
+requests are answered only from the asset cache, so re-rendering with other
+margins or headers never touches cms.gov.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+SNAPSHOT_DIR = "HTML_Snapshots"
+
+CACHED_RESOURCE_TYPES = ("stylesheet", "font", "image")
+
+# Runs in the live page and returns a static, script-free copy of the DOM
+SNAPSHOT_SCRIPT = """
+(baseUrl) => {
+    const root = document.documentElement.cloneNode(true);
+    root.querySelectorAll('script, noscript, iframe, base').forEach(el => el.remove());
+    let head = root.querySelector('head');
+    if (!head) {
+        head = document.createElement('head');
+        root.prepend(head);
+    }
+    const base = document.createElement('base');
+    base.href = baseUrl;
+    head.prepend(base);
+    return '<!DOCTYPE html>\\n' + root.outerHTML;
+}
+"""
+
+
+def _write_atomic(path, data, mode='w'):
+    """Write a file via a temp file and rename so readers never see partial content."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    encoding = 'utf-8' if 'b' not in mode else None
+    with open(tmp_path, mode, encoding=encoding) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SnapshotCache:
+    def __init__(self, cache_dir=SNAPSHOT_DIR):
+        self.cache_dir = cache_dir
+        self.assets_dir = os.path.join(cache_dir, "assets")
+        self.assets_saved = 0
+        self.assets_served = 0
+        self.assets_missing = 0
+
+        os.makedirs(self.assets_dir, exist_ok=True)
+
+    def html_path(self, lcd_id):
+        return os.path.join(self.cache_dir, f"Policy_{lcd_id}.html")
+
+    def meta_path(self, lcd_id):
+        return os.path.join(self.cache_dir, f"Policy_{lcd_id}.json")
+
+    def asset_path(self, url):
+        return os.path.join(self.assets_dir, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def has_snapshot(self, lcd_id):
+        return os.path.exists(self.html_path(lcd_id))
+
+    # ----- fetch stage -----
+
+    def record_assets(self, page):
+        """Save stylesheets, fonts and images loaded by page into the asset cache."""
+
+        async def on_response(response):
+            request = response.request
+            if request.resource_type not in CACHED_RESOURCE_TYPES or response.status != 200:
+                return
+
+            path = self.asset_path(request.url)
+            if os.path.exists(path):
+                return
+
+            try:
+                body = await response.body()
+            except Exception:
+                return
+
+            content_type = response.headers.get('content-type', 'application/octet-stream')
+            _write_atomic(path, body, mode='wb')
+            _write_atomic(path + ".json", json.dumps({"url": request.url, "content_type": content_type}))
+            self.assets_saved += 1
+
+        page.on("response", on_response)
+
+    async def save(self, page, policy):
+        """Save the current DOM of page as the snapshot for policy."""
+        html = await page.evaluate(SNAPSHOT_SCRIPT, page.url)
+        lcd_id = policy['lcd_id']
+
+        _write_atomic(self.html_path(lcd_id), html)
+        _write_atomic(self.meta_path(lcd_id), json.dumps({
+            "lcd_id": lcd_id,
+            "doc_id": policy.get('doc_id'),
+            "title": policy.get('title'),
+            "url": policy.get('url'),
+            "final_url": page.url,
+            "fetched_date": datetime.now().isoformat(),
+            "html_bytes": len(html.encode('utf-8'))
+        }, indent=2))
+        return html
+
+    # ----- render stage -----
+
+    def load(self, lcd_id):
+        """Return the cached HTML for lcd_id, or None if it was never fetched."""
+        try:
+            with open(self.html_path(lcd_id), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def serve_from_cache(self, route):
+        """Route handler that answers requests from the asset cache and blocks everything else."""
+        url = route.request.url
+        if url.startswith("data:"):
+            await route.continue_()
+            return
+
+        path = self.asset_path(url)
+        try:
+            with open(path + ".json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.assets_missing += 1
+            await route.abort("internetdisconnected")
+            return
+
+        self.assets_served += 1
+        await route.fulfill(status=200, body=body, content_type=meta['content_type'])
+
+    async def attach_offline(self, context):
+        """Make every request in context resolve from the cache only."""
+        await context.route("**/*", self.serve_from_cache)
+
+    def print_summary(self):
+        """Print asset cache activity for this run."""
+        if self.assets_saved:
+            print(f"💾 Cached {self.assets_saved} new page assets in {self.assets_dir}")
+        if self.assets_served or self.assets_missing:
+            print(f"💾 Offline render: {self.assets_served} assets served from cache, "
+                  f"{self.assets_missing} not cached")
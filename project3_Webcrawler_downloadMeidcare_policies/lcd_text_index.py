@@ -0,0 +1,364 @@
+"""
+lcd_text_index.py
+Full-text search over the downloaded LCD corpus with a SQLite FTS5 index.
+
+Text is extracted in a process pool, so indexing scales with cores:
+- PDFs in Download_PDFs, one row per page (needs pypdf, or pdftotext from poppler-utils)
+- HTML snapshots in HTML_Snapshots, one row per heading section (no extra dependencies)
+
+Every row keeps its page (or section) number and its character offset in the
+document text. The index lives in Download_PDFs/lcd_text.sqlite and is
+incremental: files whose size and modification time are unchanged are skipped
+without being read, changed files are hashed, and only files whose SHA-256
+differs are extracted again. Files that disappeared are dropped.
+
+Queries use FTS5 syntax (words, "phrases", AND/OR/NOT, prefix*) and return
+bm25-ranked results with highlighted snippets.
+
+Usage:
+    python lcd_text_index.py build                      # PDFs if an extractor is installed, else snapshots
+    python lcd_text_index.py build --source html --processes 8
+    python lcd_text_index.py search "continuous glucose monitor" --limit 10
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from html.parser import HTMLParser
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+from lcd_snapshots import SNAPSHOT_DIR
+
+PDFTOTEXT = shutil.which("pdftotext")
+
+PDF_DIR = "Download_PDFs"
+TEXT_DB_FILE = "Download_PDFs/lcd_text.sqlite"
+
+SOURCES = ("pdf", "html")
+
+# Rows written per transaction while extraction results stream in
+COMMIT_EVERY = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    lcd_id TEXT,
+    kind TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    pages INTEGER,
+    indexed_date TEXT,
+    first_rowid INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text,
+    path UNINDEXED,
+    lcd_id UNINDEXED,
+    page UNINDEXED,
+    char_offset UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+SEARCH_SQL = """
+SELECT lcd_id, path, page, char_offset, bm25(pages) AS score,
+       snippet(pages, 0, '[', ']', ' … ', ?) AS snippet
+FROM pages WHERE pages MATCH ?
+ORDER BY score LIMIT ?
+"""
+
+
+def pdf_extractor():
+    """Name of the PDF text extractor that will be used, or None."""
+    if pypdf is not None:
+        return "pypdf"
+    if PDFTOTEXT:
+        return "pdftotext"
+    return None
+
+
+def lcd_id_of(path):
+    match = re.search(r'Policy_(\d+)\.', os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pdf_pages(path):
+    """Text of every page of a PDF."""
+    if pypdf is not None:
+        return [page.extract_text() or "" for page in pypdf.PdfReader(path).pages]
+    # pdftotext separates pages with form feeds
+    result = subprocess.run([PDFTOTEXT, "-q", "-enc", "UTF-8", path, "-"],
+                            capture_output=True, check=True, timeout=120)
+    pages = result.stdout.decode('utf-8', errors='replace').split("\f")
+    return pages[:-1] if pages and not pages[-1].strip() else pages
+
+
+class _SectionTextParser(HTMLParser):
+    """Visible text of a saved policy page, split into sections at headings."""
+
+    HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+    SKIPPED = ("script", "style", "noscript", "template", "head")
+    BLOCKS = ("p", "div", "br", "li", "tr", "table", "section", "article") + HEADINGS
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections = [[]]
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        elif tag in self.HEADINGS and "".join(self.sections[-1]).strip():
+            self.sections.append([])
+        if tag in self.BLOCKS:
+            self.sections[-1].append("\n")
+        elif tag in ("td", "th"):
+            self.sections[-1].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCKS:
+            self.sections[-1].append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.sections[-1].append(data)
+
+
+def html_sections(path):
+    """Text of every heading section of an HTML snapshot."""
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    parser = _SectionTextParser()
+    parser.feed(html)
+    parser.close()
+    sections = []
+    for parts in parser.sections:
+        lines = [" ".join(line.split()) for line in "".join(parts).split("\n")]
+        text = "\n".join(line for line in lines if line)
+        if text:
+            sections.append(text)
+    return sections
+
+
+def extract_document(job):
+    """Process-pool task: hash a file and, if its hash changed, extract its text.
+
+    Returns (path, kind, sha256, size, mtime, pages); pages is None when the
+    content is unchanged.
+    """
+    path, kind, known_sha256 = job
+    stat = os.stat(path)
+    sha256 = file_sha256(path)
+    if sha256 == known_sha256:
+        return path, kind, sha256, stat.st_size, stat.st_mtime, None
+
+    try:
+        pages = pdf_pages(path) if kind == "pdf" else html_sections(path)
+    except Exception as e:
+        # A broken file shouldn't stop the build; it is retried next time
+        print(f"⚠️  Could not extract text from {path}: {e}")
+        return path, kind, None, stat.st_size, stat.st_mtime, None
+    return path, kind, sha256, stat.st_size, stat.st_mtime, pages
+
+
+class TextIndex:
+    def __init__(self, filename=TEXT_DB_FILE):
+        self.filename = filename
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(filename, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(documents)")}
+        if "first_rowid" not in columns:
+            # Indexes built before rows were tracked by rowid
+            self.connection.execute("ALTER TABLE documents ADD COLUMN first_rowid INTEGER")
+        self.extracted = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.failed = 0
+
+    def source_files(self, sources):
+        files = []
+        for kind, directory in (("pdf", PDF_DIR), ("html", SNAPSHOT_DIR)):
+            if kind not in sources or not os.path.isdir(directory):
+                continue
+            files += [(os.path.join(directory, name), kind) for name in sorted(os.listdir(directory))
+                      if name.endswith(f".{kind}")]
+        return files
+
+    def build(self, sources, processes=None):
+        """Bring the index up to date with the files of the given sources."""
+        known = {path: (sha256, size, mtime) for path, sha256, size, mtime in
+                 self.connection.execute("SELECT path, sha256, size, mtime FROM documents WHERE kind IN (%s)"
+                                         % ",".join("?" * len(sources)), sources)}
+
+        jobs = []
+        files = self.source_files(sources)
+        for path, kind in files:
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry and entry[1] == stat.st_size and entry[2] == stat.st_mtime:
+                self.unchanged += 1
+                continue
+            jobs.append((path, kind, entry[0] if entry else None))
+
+        # Files that are gone from disk leave the index too
+        present = {path for path, _ in files}
+        with self.connection:
+            for path in set(known) - present:
+                self._remove(path)
+                self.removed += 1
+
+        if not jobs:
+            return
+
+        pending = 0
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunksize = max(1, len(jobs) // ((processes or os.cpu_count() or 1) * 4))
+            for path, kind, sha256, size, mtime, pages in pool.map(extract_document, jobs, chunksize=chunksize):
+                if sha256 is None:
+                    self.failed += 1
+                    continue
+                if pages is None:
+                    # Same content, only the file was touched
+                    self.connection.execute("UPDATE documents SET size = ?, mtime = ? WHERE path = ?",
+                                            (size, mtime, path))
+                    self.unchanged += 1
+                else:
+                    self._store(path, kind, sha256, size, mtime, pages)
+                    self.extracted += 1
+                pending += 1
+                if pending >= COMMIT_EVERY:
+                    self.connection.commit()
+                    pending = 0
+        self.connection.commit()
+
+    def _remove(self, path):
+        # A document's pages have consecutive rowids, so they are deleted by rowid range;
+        # path is an UNINDEXED column and filtering on it scans the whole FTS table
+        row = self.connection.execute("SELECT first_rowid, pages FROM documents WHERE path = ?",
+                                      (path,)).fetchone()
+        if row is None:
+            return
+        first_rowid, pages = row
+        if first_rowid is None:
+            self.connection.execute("DELETE FROM pages WHERE path = ?", (path,))
+        else:
+            self.connection.execute("DELETE FROM pages WHERE rowid BETWEEN ? AND ?",
+                                    (first_rowid, first_rowid + (pages or 0) - 1))
+        self.connection.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def _store(self, path, kind, sha256, size, mtime, pages):
+        self._remove(path)
+        lcd_id = lcd_id_of(path)
+        first_rowid = self.connection.execute(
+            "SELECT rowid FROM pages ORDER BY rowid DESC LIMIT 1").fetchone()
+        first_rowid = first_rowid[0] + 1 if first_rowid else 1
+        rows = []
+        offset = 0
+        for number, text in enumerate(pages, 1):
+            rows.append((first_rowid + number - 1, text, path, lcd_id, number, offset))
+            offset += len(text) + 1
+        self.connection.executemany(
+            "INSERT INTO pages (rowid, text, path, lcd_id, page, char_offset) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.connection.execute(
+            "INSERT INTO documents (path, lcd_id, kind, sha256, size, mtime, pages, indexed_date, first_rowid) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, lcd_id, kind, sha256, size, mtime, len(pages), datetime.now().isoformat(), first_rowid))
+
+    def search(self, query, limit=20, snippet_tokens=16):
+        """bm25-ranked matches of an FTS5 query, one per page/section."""
+        rows = self.connection.execute(SEARCH_SQL, (snippet_tokens, query, limit)).fetchall()
+        return [{"lcd_id": lcd_id, "path": path, "page": page, "char_offset": char_offset,
+                 "score": score, "snippet": " ".join(snippet.split())}
+                for lcd_id, path, page, char_offset, score, snippet in rows]
+
+    def counts(self):
+        documents = self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        pages = self.connection.execute("SELECT COALESCE(SUM(pages), 0) FROM documents").fetchone()[0]
+        return documents, pages
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search over downloaded LCD policies')
+    parser.add_argument('--db', default=TEXT_DB_FILE, help=f'Index database (default: {TEXT_DB_FILE})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Index new and changed files')
+    build.add_argument('--source', choices=list(SOURCES) + ['both'],
+                       help='pdf: Download_PDFs, html: HTML_Snapshots '
+                            '(default: pdf if pypdf or pdftotext is installed, else html)')
+    build.add_argument('--processes', type=int, default=None,
+                       help='Extraction processes (default: one per CPU core)')
+
+    search = commands.add_parser('search', help='Search the index')
+    search.add_argument('query', help='FTS5 query, e.g. "glucose monitor" or insulin AND pump')
+    search.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+
+    args = parser.parse_args()
+    index = TextIndex(args.db)
+
+    try:
+        if args.command == 'build':
+            source = args.source or ("pdf" if pdf_extractor() else "html")
+            sources = list(SOURCES) if source == 'both' else [source]
+            if "pdf" in sources and not pdf_extractor():
+                print("❌ No PDF text extractor found. Install one of:")
+                print("pip install pypdf")
+                print("apt install poppler-utils   # pdftotext")
+                print("or index the HTML snapshots with --source html")
+                return
+
+            print(f"🔎 Building full-text index from: {', '.join(sources)}"
+                  + (f" ({pdf_extractor()})" if "pdf" in sources else ""))
+            started = time.monotonic()
+            index.build(sources, args.processes)
+            documents, pages = index.counts()
+            print(f"✅ Extracted {index.extracted}, unchanged {index.unchanged}, removed {index.removed}, "
+                  f"failed {index.failed} in {time.monotonic() - started:.1f}s")
+            print(f"📚 Index: {documents} documents, {pages} pages/sections ({args.db})")
+        else:
+            started = time.monotonic()
+            try:
+                results = index.search(args.query, args.limit)
+            except sqlite3.OperationalError as e:
+                print(f"❌ Invalid query: {e}")
+                return
+            print(f"🔎 {args.query}: {len(results)} results ({(time.monotonic() - started) * 1000:.1f} ms)")
+            for rank, result in enumerate(results, 1):
+                label = f"L{result['lcd_id']}" if result['lcd_id'] else os.path.basename(result['path'])
+                print(f"\n{rank:3d}. {label}  page {result['page']}, offset {result['char_offset']}  "
+                      f"(score {-result['score']:.2f})")
+                print(f"     {result['snippet']}")
+                print(f"     {result['path']}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
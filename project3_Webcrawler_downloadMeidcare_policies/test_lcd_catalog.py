@@ -0,0 +1,44 @@
+import json
+
+from lcd_catalog import LCDCatalog, load_policies, is_estimated, VALIDATED, ESTIMATED
+
+
+def write_legacy(path, policies):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"search_date": "2025-07-29T10:44:02", "policies": policies}, f)
+
+
+def test_catalog_is_merged_with_legacy_urls(tmp_path):
+    legacy_file = str(tmp_path / "All_urls.json")
+    catalog_file = str(tmp_path / "lcd_catalog.jsonl")
+    write_legacy(legacy_file, [
+        {"lcd_id": "33822", "title": "Glucose Monitors", "url": "https://example.test/33822"},
+        {"lcd_id": "35000", "title": "Molecular Pathology", "url": "https://example.test/35000", "status": "estimated"},
+        {"lcd_id": "35070", "title": "Lab Panels", "url": "https://example.test/35070", "status": "estimated"},
+    ])
+
+    catalog = LCDCatalog(catalog_file, source="Step2_Quick_LCD_Finder")
+    catalog.add({"lcd_id": "35000", "title": "Molecular Pathology Procedures", "url": "https://example.test/35000"})
+    catalog.add({"lcd_id": "39000", "title": "New Policy", "url": "https://example.test/39000"})
+    catalog.close()
+
+    policies, source = load_policies(catalog_file, legacy_file)
+    by_id = {policy['lcd_id']: policy for policy in policies}
+
+    assert [policy['lcd_id'] for policy in policies] == ["33822", "35000", "35070", "39000"]
+    assert source == f"{legacy_file} + {catalog_file}"
+    assert by_id["33822"]['source'] == "All_urls.json" and by_id["33822"]['provenance'] == VALIDATED
+    assert is_estimated(by_id["35070"]) and by_id["35070"]['provenance'] == ESTIMATED
+    assert by_id["35000"]['provenance'] == VALIDATED
+    assert by_id["35000"]['title'] == "Molecular Pathology Procedures"
+    assert by_id["35000"]['sources'] == ["All_urls.json", "Step2_Quick_LCD_Finder"]
+
+
+def test_legacy_urls_alone(tmp_path):
+    legacy_file = str(tmp_path / "All_urls.json")
+    write_legacy(legacy_file, [{"lcd_id": 33822, "url": "https://example.test/33822"}])
+
+    policies, source = load_policies(str(tmp_path / "lcd_catalog.jsonl"), legacy_file)
+
+    assert [policy['lcd_id'] for policy in policies] == ["33822"]
+    assert source == legacy_file
@@ -0,0 +1,47 @@
+from lcd_code_index import CodeIndex, query_system
+from lcd_codes import CodeTableStore, CPT_HCPCS, ICD10_CM, ICD10_PCS
+
+
+def code_row(code_system, code, code_end=None, description=""):
+    return {"code_system": code_system, "code": code, "code_end": code_end, "description": description,
+            "section": "", "table_index": 0, "row_index": 0}
+
+
+def build_index(tmp_path, rows):
+    filename = str(tmp_path / "lcd_codes.sqlite")
+    store = CodeTableStore(filename)
+    store.store("33822", "2024-01-01", None, rows)
+    store.close()
+    index = CodeIndex(filename)
+    index.update()
+    return index
+
+
+def test_query_system_from_shape():
+    assert query_system("E11.61") == ICD10_CM
+    assert query_system("E119") == ICD10_CM
+    assert query_system("E11") == ICD10_CM
+    assert query_system("E1161") == CPT_HCPCS
+    assert query_system("99213") == CPT_HCPCS
+    assert query_system("0DTJ4ZZ") == ICD10_PCS
+    assert query_system("9525") is None
+
+
+def test_hcpcs_e_codes_do_not_match_icd_ranges(tmp_path):
+    index = build_index(tmp_path, [
+        code_row(ICD10_CM, "E08.00", "E13.9", "Diabetes mellitus"),
+        code_row(ICD10_CM, "E11.61", description="Type 2 diabetes with arthropathy"),
+        code_row(CPT_HCPCS, "E1161", description="Manual adult size wheelchair"),
+    ])
+    try:
+        hcpcs = index.lookup("E1161")
+        assert [(result['code_system'], result['code']) for result in hcpcs] == [(CPT_HCPCS, "E1161")]
+        assert index.lookup("E1000") == []
+
+        icd = index.lookup("E11.61")
+        assert {(result['code_system'], result['code']) for result in icd} == {(ICD10_CM, "E11.61"),
+                                                                               (ICD10_CM, "E08.00")}
+        assert [result['code'] for result in index.lookup("E1161", ICD10_CM)] == ["E11.61", "E08.00"]
+        assert [result['code'] for result in index.lookup("E08.50")] == ["E08.00"]
+    finally:
+        index.close()
@@ -0,0 +1,30 @@
+from lcd_http_validator import LCDHttpValidator, VALID, INVALID, AMBIGUOUS
+
+URL = "https://www.cms.gov/medicare-coverage-database/view/lcd.aspx?LCDId=33718"
+
+
+def classify(html):
+    # classify_response only looks at its arguments, so no HTTP client is needed
+    validator = LCDHttpValidator.__new__(LCDHttpValidator)
+    return validator.classify_response("33718", 200, URL, html)[0]
+
+
+def lcd_page(body):
+    return ("<html><head><title>LCD - Wound Care (L33718)</title></head><body>"
+            "<h1>Local Coverage Determination (LCD)</h1><p>" + body + "</p></body></html>")
+
+
+def test_lcd_quoting_error_wording_is_valid():
+    body = "Claims for services that could not be found in the medical record will be denied."
+    assert classify(lcd_page(body)) == VALID
+
+
+def test_error_heading_is_invalid():
+    html = ("<html><head><title>Page Not Found</title></head><body>"
+            "<a href='/lcd'>Local Coverage Determinations</a></body></html>")
+    assert classify(html) == INVALID
+
+
+def test_error_body_without_lcd_content_is_invalid():
+    assert classify("<html><body><p>An error has occurred.</p></body></html>") == INVALID
+    assert classify("<html><body><div id='app'></div></body></html>") == AMBIGUOUS
@@ -0,0 +1,57 @@
+import asyncio
+import zlib
+
+from lcd_metrics import PolicyMetrics, count_pdf_pages
+from lcd_pdf_profile import PDFProfile
+
+
+def pdf_file(objects):
+    """A PDF with the given numbered objects (bytes bodies) and a matching xref table."""
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def page(parent=2):
+    return b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] >>" % parent
+
+
+def rendered_pdf():
+    """Two pages as Chromium writes them: plain page objects."""
+    return pdf_file([b"<< /Type /Catalog /Pages 2 0 R >>",
+                     b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 >>",
+                     page(), page()])
+
+
+def object_stream_pdf():
+    """The same two pages packed into a compressed object stream, as the compact optimizers write them."""
+    first, second = page(), page()
+    header = b"3 0 4 %d " % (len(first) + 1)
+    data = zlib.compress(header + first + b" " + second)
+    return pdf_file([b"<< /Type /Catalog /Pages 2 0 R >>",
+                     b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 >>",
+                     b"<< /Type /ObjStm /N 2 /First %d /Filter /FlateDecode /Length %d >>\nstream\n"
+                     % (len(header), len(data)) + data + b"\nendstream"])
+
+
+def test_pages_counted_in_object_streams():
+    assert count_pdf_pages(rendered_pdf()) == 2
+    assert count_pdf_pages(object_stream_pdf()) == 2
+
+
+def test_compact_profile_keeps_page_count():
+    rendered = rendered_pdf()
+    pages = count_pdf_pages(rendered)
+    stored = asyncio.run(PDFProfile("compact").finalize(rendered))
+
+    metrics = PolicyMetrics("33822")
+    metrics.set_pdf(stored, pages)
+    assert metrics.record['pdf_pages'] == 2
+    assert count_pdf_pages(stored) == 2
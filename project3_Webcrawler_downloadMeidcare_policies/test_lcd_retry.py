@@ -0,0 +1,60 @@
+import asyncio
+
+import lcd_retry
+from lcd_retry import CircuitBreaker, page_lost
+
+
+def tripped_breaker():
+    breaker = CircuitBreaker(min_calls=1, cooldown=0.01)
+    breaker.record_failure("www.cms.gov")
+    return breaker
+
+
+async def trial_requests(breaker, outcome, workers=4):
+    """Send workers through a half-open circuit; returns whether each was a trial, and the most trials at once."""
+    trials = []
+    in_flight = []
+
+    async def worker():
+        probe = await breaker.wait("www.cms.gov")
+        trials.append(probe)
+        if probe:
+            in_flight.append(probe)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.remove(probe)
+            if outcome == "failure":
+                breaker.record_failure("www.cms.gov")
+            elif outcome == "success":
+                breaker.record_success("www.cms.gov")
+            breaker.end_probe("www.cms.gov")
+
+    peak = []
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    return trials, max(peak)
+
+
+def test_half_open_lets_one_trial_through(monkeypatch):
+    monkeypatch.setattr(lcd_retry, "PROBE_POLL_SECONDS", 0.01)
+    breaker = tripped_breaker()
+    trials, peak = asyncio.run(trial_requests(breaker, "success"))
+    assert peak == 1
+    assert trials[0] is True
+    assert trials[1:] == [False, False, False]
+    assert "www.cms.gov" not in breaker.half_open
+
+
+def test_failed_trial_reopens_circuit(monkeypatch):
+    monkeypatch.setattr(lcd_retry, "PROBE_POLL_SECONDS", 0.01)
+    breaker = tripped_breaker()
+    trials, peak = asyncio.run(trial_requests(breaker, "failure"))
+    # Each failed trial reopens the circuit, so the workers go through one trial at a time
+    assert peak == 1
+    assert trials == [True, True, True, True]
+    assert breaker.open_count == 5
+
+
+def test_page_lost():
+    assert page_lost(Exception("Page.pdf: Target closed"))
+    assert page_lost(Exception("Target page, context or browser has been closed"))
+    assert not page_lost(Exception("Timeout 15000ms exceeded"))